@@ -1,26 +1,37 @@
 # app.py
-from flask import Flask, jsonify
+from flask import Flask
 from flask_cors import CORS
-from sqlalchemy import text
 from dotenv import load_dotenv
 import os
 
+# Before the local imports below: several of them read their settings
+# from the environment at import time.
+load_dotenv()
+
 from extensions import db
+from dbpool import engine_options, init_pool_metrics
 from flask_jwt_extended import JWTManager
+from identity import init_identity
+from instrumentation import instrument_engine
+from replicas import binds, init_replicas, replica_engines
+from serializers import OrjsonProvider
+from cli import register_cli
+from health import bp as health_bp
 from routes import bp as api_bp
 
 
-
-load_dotenv()
-
 # ------------------------
 # Initialize Flask app
 # ------------------------
 app = Flask(__name__)
+app.json = OrjsonProvider(app)  # jsonify via orjson, see serializers.py
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()  # pool sizing etc., see dbpool.py
+app.config['SQLALCHEMY_BINDS'] = binds()  # DATABASE_REPLICA_URLS, see replicas.py
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "super-secret-key")
 
+app.register_blueprint(health_bp)
 app.register_blueprint(api_bp)
 
 CORS(app, resources={r"/*": {"origins": "*"}})  # tighten to your Vercel domain later
@@ -30,32 +41,15 @@ CORS(app, resources={r"/*": {"origins": "*"}})  # tighten to your Vercel domain
 # Initialize extensions
 # ------------------------
 db.init_app(app)
+with app.app_context():
+    init_pool_metrics(db.engine)
+    instrument_engine(db.engine)
+    for replica in replica_engines(db):
+        instrument_engine(replica)
+    init_replicas(app, db)
 jwt = JWTManager(app)
-
-# ------------------------
-# Simple healthcheck route
-# ------------------------
-@app.route("/")
-def home():
-    try:
-        with db.engine.connect() as conn:
-            result = conn.execute(text("SELECT 1"))
-            if result.scalar() == 1:
-                return jsonify({
-                    "status": "CrewQuick API running!",
-                    "db_connection": "✅ successful"
-                })
-            else:
-                return jsonify({
-                    "status": "CrewQuick API running!",
-                    "db_connection": "❌ failed"
-                })
-    except Exception as e:
-        return jsonify({
-            "status": "CrewQuick API running!",
-            "db_connection": "❌ failed",
-            "error": str(e)
-        })
+init_identity(jwt)
+register_cli(app)
 
 # ------------------------
 # Import routes AFTER db & app are initialized
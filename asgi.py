@@ -0,0 +1,405 @@
+# asgi.py
+"""
+ASGI entry point: async versions of the hot read routes, Flask for the rest.
+
+    gunicorn asgi:app -k uvicorn_worker.UvicornWorker    (see gunicorn.conf.py)
+    uvicorn asgi:app --port 8000                          (local)
+
+Four read-heavy routes are served natively on the event loop, with
+SQLAlchemy's asyncio engine over asyncpg:
+
+    GET /jobs               the plain feed (per_page, cursor, include_total)
+    GET /me
+    GET /me/applications    (per_page, cursor)
+    GET /jobs/stream        new-job SSE (skills, last_event_id; see jobstream.py)
+
+They return the same bodies as the Flask views -- same keyset cursors
+(pagination.py), same serializers, same error shapes -- so clients can't
+tell which path answered. Anything those handlers don't understand is
+passed to the Flask app unchanged (via a2wsgi, on a thread pool): other
+routes and methods, and ?q= / ?fields= or any other query parameter.
+/jobs on the async path skips the response cache (cache.cached) -- its
+backend calls are blocking -- so it always reads from the database.
+
+An open /jobs/stream costs a queue and an idle task here, instead of a
+whole Flask thread, so this is where streams should be served from.
+
+Each worker process keeps its own async pool, sized by the same DB_POOL_*
+settings as the sync pool (dbpool.py); connections are opened lazily, so
+a process that never serves an async route never connects.
+
+Throughput (bench.load --url, 1 CPU, Postgres on the same host, load_db at
+--scale 0.02, 8 clients, 10s, CACHE_TTL=0, WEB_CONCURRENCY=1;
+requests/second, p50 / p99 ms):
+
+    scenario          gunicorn app:app (gthread x5)   GUNICORN_ASYNC=1 asgi:app
+    feed                131    60 / 110                  195    40 /  66
+    me                  291    25 /  63                  637    12 /  49
+    me_applications     144    56 /  78                  225    35 /  52
+
+Reproduce with `python -m bench.load --url http://127.0.0.1:8000
+-s feed me me_applications` against each server.
+
+Configuration (env):
+    DATABASE_URL     as for the Flask app; the driver is swapped to asyncpg
+    FRONTEND_ORIGIN  CORS origin for the async routes (as routes.py)
+    WSGI_THREADS     threads running Flask requests per process (default DB_POOL_SIZE)
+"""
+import asyncio
+import gzip
+import os
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import ExpiredSignatureError, InvalidTokenError
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import joinedload
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import generate_etag, parse_accept_header, parse_etags
+
+from app import app as flask_app
+import dbpool
+import identity
+import jobstream
+from extensions import db
+from hashing import RETRY_AFTER_SECONDS
+from instrumentation import finish_request_stats, instrument_engine, start_request_stats
+from models import Job, JobApplication, User
+from pagination import InvalidCursor, finish_page, keyset_filter, page_args
+from responses import COMPRESS_LEVEL, COMPRESS_MIN_BYTES
+from routes import FRONTEND_ORIGIN, job_stream
+from serializers import APPLICATION_COLUMNS, JOB_COLUMNS, application, dumps, records
+
+# Threads a2wsgi may use to run Flask requests (per process).
+WSGI_THREADS = int(os.getenv("WSGI_THREADS", str(dbpool.DB_POOL_SIZE)))
+
+
+class HTTPError(Exception):
+    def __init__(self, status, body, retry_after=None):
+        self.status = status
+        self.body = body
+        self.retry_after = retry_after
+
+
+# ------------------------
+# Async engine
+# ------------------------
+_engine = None
+_sessionmaker = None
+
+
+def async_url(url):
+    """DATABASE_URL rewritten for asyncpg, plus connect args it needs."""
+    u = make_url(url).set(drivername="postgresql+asyncpg")
+    connect_args = {"timeout": dbpool.DB_CONNECT_TIMEOUT}
+    if "sslmode" in u.query:  # libpq spelling; asyncpg takes ssl=
+        connect_args["ssl"] = u.query["sslmode"]
+        u = u.difference_update_query(["sslmode"])
+    if dbpool.DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["server_settings"] = {"statement_timeout": str(dbpool.DB_STATEMENT_TIMEOUT_MS)}
+    return u, connect_args
+
+
+def sessionmaker():
+    global _engine, _sessionmaker
+    if _sessionmaker is None:
+        url, connect_args = async_url(flask_app.config["SQLALCHEMY_DATABASE_URI"])
+        _engine = create_async_engine(
+            url,
+            pool_size=dbpool.DB_POOL_SIZE,
+            max_overflow=dbpool.DB_MAX_OVERFLOW,
+            pool_timeout=dbpool.DB_POOL_TIMEOUT,
+            pool_recycle=dbpool.DB_POOL_RECYCLE,
+            pool_pre_ping=dbpool.DB_POOL_PRE_PING,
+            connect_args=connect_args,
+        )
+        instrument_engine(_engine.sync_engine)
+        _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False)
+    return _sessionmaker
+
+
+async def dispose():
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = _sessionmaker = None
+
+
+# ------------------------
+# Auth (flask_jwt_extended's rules and messages)
+# ------------------------
+def jwt_claims(headers):
+    auth = headers.get("authorization", "")
+    if not auth:
+        raise HTTPError(401, {"msg": "Missing Authorization Header"})
+    parts = auth.split()
+    if len(parts) != 2 or parts[0] != "Bearer":
+        raise HTTPError(422, {"msg": "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'"})
+    try:
+        with flask_app.app_context():
+            claims = decode_token(parts[1])
+    except ExpiredSignatureError:
+        raise HTTPError(401, {"msg": "Token has expired"})
+    except (InvalidTokenError, JWTExtendedException) as e:
+        # e.g. JWTDecodeError for a token missing its identity claim
+        raise HTTPError(422, {"msg": str(e)})
+    if claims.get("type") != "access":
+        raise HTTPError(422, {"msg": "Only non-refresh tokens are allowed"})
+    return claims
+
+
+async def resolve_identity(session, user_id):
+    """identity.resolve, with the query awaited instead of blocking."""
+    found = identity.cache.get(user_id)
+    if found is not None:
+        return found
+    user = (await session.execute(
+        select(User)
+        .options(joinedload(User.worker), joinedload(User.contractor))
+        .where(User.id == user_id))).unique().scalar_one_or_none()
+    if user is None:
+        raise HTTPError(401, {"msg": f"Error loading the user {user_id}"})
+    found = identity.identity_from_user(user)
+    identity.cache.set(user_id, found)
+    return found
+
+
+# ------------------------
+# Routes
+# ------------------------
+async def list_jobs(session, claims, args):
+    per_page, cursor, include_total = page_args(args=args)
+    try:
+        stmt = keyset_filter(select(*JOB_COLUMNS), [Job.created_at, Job.id], cursor)
+    except InvalidCursor:
+        raise HTTPError(400, {"error": "Invalid cursor"})
+    rows = (await session.execute(stmt.limit(per_page + 1))).all()
+    jobs, next_cursor = finish_page(rows, ["created_at", "id"], per_page)
+    body = {
+        "results": records(jobs),
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+    }
+    if include_total:
+        body["total"] = await session.scalar(select(func.count(Job.id)))
+    return body
+
+
+async def me(session, claims, args):
+    u = await resolve_identity(session, int(claims["sub"]))
+    body = {"id": u.user_id, "email": u.email, "role": u.role}
+    if u.profile is not None:
+        body["profile"] = u.profile
+    return body
+
+
+async def my_applications(session, claims, args):
+    if claims["role"] != "worker":
+        raise HTTPError(403, {"error": "Worker role required"})
+    worker_id = claims.get("worker_id")
+    if "worker_id" not in claims:
+        worker_id = (await resolve_identity(session, int(claims["sub"]))).worker_id
+    if not worker_id:
+        raise HTTPError(404, {"error": "Worker profile not found"})
+
+    per_page, cursor, _ = page_args(args=args)
+    stmt = (select(*APPLICATION_COLUMNS)
+            .join(Job, Job.id == JobApplication.job_id)
+            .where(JobApplication.worker_id == worker_id))
+    try:
+        stmt = keyset_filter(stmt, [JobApplication.applied_at, JobApplication.id], cursor)
+    except InvalidCursor:
+        raise HTTPError(400, {"error": "Invalid cursor"})
+    rows = (await session.execute(stmt.limit(per_page + 1))).all()
+    apps, next_cursor = finish_page(rows, ["applied_at", "id"], per_page)
+    return {
+        "results": [application(a) for a in apps],
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+    }
+
+
+# path -> (endpoint name for metrics, handler, query params it understands)
+ROUTES = {
+    "/jobs": ("api.list_jobs", list_jobs, {"per_page", "cursor", "include_total"}),
+    "/me": ("api.me", me, set()),
+    "/me/applications": ("api.my_applications", my_applications, {"per_page", "cursor"}),
+}
+
+
+STREAM_ARGS = {"skills", "last_event_id"}
+
+
+async def stream_jobs(scope, receive, send, headers, args):
+    """GET /jobs/stream on the event loop; same events as the Flask view."""
+    started = start_request_stats("api.stream_jobs")
+    subscriber = None
+    try:
+        claims = jwt_claims(headers)
+        try:
+            after = jobstream.last_event_id(headers.get("last-event-id", args.get("last_event_id")))
+        except ValueError:
+            raise HTTPError(400, {"error": "Last-Event-ID must be a job id"})
+        skills = [v.strip() for raw in args.getlist("skills") for v in raw.split(",") if v.strip()]
+        skills = list(dict.fromkeys(skills))
+        async with sessionmaker()() as session:
+            if not skills and claims["role"] == "worker":
+                skills = list((await resolve_identity(session, int(claims["sub"]))).skills)
+
+            subscriber = jobstream.AsyncSubscriber(skills or None)
+            with flask_app.app_context():
+                engine = db.engine
+            try:
+                job_stream.subscribe(engine, subscriber)
+            except jobstream.StreamFull:
+                subscriber = None
+                raise HTTPError(503, {"error": "Too many open streams, please retry"},
+                                retry_after=RETRY_AFTER_SECONDS)
+            if not await asyncio.to_thread(job_stream.ready.wait, jobstream.LISTEN_READY_SECONDS):
+                raise HTTPError(503, {"error": "Job stream unavailable, please retry"},
+                                retry_after=RETRY_AFTER_SECONDS)
+            replay = []
+            if after is not None:
+                replay = (await session.execute(job_stream.replay_statement(after, skills or None))).all()
+    except BaseException as e:
+        if subscriber is not None:
+            job_stream.unsubscribe(subscriber)
+        if not isinstance(e, HTTPError):
+            finish_request_stats(started, "GET", 500)
+            raise
+        status, out, data = json_response(headers, e.status, e.body)
+        if e.retry_after is not None:
+            out.append((b"retry-after", str(e.retry_after).encode()))
+        finish_request_stats(started, "GET", status)
+        await send({"type": "http.response.start", "status": status, "headers": out})
+        await send({"type": "http.response.body", "body": data})
+        return
+
+    out = [(b"content-type", b"text/event-stream; charset=utf-8"),
+           (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")] + cors_headers(headers)
+    finish_request_stats(started, "GET", 200)  # like the Flask view: timed until headers
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await send({"type": "http.response.start", "status": 200, "headers": out})
+        chunks = [jobstream.RETRY]
+        if len(replay) > jobstream.SSE_REPLAY_MAX:
+            replayed = set()
+            chunks.append(jobstream.RESET)
+        else:
+            replayed = {row.id for row in replay}
+            chunks += [job_stream.render_event(row) for row in replay]
+        await send({"type": "http.response.body", "body": "".join(chunks).encode(), "more_body": True})
+        while True:
+            getter = asyncio.ensure_future(subscriber.get(jobstream.SSE_HEARTBEAT_SECONDS))
+            await asyncio.wait({getter, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                getter.cancel()
+                return
+            item = getter.result()
+            if item is None:
+                break
+            if item is jobstream.HEARTBEAT:
+                chunk = item
+            elif item[0] not in replayed:
+                chunk = item[1]
+            else:
+                continue
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        disconnected.cancel()
+        job_stream.unsubscribe(subscriber)
+
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+# ------------------------
+# Responses
+# ------------------------
+def cors_headers(headers):
+    out = []
+    origin = headers.get("origin")
+    if origin and FRONTEND_ORIGIN in ("*", origin):
+        out.append((b"access-control-allow-origin", FRONTEND_ORIGIN.encode()))
+        out.append((b"access-control-expose-headers", b"Content-Type"))
+        if FRONTEND_ORIGIN != "*":
+            out.append((b"vary", b"Origin"))
+    return out
+
+
+def json_response(headers, status, body):
+    """(status, header list, bytes) the way the Flask blueprint would build them."""
+    data = dumps(body) + b"\n"
+    out = [(b"content-type", b"application/json")] + cors_headers(headers)
+
+    if status == 200:
+        etag = generate_etag(data)
+        out.append((b"etag", f'W/"{etag}"'.encode()))
+        if parse_etags(headers.get("if-none-match")).contains_weak(etag):
+            return 304, out, b""
+        out.append((b"vary", b"Accept-Encoding"))
+        if (len(data) >= COMPRESS_MIN_BYTES
+                and parse_accept_header(headers.get("accept-encoding"))["gzip"]):
+            data = gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+            out.append((b"content-encoding", b"gzip"))
+    out.append((b"content-length", str(len(data)).encode()))
+    return status, out, data
+
+
+# ------------------------
+# ASGI app
+# ------------------------
+class CrewQuickASGI:
+    def __init__(self, wsgi_app):
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=WSGI_THREADS)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        path = scope.get("path")
+        route = ROUTES.get(path) if scope["type"] == "http" else None
+        if (route is None and path != "/jobs/stream") or scope["method"] != "GET":
+            return await self.wsgi(scope, receive, send)
+        args = MultiDict(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True))
+        understood = route[2] if route else STREAM_ARGS
+        if not set(args) <= understood:
+            return await self.wsgi(scope, receive, send)
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        if route is None:
+            return await stream_jobs(scope, receive, send, headers, args)
+        endpoint, handler, _ = route
+        started = start_request_stats(endpoint)
+        try:
+            claims = jwt_claims(headers)
+            async with sessionmaker()() as session:
+                status, body = 200, await handler(session, claims, args)
+        except HTTPError as e:
+            status, body = e.status, e.body
+        except Exception:
+            finish_request_stats(started, "GET", 500)
+            raise
+        status, out, data = json_response(headers, status, body)
+        finish_request_stats(started, "GET", status)
+        await send({"type": "http.response.start", "status": status, "headers": out})
+        await send({"type": "http.response.body", "body": data})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+app = CrewQuickASGI(flask_app)
@@ -0,0 +1,65 @@
+# backends.py
+"""
+Plumbing shared by the modules with a pluggable store (cache.py,
+ratelimit.py, replicas.py): choosing a backend from a URL setting, the
+Redis connection, and the process-wide instance built on first use.
+
+Backend URLs:
+    ""  / memory://               the module's in-process backend
+    redis://, rediss://, unix://  Redis, or anything speaking its protocol
+                                  (needs the `redis` package)
+
+Redis calls time out after REDIS_TIMEOUT_SECONDS; each module decides what
+a failed call means for it (the cache and the rate limiter fail open).
+"""
+import threading
+
+REDIS_SCHEMES = ("redis", "rediss", "unix")
+REDIS_TIMEOUT_SECONDS = 0.25
+
+
+def from_url(url, setting, memory, redis):
+    """`memory()` for an empty or memory:// URL, `redis(url)` for a Redis one."""
+    if not url or url.startswith("memory://"):
+        return memory()
+    if url.split("://", 1)[0] in REDIS_SCHEMES:
+        return redis(url)
+    raise ValueError(f"Unsupported {setting}: {url}")
+
+
+class RedisStore:
+    """
+    Base for the Redis backends: one client and a key prefix. `client`
+    replaces the connection made from `url`, e.g. with a fake in a harness.
+    """
+
+    prefix = "crewquick:"
+
+    def __init__(self, url=None, client=None, prefix=None):
+        if client is None:
+            import redis  # optional dependency, only needed for these backends
+            client = redis.Redis.from_url(url, socket_timeout=REDIS_TIMEOUT_SECONDS,
+                                          socket_connect_timeout=REDIS_TIMEOUT_SECONDS)
+        self.client = client
+        if prefix is not None:
+            self.prefix = prefix
+
+
+class Shared:
+    """A process-wide backend, built by `build()` the first time it's needed."""
+
+    def __init__(self, build):
+        self._build = build
+        self._backend = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._build()
+        return self._backend
+
+    def set(self, backend):
+        """Swap it out (harnesses, benchmarks)."""
+        self._backend = backend
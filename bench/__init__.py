@@ -0,0 +1,54 @@
+# bench/__init__.py
+"""
+Performance tooling for the CrewQuick API.
+
+Everything in here runs against a scratch Postgres database -- never point
+it at production. Set BENCH_DATABASE_URL (or pass --database-url) and run
+a module directly, e.g.:
+
+    python -m bench.seed --create-schema --scale 1
+    python -m bench.plans
+    python -m bench.load --save baseline.json
+"""
+import os
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def database_url(cli_value=None):
+    url = cli_value or os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        raise SystemExit("Set BENCH_DATABASE_URL or pass --database-url (a scratch database!)")
+    return url
+
+
+def load_app(url):
+    """Import the Flask app bound to `url` instead of DATABASE_URL."""
+    os.environ["DATABASE_URL"] = url
+    from app import app
+    return app
+
+
+@contextmanager
+def recording(engine):
+    """Collect (statement, parameters) for every cursor execute on `engine`."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of a non-empty sequence."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
@@ -0,0 +1,359 @@
+# bench/load.py
+"""
+Fixed-concurrency load test with a stored-baseline comparison.
+
+Each scenario runs for --duration seconds with --concurrency client
+threads, each holding one keep-alive HTTP connection. The first --warmup
+seconds are not recorded. Per scenario it reports p50/p95/p99 latency,
+throughput, status counts and SQL statements per request (read from the
+server's /metrics) as JSON.
+
+    python -m bench.load --save baseline.json
+    # ...change routes.py...
+    python -m bench.load --baseline baseline.json      # exit 1 on regression
+
+Where requests go:
+  * by default, an in-process threaded server on a free port, bound to
+    --database-url / BENCH_DATABASE_URL;
+  * --url http://host:port -- an already-running server. It must use the
+    same database and JWT_SECRET_KEY, and a single process, so that its
+    /metrics sees every request.
+
+Where the data comes from:
+  * --local-postgres starts a throwaway cluster (see bench/postgres.py);
+  * --restore-dump crewquick.dump loads the production dump first;
+  * otherwise an empty database is created and seeded with bench.seed at
+    --scale. A non-empty one is used as it is.
+
+Response caching is disabled (CACHE_TTL=0) unless --cache is given, so the
+numbers reflect the routes rather than the cache, and so is rate limiting
+(RATELIMIT_ENABLED=0); a --url server needs both set in its own
+environment. signup and apply write rows; point this at a scratch
+database.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from bench import REPO_ROOT, database_url, percentile
+from bench.postgres import LocalPostgres, restore_dump
+from bench.seed import COORDINATES, SEED_PASSWORD, sizes
+
+DEFAULT_SCENARIOS = ("signup", "login", "feed", "feed_search", "feed_near", "apply",
+                     "me", "me_applications", "admin_users", "admin_jobs")
+
+_STATEMENTS = re.compile(
+    r'^crewquick_http_request_db_statements_(sum|count)\{endpoint="[^"]+"\} (\S+)$', re.M)
+
+
+# ------------------------
+# Fixtures and scenarios
+# ------------------------
+def fixtures(conn):
+    from sqlalchemy import text
+
+    workers = conn.execute(text("""
+        SELECT u.id, u.email, w.id FROM users u JOIN workers w ON w.user_id = u.id
+        ORDER BY u.id LIMIT 500
+    """)).all()
+    contractor = conn.execute(text("SELECT user_id, id FROM contractors ORDER BY id LIMIT 1")).one()
+    admin = conn.execute(text("SELECT id FROM users WHERE role = 'admin' ORDER BY id LIMIT 1")).scalar()
+    jobs = conn.execute(text("SELECT id FROM jobs ORDER BY id LIMIT 5000")).scalars().all()
+    if not (workers and jobs and admin):
+        raise SystemExit("Database needs workers, jobs and an admin user (run bench.seed).")
+    return {"workers": workers, "contractor": contractor, "admin": admin, "jobs": jobs}
+
+
+def scenarios(fx, tokens):
+    """name -> fn(rng) returning (method, path, json body or None, token or None)."""
+    signups = itertools.count()
+    run = f"{os.getpid()}-{int(time.time())}"
+
+    def worker_token(rng):
+        return rng.choice(tokens["workers"])
+
+    return {
+        "signup": lambda rng: ("POST", "/signup", {
+            "email": f"load-{run}-{next(signups)}@bench.crewquick.test", "password": "pw",
+            "role": "worker", "name": "Load Test"}, None),
+        "login": lambda rng: ("POST", "/login", {
+            "email": rng.choice(fx["workers"])[1], "password": SEED_PASSWORD}, None),
+        "feed": lambda rng: ("GET", "/jobs?per_page=20", None, worker_token(rng)),
+        "feed_search": lambda rng: ("GET", "/jobs?q=" + rng.choice(["roofing", "tile", "concrete crew"]),
+                                    None, worker_token(rng)),
+        "feed_near": lambda rng: ("GET", "/jobs?near={},{}&radius_km=25".format(*rng.choice(COORDINATES)),
+                                  None, worker_token(rng)),
+        "apply": lambda rng: ("POST", f"/jobs/{rng.choice(fx['jobs'])}/apply", None, worker_token(rng)),
+        "me": lambda rng: ("GET", "/me", None, worker_token(rng)),
+        "me_applications": lambda rng: ("GET", "/me/applications", None, worker_token(rng)),
+        "admin_users": lambda rng: ("GET", "/admin/users?format=ndjson", None, tokens["admin"]),
+        "admin_jobs": lambda rng: ("GET", "/admin/jobs?format=ndjson&fields=id,title", None, tokens["admin"]),
+    }
+
+
+# ------------------------
+# Driver
+# ------------------------
+def statements_seen(host, port):
+    """(sum, count) of per-request statement counts across all endpoints."""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        conn.request("GET", "/metrics")
+        body = conn.getresponse().read().decode()
+    finally:
+        conn.close()
+    totals = {"sum": 0.0, "count": 0.0}
+    for kind, value in _STATEMENTS.findall(body):
+        totals[kind] += float(value)
+    return totals["sum"], totals["count"]
+
+
+def run_scenario(host, port, make_request, concurrency, duration, warmup, seed):
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+    latencies, statuses, errors = [], Counter(), Counter()
+    lock = threading.Lock()
+
+    def client(i):
+        rng = random.Random(seed * 1000 + i)
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        mine, my_statuses, my_errors = [], Counter(), Counter()
+        while True:
+            t0 = time.perf_counter()
+            if t0 >= stop_at:
+                break
+            method, path, body, token = make_request(rng)
+            headers = {"Content-Type": "application/json"}
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+            try:
+                conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                             headers=headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException) as e:
+                my_errors[type(e).__name__] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+                continue
+            if t0 >= measure_from:
+                mine.append(time.perf_counter() - t0)
+                my_statuses[response.status] += 1
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            statuses.update(my_statuses)
+            errors.update(my_errors)
+
+    before = statements_seen(host, port)
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    after = statements_seen(host, port)
+
+    executed, requests = after[0] - before[0], after[1] - before[1]
+    ms = [x * 1000 for x in latencies] or [0.0]
+    server_errors = sum(n for code, n in statuses.items() if code >= 500)
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / duration, 1),
+        "latency_ms": {
+            "p50": round(percentile(ms, 50), 2),
+            "p95": round(percentile(ms, 95), 2),
+            "p99": round(percentile(ms, 99), 2),
+            "max": round(max(ms), 2),
+        },
+        "queries_per_request": round(executed / requests, 2) if requests else None,
+        "status": {str(k): v for k, v in sorted(statuses.items())},
+        "errors": server_errors + sum(errors.values()),
+        "connection_errors": dict(errors),
+    }
+
+
+# ------------------------
+# Baseline comparison
+# ------------------------
+def compare(current, baseline, tolerance):
+    """Print a comparison table; return the names of regressed scenarios."""
+    regressed = []
+    print(f"\n{'scenario':18} {'p95 ms':>18} {'rps':>18} {'queries/req':>14}", file=sys.stderr)
+    for name, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        p95, base_p95 = cur["latency_ms"]["p95"], base["latency_ms"]["p95"]
+        rps, base_rps = cur["throughput_rps"], base["throughput_rps"]
+        qpr, base_qpr = cur["queries_per_request"] or 0, base["queries_per_request"] or 0
+        problems = []
+        if base_p95 and p95 > base_p95 * (1 + tolerance):
+            problems.append("p95")
+        if base_rps and rps < base_rps * (1 - tolerance):
+            problems.append("throughput")
+        # Caches (identity, responses) make this fractional and a little
+        # noisy; an N+1 shows up as whole extra statements per request.
+        if qpr > base_qpr + 0.5:
+            problems.append("queries")
+        if cur["errors"] > base["errors"]:
+            problems.append("errors")
+        if problems:
+            regressed.append(name)
+        print(f"{name:18} {base_p95:>8} -> {p95:<8} {base_rps:>8} -> {rps:<8} {base_qpr:>5} -> {qpr:<6}"
+              f" {'REGRESSED: ' + ', '.join(problems) if problems else 'ok'}", file=sys.stderr)
+    return regressed
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ------------------------
+# Main
+# ------------------------
+def prepare_database(url, scale):
+    """Create + seed an empty database; leave a populated one alone."""
+    from sqlalchemy import inspect, text
+
+    from bench.seed import is_empty, seed
+    from extensions import db
+    import models  # noqa: F401  (register tables on db.metadata)
+
+    if not inspect(db.engine).has_table("users"):
+        db.create_all()
+    with db.engine.begin() as conn:
+        if not is_empty(conn):
+            return False
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        seed(conn, scale)
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SET statement_timeout = 0"))
+        conn.execute(text("VACUUM ANALYZE"))
+    return True
+
+
+def benchmark(args, url):
+    os.environ["DATABASE_URL"] = url
+    if not args.cache:
+        os.environ["CACHE_TTL"] = "0"
+    # All clients share one address; the limits would cap signup/login.
+    os.environ.setdefault("RATELIMIT_ENABLED", "0")
+    if args.hash_method:
+        os.environ["PASSWORD_HASH_METHOD"] = args.hash_method
+    if args.restore_dump:
+        restore_dump(url, args.restore_dump)
+
+    from bench import load_app
+    app = load_app(url)
+    from flask_jwt_extended import create_access_token
+    from extensions import db
+
+    with app.app_context():
+        seeded = prepare_database(url, args.scale)
+        with db.engine.connect() as conn:
+            fx = fixtures(conn)
+        tokens = {
+            "workers": [create_access_token(str(uid), additional_claims={"role": "worker", "worker_id": wid})
+                        for uid, _, wid in fx["workers"]],
+            "admin": create_access_token(str(fx["admin"]), additional_claims={"role": "admin"}),
+        }
+
+    server = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        from werkzeug.serving import make_server
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = "127.0.0.1", server.server_port
+
+    available = scenarios(fx, tokens)
+    unknown = set(args.scenarios) - set(available)
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    report = {
+        "meta": {
+            "git": git_revision(),
+            "when": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "target": args.url or "in-process",
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "scale": args.scale if seeded else None,
+            "rows": sizes(args.scale) if seeded else None,
+            "cache": args.cache,
+        },
+        "scenarios": {},
+    }
+    try:
+        for i, name in enumerate(args.scenarios):
+            print(f"running {name} ...", file=sys.stderr)
+            report["scenarios"][name] = run_scenario(
+                host, port, available[name], args.concurrency, args.duration, args.warmup, seed=i)
+    finally:
+        if server is not None:
+            server.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url")
+    parser.add_argument("--local-postgres", action="store_true", help="run against a throwaway local cluster")
+    parser.add_argument("--restore-dump", metavar="PATH", help="pg_restore this dump first (e.g. crewquick.dump)")
+    parser.add_argument("--scale", type=float, default=0.2, help="bench.seed scale for an empty database")
+    parser.add_argument("--url", help="benchmark an already-running server instead of an in-process one")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unrecorded seconds per scenario")
+    parser.add_argument("-s", "--scenarios", nargs="+", default=list(DEFAULT_SCENARIOS))
+    parser.add_argument("--hash-method", help="PASSWORD_HASH_METHOD for the in-process server")
+    parser.add_argument("--cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--save", metavar="PATH", help="write the JSON report here")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved report")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed relative p95 / throughput change before flagging (default 0.10)")
+    args = parser.parse_args()
+
+    if args.local_postgres:
+        with LocalPostgres() as pg:
+            report = benchmark(args, pg.url)
+    else:
+        report = benchmark(args, database_url(args.database_url))
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.save:
+        with open(args.save, "w") as f:
+            f.write(output + "\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressed = compare(report, json.load(f), args.tolerance)
+        if regressed:
+            print(f"\nRegressed: {', '.join(regressed)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
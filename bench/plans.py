@@ -0,0 +1,166 @@
+# bench/plans.py
+"""
+Query-plan regression check.
+
+Drives each route through the Flask test client, records every SQL
+statement it sends, then runs EXPLAIN on each one (same parameters) against
+a seeded database. A hot route fails the check if any of its statements
+plans a sequential scan over one of our tables. Exits non-zero on failure,
+so it can run in CI after `python -m bench.seed`.
+"""
+import argparse
+import json
+import sys
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+
+from bench import database_url, load_app, recording
+from bench.seed import ADMIN_EMAIL, SEED_PASSWORD, is_empty
+
+TABLES = {"users", "workers", "contractors", "jobs", "job_applications", "job_matches",
+          "match_queue"}
+
+
+def fixtures(conn):
+    """Ids of real rows to aim requests at (deterministic for a given seed)."""
+    row = conn.execute(text("""
+        SELECT (SELECT user_id FROM workers ORDER BY id LIMIT 1 OFFSET 100),
+               (SELECT user_id FROM contractors ORDER BY id LIMIT 1 OFFSET 10),
+               (SELECT id FROM users WHERE role = 'admin' LIMIT 1),
+               (SELECT email FROM users WHERE role = 'worker' ORDER BY id LIMIT 1 OFFSET 50),
+               (SELECT id FROM jobs ORDER BY id DESC LIMIT 1),
+               (SELECT id FROM jobs ORDER BY id LIMIT 1 OFFSET 5000),
+               (SELECT j.id FROM jobs j JOIN contractors c ON c.id = j.contractor_id
+                WHERE c.id = (SELECT id FROM contractors ORDER BY id LIMIT 1 OFFSET 10)
+                ORDER BY j.id LIMIT 1)
+    """)).one()
+    return dict(zip(
+        ["worker_user", "contractor_user", "admin_user", "worker_email",
+         "latest_job", "old_job", "contractor_job"], row))
+
+
+def routes(fx, client, tokens):
+    """(name, hot, callable) for every route in routes.py worth checking."""
+    worker, contractor, admin = tokens["worker"], tokens["contractor"], tokens["admin"]
+
+    def get(path, token):
+        return lambda: client.get(path, headers={"Authorization": f"Bearer {token}"})
+
+    def post(path, token, body=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return lambda: client.post(path, json=body or {}, headers=headers)
+
+    def deep_feed():
+        # Walk a few pages in, then check the plan of a deep page.
+        cursor = None
+        for _ in range(5):
+            r = client.get("/jobs" + (f"?cursor={cursor}" if cursor else ""),
+                           headers={"Authorization": f"Bearer {worker}"})
+            cursor = r.get_json()["next_cursor"]
+        return client.get(f"/jobs?cursor={cursor}", headers={"Authorization": f"Bearer {worker}"})
+
+    return [
+        ("POST /login", True, post("/login", None,
+                                   {"email": fx["worker_email"], "password": SEED_PASSWORD})),
+        ("POST /signup (duplicate email)", True, post("/signup", None, {
+            "email": ADMIN_EMAIL, "password": "x", "role": "worker", "name": "x"})),
+        ("GET /jobs", True, get("/jobs", worker)),
+        ("GET /jobs (deep cursor)", True, deep_feed),
+        ("GET /jobs?q=", True, get("/jobs?q=roofing", worker)),
+        ("GET /jobs?near=", True, get("/jobs?near=30.2672,-97.7431&radius_km=25", worker)),
+        ("GET /jobs/<id>", True, get(f"/jobs/{fx['latest_job']}", worker)),
+        ("GET /jobs/search", True, get("/jobs/search?skills=welding,masonry&match=all", worker)),
+        ("POST /jobs", True, post("/jobs", contractor, {
+            "title": "Plan check", "description": "EXPLAIN me", "location": "Austin, TX"})),
+        ("POST /jobs/bulk", True, post("/jobs/bulk", contractor, [
+            {"title": f"Plan check {i}", "description": "EXPLAIN me", "location": "Austin, TX"}
+            for i in range(50)])),
+        ("POST /jobs/<id>/apply", True, post(f"/jobs/{fx['old_job']}/apply", worker)),
+        ("GET /me", True, get("/me", worker)),
+        ("GET /me (contractor)", True, get("/me", contractor)),
+        ("GET /me/applications", True, get("/me/applications", worker)),
+        ("GET /me/recommended-jobs", True, get("/me/recommended-jobs", worker)),
+        ("GET /me/jobs", True, get("/me/jobs", contractor)),
+        ("GET /me/jobs/<id>/applicants", True,
+         get(f"/me/jobs/{fx['contractor_job']}/applicants", contractor)),
+        ("GET /admin/users", True, get("/admin/users", admin)),
+        ("GET /admin/jobs", True, get("/admin/jobs", admin)),
+        # Full-table exports: a seq scan is the right plan for these.
+        ("GET /admin/jobs?format=ndjson", False, get("/admin/jobs?format=ndjson", admin)),
+        ("GET /admin/users?format=csv", False, get("/admin/users?format=csv", admin)),
+    ]
+
+
+def seq_scans(plan):
+    """Yield relation names of every Seq Scan node in an EXPLAIN JSON plan."""
+    if plan.get("Node Type") in ("Seq Scan", "Parallel Seq Scan"):
+        yield plan.get("Relation Name")
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+def explain(conn, statement, parameters):
+    head = statement.lstrip().split(None, 1)[0].upper()
+    if head not in ("SELECT", "WITH", "UPDATE", "DELETE"):
+        return None
+    result = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+    plan = result.scalar()
+    return (plan if isinstance(plan, list) else json.loads(plan))[0]["Plan"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    app = load_app(database_url(args.database_url))
+    from extensions import db
+
+    failures = []
+    with app.app_context():
+        with db.engine.connect() as conn:
+            if is_empty(conn):
+                raise SystemExit("Database is empty; run `python -m bench.seed` first.")
+            fx = fixtures(conn)
+
+        tokens = {
+            "worker": create_access_token(str(fx["worker_user"]), additional_claims={"role": "worker"}),
+            "contractor": create_access_token(str(fx["contractor_user"]), additional_claims={"role": "contractor"}),
+            "admin": create_access_token(str(fx["admin_user"]), additional_claims={"role": "admin"}),
+        }
+        client = app.test_client()
+
+        for name, hot, call in routes(fx, client, tokens):
+            with recording(db.engine) as statements:
+                response = call()
+                response.get_data()  # drain streamed exports before we stop recording
+                response.close()
+            scans = set()
+            with db.engine.connect() as conn:
+                for statement, parameters in statements:
+                    plan = explain(conn, statement, parameters)
+                    if plan is None:
+                        continue
+                    found = {t for t in seq_scans(plan) if t in TABLES}
+                    if found and args.verbose:
+                        print(f"    {' '.join(statement.split())[:160]}")
+                    scans |= found
+
+            status = "ok"
+            if scans and hot:
+                status = "FAIL"
+                failures.append(name)
+            elif scans:
+                status = "ok (seq scan allowed)"
+            print(f"{status:22} {name:34} HTTP {response.status_code}  "
+                  f"{len(statements)} stmt(s)  seq scans: {', '.join(sorted(scans)) or '-'}")
+
+    if failures:
+        print(f"\n{len(failures)} hot route(s) fell back to a sequential scan: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
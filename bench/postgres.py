@@ -0,0 +1,76 @@
+# bench/postgres.py
+"""
+A throwaway local Postgres for benchmark runs, and dump restores.
+
+LocalPostgres runs initdb into a temporary directory, starts the server
+listening on a Unix socket only, creates one database, and removes it all
+again on exit. It needs the PostgreSQL server binaries (initdb, pg_ctl) on
+PATH, or PG_BINDIR pointing at them.
+
+restore_dump loads crewquick.dump (pg_restore custom format) and then
+brings the schema up to date with our migrations. pg_restore must be at
+least the version that wrote the dump.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+
+from bench import REPO_ROOT
+
+BASELINE_REVISION = "782c54f35c1e"  # the schema crewquick.dump was taken at
+
+
+def _bin(name):
+    bindir = os.getenv("PG_BINDIR")
+    path = os.path.join(bindir, name) if bindir else shutil.which(name)
+    if not path or not os.path.exists(path):
+        raise SystemExit(f"{name} not found; put the PostgreSQL binaries on PATH or set PG_BINDIR")
+    return path
+
+
+class LocalPostgres:
+    def __init__(self, dbname="crewquick_bench"):
+        self.dbname = dbname
+        self.dir = None
+        self.url = None
+
+    def __enter__(self):
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            raise SystemExit("initdb refuses to run as root; run as an unprivileged user "
+                             "or pass --database-url")
+        self.dir = tempfile.mkdtemp(prefix="crewquick-pg-")
+        data = os.path.join(self.dir, "data")
+        run = lambda *cmd: subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        run(_bin("initdb"), "-D", data, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-sync")
+        run(_bin("pg_ctl"), "-D", data, "-l", os.path.join(self.dir, "server.log"), "-w",
+            "-o", f"-k {self.dir} -c listen_addresses=''", "start")
+        run(_bin("createdb"), "-h", self.dir, "-U", "postgres", self.dbname)
+        self.url = f"postgresql://postgres@/{self.dbname}?host={self.dir}"
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.run([_bin("pg_ctl"), "-D", os.path.join(self.dir, "data"), "-m", "fast", "-w", "stop"],
+                       stdout=subprocess.DEVNULL)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def restore_dump(url, path):
+    """pg_restore `path` into `url`, then run migrations past the baseline."""
+    from sqlalchemy.engine import make_url
+
+    u = make_url(url)
+    env = dict(os.environ, PGPASSWORD=u.password or "")
+    cmd = [_bin("pg_restore"), "--no-owner", "--no-privileges", "--exit-on-error",
+           "-U", u.username or "postgres", "-d", u.database]
+    host = u.host or u.query.get("host")
+    if host:
+        cmd += ["-h", host]
+    if u.port:
+        cmd += ["-p", str(u.port)]
+    subprocess.run(cmd + [path], check=True, env=env)
+
+    env["DATABASE_URL"] = url
+    for args in (["stamp", BASELINE_REVISION], ["upgrade", "head"]):
+        subprocess.run(["alembic", *args], check=True, cwd=REPO_ROOT, env=env,
+                       stdout=subprocess.DEVNULL)
@@ -0,0 +1,142 @@
+# bench/querycount.py
+"""
+N+1 guard: SQL statements per request must not grow with the data.
+
+For each per-user list endpoint, builds a throwaway user owning N rows
+(N = 1, 10, 50, 100), requests one page, and counts the statements sent.
+Any scenario whose count changes with N fails the run (exit 1). All rows it
+creates are deleted again.
+"""
+import argparse
+import sys
+import uuid
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+
+from bench import database_url, load_app, recording
+
+SIZES = (1, 10, 50, 100)
+
+
+def make_owner(conn, n):
+    """
+    A contractor with n jobs and a worker who applied to (and is matched
+    with) all of them, plus n - 1 more workers who applied to the
+    contractor's newest job.
+    """
+    tag = uuid.uuid4().hex[:10]
+    ids = conn.execute(text("""
+        WITH cu AS (INSERT INTO users (email, password_hash, role)
+                    VALUES ('qc-c-' || :tag || '@bench.crewquick.test', 'x', 'contractor') RETURNING id),
+             wu AS (INSERT INTO users (email, password_hash, role)
+                    VALUES ('qc-w-' || :tag || '@bench.crewquick.test', 'x', 'worker') RETURNING id),
+             c AS (INSERT INTO contractors (user_id, business_name)
+                   SELECT id, 'QC ' || :tag FROM cu RETURNING id, user_id),
+             w AS (INSERT INTO workers (user_id, name, skills)
+                   SELECT id, 'QC ' || :tag, ARRAY['carpentry'] FROM wu RETURNING id, user_id)
+        SELECT c.id, c.user_id, w.id, w.user_id FROM c, w
+    """), {"tag": tag}).one()
+    contractor_id, contractor_user, worker_id, worker_user = ids
+    conn.execute(text("""
+        WITH j AS (
+            INSERT INTO jobs (contractor_id, title, description, location, required_skills, created_at)
+            SELECT :cid, 'QC job ' || g, 'Query count fixture', 'Austin, TX',
+                   CAST(ARRAY['carpentry'] AS varchar[]), now() - g * interval '1 minute'
+            FROM generate_series(1, :n) g
+            RETURNING id
+        ),
+        m AS (
+            INSERT INTO job_matches (worker_id, job_id, score, computed_at)
+            SELECT :wid, id, 1.0 / id, now() FROM j
+        )
+        INSERT INTO job_applications (worker_id, job_id) SELECT :wid, id FROM j
+    """), {"cid": contractor_id, "wid": worker_id, "n": n})
+    applicant_users = conn.execute(text("""
+        INSERT INTO users (email, password_hash, role)
+        SELECT 'qc-a-' || :tag || '-' || g || '@bench.crewquick.test', 'x', 'worker'
+        FROM generate_series(2, :n) g
+        RETURNING id
+    """), {"tag": tag, "n": n}).scalars().all()
+    newest_job = conn.execute(text(
+        "SELECT id FROM jobs WHERE contractor_id = :cid ORDER BY created_at DESC LIMIT 1"
+    ), {"cid": contractor_id}).scalar()
+    conn.execute(text("""
+        WITH w AS (INSERT INTO workers (user_id, name, skills)
+                   SELECT id, 'QC applicant', ARRAY['welding'] FROM unnest(CAST(:ids AS int[])) id
+                   RETURNING id)
+        INSERT INTO job_applications (worker_id, job_id) SELECT id, :job FROM w
+    """), {"ids": applicant_users, "job": newest_job})
+    return {
+        "worker": create_access_token(str(worker_user), additional_claims={
+            "role": "worker", "worker_id": worker_id}),
+        "contractor": create_access_token(str(contractor_user), additional_claims={
+            "role": "contractor", "contractor_id": contractor_id}),
+        "job": newest_job,
+        "users": (contractor_user, worker_user, *applicant_users),
+    }
+
+
+def drop(conn, user_ids):
+    # Explicit order: schemas built with db.create_all() have no ON DELETE CASCADE.
+    params = {"ids": list(user_ids)}
+    for sql in (
+        "DELETE FROM job_matches WHERE worker_id IN "
+        "(SELECT id FROM workers WHERE user_id = ANY(:ids))",
+        "DELETE FROM job_applications WHERE worker_id IN "
+        "(SELECT id FROM workers WHERE user_id = ANY(:ids))",
+        "DELETE FROM jobs WHERE contractor_id IN "
+        "(SELECT id FROM contractors WHERE user_id = ANY(:ids))",
+        "DELETE FROM workers WHERE user_id = ANY(:ids)",
+        "DELETE FROM contractors WHERE user_id = ANY(:ids)",
+        "DELETE FROM users WHERE id = ANY(:ids)",
+    ):
+        conn.execute(text(sql), params)
+
+
+SCENARIOS = [
+    ("GET /me/applications", "worker", "/me/applications?per_page=100"),
+    ("GET /me/recommended-jobs", "worker", "/me/recommended-jobs?per_page=100"),
+    ("GET /me/jobs", "contractor", "/me/jobs?per_page=100"),
+    ("GET /me/jobs/<id>/applicants", "contractor", "/me/jobs/{job}/applicants?per_page=100"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    app = load_app(database_url(args.database_url))
+    from extensions import db
+
+    failed = []
+    with app.app_context():
+        client = app.test_client()
+        for name, who, path in SCENARIOS:
+            counts = {}
+            for n in SIZES:
+                with db.engine.begin() as conn:
+                    owner = make_owner(conn, n)
+                try:
+                    with recording(db.engine) as statements:
+                        response = client.get(path.format(**owner), headers={"Authorization": f"Bearer {owner[who]}"})
+                    if response.status_code != 200:
+                        raise SystemExit(f"{name}: HTTP {response.status_code} {response.get_json()}")
+                    counts[n] = len(statements)
+                finally:
+                    with db.engine.begin() as conn:
+                        drop(conn, owner["users"])
+            constant = len(set(counts.values())) == 1
+            if not constant:
+                failed.append(name)
+            detail = "  ".join(f"N={n}: {c}" for n, c in counts.items())
+            print(f"{'ok' if constant else 'FAIL':5} {name:30} {detail}")
+
+    if failed:
+        print(f"\nStatement count grows with row count: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# bench/replicas.py
+"""
+Read-replica routing check (replicas.py) against two local Postgres
+instances: a primary and a streaming standby of it.
+
+    pg_basebackup -h <primary socket dir> -U postgres -D standby -R
+    pg_ctl -D standby -o "-k <standby socket dir> -p 5433" start
+    python -m bench.replicas --database-url <primary> --replica-url <standby>
+
+With the standby's WAL replay paused (pg_wal_replay_pause()), a worker
+applies to a job and a contractor posts one, and the run checks where each
+following read went: the writer's own reads go to the primary, other users
+keep reading the replica, and shared (cached) views go to the primary only
+after the write to a table they read (jobs, not job_applications); once
+replay resumes and catches up, the contractor is back on the replica. A worker who signs up while replay is
+paused must be able to log in and load /me (the identity lookup reads the
+primary). Exits 1 if any check fails. The throwaway users and jobs it
+creates are deleted again.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+from sqlalchemy import create_engine, text
+
+from bench import database_url, load_app, recording
+from bench.querycount import drop, make_owner
+
+# The one query a routing decision may send to a lagging replica.
+LSN_CHECK = "pg_last_wal_replay_lsn"
+CATCH_UP_SECONDS = 30
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="the primary")
+    parser.add_argument("--replica-url", required=True, help="a streaming standby of the primary")
+    args = parser.parse_args()
+
+    primary_url = database_url(args.database_url)
+    os.environ["DATABASE_REPLICA_URLS"] = args.replica_url
+    # Long enough that the marker can't expire while replay is paused.
+    os.environ["REPLICA_STICKY_SECONDS"] = "300"
+    # Cheap hashes, hashed in-process, and no throttling of our own signups.
+    os.environ["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1"
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+    os.environ.setdefault("RATELIMIT_ENABLED", "0")
+    app = load_app(primary_url)
+    from extensions import db
+    import replicas
+
+    standby = create_engine(args.replica_url, isolation_level="AUTOCOMMIT")
+    with standby.connect() as conn:
+        if not conn.execute(text("SELECT pg_is_in_recovery()")).scalar():
+            raise SystemExit("--replica-url is not a standby (pg_is_in_recovery() is false)")
+
+    failed = []
+    with app.app_context():
+        client = app.test_client()
+        (replica,) = replicas.replica_engines(db)
+
+        def check(name, token, method, path, expect, **kwargs):
+            with recording(db.engine) as on_primary, recording(replica) as on_replica:
+                response = client.open(path, method=method, headers={"Authorization": f"Bearer {token}"},
+                                       **kwargs)
+            if response.status_code >= 300:
+                raise SystemExit(f"{name}: HTTP {response.status_code} {response.get_json()}")
+            reads = [s for s, _ in on_replica if LSN_CHECK not in s]
+            got = "replica" if reads and not on_primary else "primary" if on_primary and not reads else "both"
+            ok = got == expect
+            if not ok:
+                failed.append(name)
+            print(f"{'ok' if ok else 'FAIL':5} {name:55} expected {expect:8} got {got}")
+            return response
+
+        def wait_for_replay():
+            with db.engine.connect() as conn:
+                lsn = conn.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+            deadline = time.monotonic() + CATCH_UP_SECONDS
+            with standby.connect() as conn:
+                while not conn.execute(text("SELECT pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn)"),
+                                       {"lsn": lsn}).scalar():
+                    if time.monotonic() > deadline:
+                        raise SystemExit(f"standby did not replay to {lsn} in {CATCH_UP_SECONDS}s")
+                    time.sleep(0.1)
+
+        with db.engine.begin() as conn:
+            owner = make_owner(conn, 5)
+            applicant = make_owner(conn, 1)
+        worker, contractor = owner["worker"], owner["contractor"]
+        users = list(owner["users"]) + list(applicant["users"])
+        try:
+            wait_for_replay()
+            check("worker GET /me/applications", worker, "GET", "/me/applications", "replica")
+            check("contractor GET /me/jobs", contractor, "GET", "/me/jobs", "replica")
+
+            with standby.connect() as conn:
+                conn.execute(text("SELECT pg_wal_replay_pause()"))
+            try:
+                check("other worker POST /jobs/<id>/apply", applicant["worker"], "POST",
+                      f"/jobs/{owner['job']}/apply", "primary")
+                check("other worker GET /me/applications, replay paused", applicant["worker"],
+                      "GET", "/me/applications", "primary")
+                check("worker GET /jobs/<id> (shared) after an application", worker, "GET",
+                      f"/jobs/{owner['job']}", "replica")
+
+                job = check("contractor POST /jobs", contractor, "POST", "/jobs", "primary",
+                            json={"title": "Replica check", "description": "Routing fixture",
+                                  "location": "Austin, TX"}).get_json()
+                check("contractor GET /me/jobs, replay paused", contractor, "GET", "/me/jobs",
+                      "primary")
+                check("worker GET /me/applications, replay paused", worker, "GET",
+                      "/me/applications", "replica")
+                check("worker GET /jobs/<new id> (shared), replay paused", worker, "GET",
+                      f"/jobs/{job['job_id']}", "primary")
+
+                email = f"rp-{uuid.uuid4().hex[:10]}@bench.crewquick.test"
+                signup = client.post("/signup", json={"email": email, "password": "pw",
+                                                      "role": "worker", "name": "Replica check"})
+                if signup.status_code != 200:
+                    raise SystemExit(f"signup: HTTP {signup.status_code} {signup.get_json()}")
+                users.append(signup.get_json()["user_id"])
+                login = client.post("/login", json={"email": email, "password": "pw"})
+                if login.status_code != 200:
+                    raise SystemExit(f"login: HTTP {login.status_code} {login.get_json()}")
+                check("new worker GET /me, replay paused", login.get_json()["access_token"],
+                      "GET", "/me", "primary")
+            finally:
+                with standby.connect() as conn:
+                    conn.execute(text("SELECT pg_wal_replay_resume()"))
+
+            wait_for_replay()
+            check("contractor GET /me/jobs, replay caught up", contractor, "GET", "/me/jobs",
+                  "replica")
+        finally:
+            with db.engine.begin() as conn:
+                drop(conn, users)
+
+    if failed:
+        print(f"\nRouted to the wrong database: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
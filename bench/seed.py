@@ -0,0 +1,166 @@
+# bench/seed.py
+"""
+Deterministic bulk seeding of a scratch database.
+
+Rows are generated server-side with generate_series, and every value is a
+pure function of the row number, so two runs at the same scale produce the
+same data. Scale 1 is roughly production-shaped: 20k users, 100k jobs and
+300k applications.
+"""
+import argparse
+import os
+
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+
+from bench import database_url, load_app
+from geo import PLACE_KEY_SQL
+
+SEED_PASSWORD = "bench-password"
+ADMIN_EMAIL = "admin@bench.crewquick.test"
+
+SKILLS = [
+    "carpentry", "drywall", "electrical", "plumbing", "roofing", "painting",
+    "framing", "concrete", "landscaping", "hvac", "tiling", "demolition",
+    "welding", "masonry", "flooring", "insulation", "forklift", "cleanup",
+]
+LOCATIONS = [
+    "Austin, TX", "Dallas, TX", "Houston, TX", "San Antonio, TX", "Phoenix, AZ",
+    "Denver, CO", "Atlanta, GA", "Charlotte, NC", "Nashville, TN", "Orlando, FL",
+]
+# (lat, lng) of each LOCATIONS entry, loaded into geocodes.
+COORDINATES = [
+    (30.2672, -97.7431), (32.7767, -96.7970), (29.7604, -95.3698), (29.4241, -98.4936),
+    (33.4484, -112.0740), (39.7392, -104.9903), (33.7490, -84.3880), (35.2271, -80.8431),
+    (36.1627, -86.7816), (28.5383, -81.3792),
+]
+TITLES = [
+    "General labor", "Site cleanup crew", "Framing helper", "Drywall hanger",
+    "Roofing crew member", "Electrician's helper", "Concrete finisher",
+    "Painter", "Landscaping crew", "Tile setter",
+]
+DESCRIPTION = (
+    "Join our crew for a {title} shift. Bring boots, gloves and eye protection; "
+    "we provide hard hats and tools on site. Parking is available next to the "
+    "trailer. Expect lifting up to 50 lbs, ladder work and a mid-day break. "
+    "Pay is daily, same-day via the app, with a bonus for finishing early. "
+)
+
+
+def sizes(scale):
+    return {
+        "users": int(20_000 * scale),
+        "jobs": int(100_000 * scale),
+        "applications": int(300_000 * scale),
+    }
+
+
+def seed(conn, scale=1.0):
+    """Fill an empty schema. `conn` is a SQLAlchemy Connection in a transaction."""
+    n = sizes(scale)
+    params = {
+        "hash": generate_password_hash(SEED_PASSWORD),
+        "skills": SKILLS, "locations": LOCATIONS, "titles": TITLES,
+        "lats": [lat for lat, _ in COORDINATES], "lngs": [lng for _, lng in COORDINATES],
+        "description": DESCRIPTION, "admin": ADMIN_EMAIL, **n,
+    }
+
+    # Every 5th user is a contractor, the rest are workers.
+    conn.execute(text("""
+        INSERT INTO users (email, password_hash, role, created_at)
+        SELECT 'user' || g || '@bench.crewquick.test', :hash,
+               CASE WHEN g % 5 = 0 THEN 'contractor' ELSE 'worker' END,
+               timestamp '2025-01-01' + g * interval '7 minutes'
+        FROM generate_series(1, :users) g
+    """), params)
+    conn.execute(text("""
+        INSERT INTO users (email, password_hash, role) VALUES (:admin, :hash, 'admin')
+    """), params)
+    conn.execute(text("""
+        INSERT INTO workers (user_id, name, location, skills, transportation, created_at)
+        SELECT u.id, 'Worker ' || u.id,
+               (CAST(:locations AS text[]))[1 + u.id % 10],
+               ARRAY[(CAST(:skills AS text[]))[1 + u.id % 18],
+                     (CAST(:skills AS text[]))[1 + (u.id * 7) % 18],
+                     (CAST(:skills AS text[]))[1 + (u.id * 13) % 18]],
+               CASE WHEN u.id % 3 = 0 THEN 'public transit' ELSE 'own vehicle' END,
+               u.created_at
+        FROM users u WHERE u.role = 'worker'
+    """), params)
+    conn.execute(text("""
+        INSERT INTO contractors (user_id, business_name, location, phone, created_at)
+        SELECT u.id, 'Contractor ' || u.id || ' LLC',
+               (CAST(:locations AS text[]))[1 + u.id % 10],
+               '555-' || lpad((u.id % 10000)::text, 4, '0'), u.created_at
+        FROM users u WHERE u.role = 'contractor'
+    """), params)
+    conn.execute(text("""
+        WITH c AS (SELECT array_agg(id ORDER BY id) AS ids FROM contractors)
+        INSERT INTO jobs (contractor_id, title, description, location, required_skills, created_at)
+        SELECT c.ids[1 + g % cardinality(c.ids)],
+               (CAST(:titles AS text[]))[1 + g % 10],
+               replace(repeat(:description, 1 + g % 4), '{title}',
+                       lower((CAST(:titles AS text[]))[1 + g % 10])),
+               (CAST(:locations AS text[]))[1 + (g * 3) % 10],
+               CAST(ARRAY[(CAST(:skills AS text[]))[1 + g % 18],
+                          (CAST(:skills AS text[]))[1 + (g * 5) % 18]] AS varchar[]),
+               timestamp '2025-01-01' + g * interval '3 minutes'
+        FROM c, generate_series(1, :jobs) g
+    """), params)
+    conn.execute(text("""
+        WITH w AS (SELECT array_agg(id ORDER BY id) AS ids FROM workers),
+             j AS (SELECT array_agg(id ORDER BY id) AS ids FROM jobs)
+        INSERT INTO job_applications (worker_id, job_id, applied_at, status)
+        SELECT w.ids[1 + g % cardinality(w.ids)],
+               j.ids[1 + (g::bigint * 7919) % cardinality(j.ids)],
+               timestamp '2025-06-01' + g * interval '1 minute',
+               (ARRAY['pending', 'pending', 'pending', 'accepted', 'rejected'])[1 + g % 5]
+        FROM w, j, generate_series(1, :applications) g
+        ON CONFLICT DO NOTHING
+    """), params)
+    # Geocode everything, the way `flask load-geocodes` would.
+    conn.execute(text(f"""
+        INSERT INTO geocodes (place, lat, lng)
+        SELECT {PLACE_KEY_SQL.format("place")}, lat, lng
+        FROM unnest(CAST(:locations AS text[]), CAST(:lats AS float8[]), CAST(:lngs AS float8[]))
+             AS p(place, lat, lng)
+    """), params)
+    for table in ("jobs", "workers", "contractors"):
+        conn.execute(text(f"""
+            UPDATE {table} t SET lat = g.lat, lng = g.lng
+            FROM geocodes g WHERE g.place = {PLACE_KEY_SQL.format("t.location")}
+        """))
+
+
+def is_empty(conn):
+    return not conn.execute(text("SELECT EXISTS (SELECT 1 FROM users)")).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--create-schema", action="store_true",
+                        help="db.create_all() first (fresh database without migrations)")
+    args = parser.parse_args()
+
+    # Seeding and VACUUM run far longer than any request should.
+    os.environ.setdefault("DB_STATEMENT_TIMEOUT_MS", "0")
+    app = load_app(database_url(args.database_url))
+    from extensions import db
+    import models  # noqa: F401  (register tables on db.metadata)
+
+    with app.app_context():
+        if args.create_schema:
+            db.create_all()
+        with db.engine.begin() as conn:
+            if not is_empty(conn):
+                raise SystemExit("Refusing to seed: users table is not empty.")
+            seed(conn, args.scale)
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE"))
+    print(f"Seeded {sizes(args.scale)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# bench/serialize.py
+"""
+Serialization micro-benchmark: rows/second for one large page of jobs.
+
+Loads the newest --rows jobs (default 10000, the size of a big admin or
+export page) and times two ways of turning them into a JSON body:
+
+    orm+json      Job entities through the session, a dict built per row
+                  by attribute access with isoformat(), Flask's default
+                  (stdlib json) provider -- how routes.py did it before
+                  serializers.py
+    tuples+orjson column tuples (serializers.JOB_COLUMNS), records(),
+                  serializers.dumps -- what the views do now
+
+Each is timed as query (execute + fetch / materialize), build (rows ->
+dicts) and encode (dicts -> bytes), best of --repeat runs, and reported as
+rows/second per stage and overall. Needs a seeded database (bench.seed).
+"""
+import argparse
+import time
+
+from bench import database_url, load_app
+
+
+def legacy_job_dict(j):
+    """The per-row dict routes.job_to_dict built from an entity."""
+    return {
+        "id": j.id, "title": j.title, "description": j.description,
+        "location": j.location, "contractor_id": j.contractor_id,
+        "required_skills": j.required_skills,
+        "created_at": j.created_at.isoformat() if j.created_at else None,
+    }
+
+
+def best(repeat, run):
+    """Fastest of `repeat` runs of run() -> {stage: seconds}, per stage."""
+    results = [run() for _ in range(repeat)]
+    return {stage: min(r[stage] for r in results) for stage in results[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = load_app(database_url(args.database_url))
+    from flask.json.provider import DefaultJSONProvider
+    from extensions import db
+    from models import Job
+    from serializers import JOB_COLUMNS, dumps, records
+
+    stdlib_json = DefaultJSONProvider(app)
+    newest = (Job.created_at.desc(), Job.id.desc())
+
+    def orm_json():
+        db.session.expunge_all()  # a fresh identity map, as in a new request
+        t0 = time.perf_counter()
+        jobs = db.session.query(Job).order_by(*newest).limit(args.rows).all()
+        t1 = time.perf_counter()
+        body = {"results": [legacy_job_dict(j) for j in jobs]}
+        t2 = time.perf_counter()
+        data = stdlib_json.dumps(body).encode()
+        t3 = time.perf_counter()
+        assert len(jobs) and data
+        return {"query": t1 - t0, "build": t2 - t1, "encode": t3 - t2, "total": t3 - t0}
+
+    def tuples_orjson():
+        t0 = time.perf_counter()
+        rows = db.session.query(*JOB_COLUMNS).order_by(*newest).limit(args.rows).all()
+        t1 = time.perf_counter()
+        body = {"results": records(rows)}
+        t2 = time.perf_counter()
+        data = dumps(body)
+        t3 = time.perf_counter()
+        assert len(rows) and data
+        return {"query": t1 - t0, "build": t2 - t1, "encode": t3 - t2, "total": t3 - t0}
+
+    with app.app_context():
+        rows = db.session.query(Job.id).order_by(*newest).limit(args.rows).count()
+        if rows < args.rows:
+            print(f"note: only {rows} jobs in the database")
+        orm_json()  # warm up the connection and statement caches
+        tuples_orjson()
+        timings = {"orm+json": best(args.repeat, orm_json),
+                   "tuples+orjson": best(args.repeat, tuples_orjson)}
+        db.session.rollback()
+
+    print(f"{rows} rows per page, best of {args.repeat}; rows/second (ms)")
+    stages = ("query", "build", "encode", "total")
+    print(f"{'':15}" + "".join(f"{s:>22}" for s in stages))
+    for name, t in timings.items():
+        print(f"{name:15}" + "".join(
+            f"{rows / t[s]:>13,.0f} ({t[s] * 1000:5.1f})" for s in stages))
+    speedup = timings["orm+json"]["total"] / timings["tuples+orjson"]["total"]
+    print(f"\ntuples+orjson is {speedup:.1f}x the orm+json throughput")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# bench/signup.py
+"""
+Signup micro-benchmark.
+
+Posts N fresh signups through the Flask test client. For each one it
+records latency, the number of SQL statements and the number of COMMITs,
+and prints a JSON summary. A cheap hash method is used by default, so the
+numbers reflect the database path rather than scrypt; pass --hash-method
+scrypt to include the hashing cost.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+import uuid
+
+from sqlalchemy import event
+
+from bench import database_url, percentile, recording
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url")
+    parser.add_argument("-n", "--count", type=int, default=500)
+    parser.add_argument("--hash-method", default="pbkdf2:sha256:1")
+    args = parser.parse_args()
+
+    # Must be set before hashing.py is imported by the app.
+    os.environ["PASSWORD_HASH_METHOD"] = args.hash_method
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+    os.environ.setdefault("RATELIMIT_ENABLED", "0")  # every signup comes from one address
+    from bench import load_app
+    app = load_app(database_url(args.database_url))
+    from extensions import db
+
+    run = uuid.uuid4().hex[:8]
+    latencies, statements, commits = [], [], []
+    with app.app_context():
+        client = app.test_client()
+        committed = []
+        event.listen(db.engine, "commit", lambda conn: committed.append(1))
+
+        for i in range(args.count):
+            role = "worker" if i % 5 else "contractor"
+            body = {"email": f"signup-{run}-{i}@bench.crewquick.test", "password": "pw",
+                    "role": role, "name": f"Bench {i}", "business_name": f"Bench {i} LLC"}
+            committed.clear()
+            with recording(db.engine) as executed:
+                start = time.perf_counter()
+                response = client.post("/signup", json=body)
+                latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise SystemExit(f"signup failed: {response.status_code} {response.get_json()}")
+            statements.append(len(executed))
+            commits.append(len(committed))
+
+    ms = [x * 1000 for x in latencies]
+    print(json.dumps({
+        "signups": args.count,
+        "hash_method": args.hash_method,
+        "latency_ms": {
+            "mean": round(statistics.mean(ms), 3),
+            "p50": round(percentile(ms, 50), 3),
+            "p95": round(percentile(ms, 95), 3),
+            "p99": round(percentile(ms, 99), 3),
+        },
+        "statements_per_signup": max(statements),
+        "commits_per_signup": max(commits),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# cache.py
+"""
+Response cache for read-mostly GET routes (the job feed, job detail).
+
+A cached view is keyed by its path, its query string and a *generation*
+counter for each table it reads. Any commit that touches one of those
+tables bumps the counter, so old entries are simply never looked up again
+and age out on their own -- no scanning, no explicit deletes.
+
+The ETag is derived from that same key. A client revalidating with
+If-None-Match therefore gets its 304 after a single generation lookup,
+without the entry being read and without touching Postgres.
+
+Backends (CACHE_URL, see backends.py): an in-process LRU (default), or
+shared Redis.
+
+With the memory backend both entries and generations are per process: a
+write handled by one gunicorn worker leaves the others serving the old
+page for up to CACHE_TTL seconds. Use Redis when that matters.
+
+Commits through the ORM session bump generations automatically (see the
+session hooks at the bottom). Writes that bypass it -- Core inserts, COPY,
+raw SQL -- must call bump() themselves.
+
+Configuration (env):
+    CACHE_URL    backend, see above
+    CACHE_TTL    seconds an entry lives; 0 disables response caching
+    CACHE_SIZE   max entries in the memory backend
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import Response, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import backends
+import metrics
+
+CACHE_URL = os.getenv("CACHE_URL", "")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_SIZE = int(os.getenv("CACHE_SIZE", "2048"))
+
+log = logging.getLogger(__name__)
+
+CACHE_REQUESTS = metrics.Counter(
+    "crewquick_response_cache_total", "Cacheable GETs by outcome (hit, miss, not_modified, bypass).",
+    labelnames=("endpoint", "result"))
+
+
+class TTLCache:
+    """Thread-safe LRU with a per-entry time-to-live."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# ------------------------
+# Backends
+# ------------------------
+# A backend stores opaque bytes under string keys and keeps one integer
+# generation per table. generation() may return None when the backend is
+# unreachable; the caller then serves the request uncached.
+class MemoryBackend:
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self._entries = TTLCache(maxsize, ttl)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, value, ttl):
+        self._entries.set(key, value, ttl)
+
+    def generation(self, table):
+        with self._lock:
+            # Seeded from the clock, so a restarted process never reuses a
+            # generation (and therefore an ETag) from its previous life.
+            return self._generations.setdefault(table, time.time_ns())
+
+    def bump(self, table):
+        with self._lock:
+            self._generations[table] = self._generations.get(table, time.time_ns()) + 1
+
+    def clear(self):
+        self._entries.clear()
+
+
+class RedisBackend(backends.RedisStore):
+    prefix = "crewquick:cache:"
+
+    def get(self, key):
+        try:
+            return self.client.get(self.prefix + "resp:" + key)
+        except Exception:
+            log.warning("response cache get failed", exc_info=True)
+            return None
+
+    def set(self, key, value, ttl):
+        try:
+            self.client.set(self.prefix + "resp:" + key, value, ex=max(1, int(ttl)))
+        except Exception:
+            log.warning("response cache set failed", exc_info=True)
+
+    def generation(self, table):
+        name = self.prefix + "gen:" + table
+        try:
+            value = self.client.get(name)
+            if value is None:
+                # First use (or a flushed server): start from the clock so
+                # ETags handed out before the flush can't match again.
+                self.client.set(name, time.time_ns(), nx=True)
+                value = self.client.get(name)
+            return int(value)
+        except Exception:
+            log.warning("response cache generation lookup failed", exc_info=True)
+            return None
+
+    def bump(self, table):
+        try:
+            self.client.incr(self.prefix + "gen:" + table)
+        except Exception:
+            # Entries for this table stay visible until they expire.
+            log.warning("response cache bump failed for %s", table, exc_info=True)
+
+    def clear(self):
+        for name in self.client.scan_iter(self.prefix + "resp:*"):
+            self.client.delete(name)
+
+
+def backend_from_url(url):
+    return backends.from_url(url, "CACHE_URL", MemoryBackend, RedisBackend)
+
+
+_backend = backends.Shared(lambda: backend_from_url(CACHE_URL))
+get_backend = _backend.get
+set_backend = _backend.set
+
+
+def bump(*tables):
+    """Invalidate every cached response that read any of `tables`."""
+    backend = get_backend()
+    for table in tables:
+        backend.bump(table)
+
+
+# ------------------------
+# View decorator
+# ------------------------
+# Tables some cached view depends on; commits touching others are ignored.
+_watched = set()
+
+
+def watched(table):
+    """Does some cached view read `table`?"""
+    return table in _watched
+
+
+def _cache_key(generations):
+    args = urlencode(sorted(request.args.items(multi=True)))
+    return f"{request.path}?{args}|{generations}"
+
+
+def cached(*tables, ttl=None):
+    """
+    Cache a GET view's 200 JSON responses until one of `tables` changes.
+
+    Goes *under* @jwt_required so authentication still runs first. Only
+    use it on views whose output doesn't depend on who is asking.
+    """
+    _watched.update(tables)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            endpoint = request.endpoint
+            if request.method != "GET" or CACHE_TTL <= 0:
+                return view(*args, **kwargs)
+
+            backend = get_backend()
+            generations = [backend.generation(t) for t in tables]
+            if None in generations:
+                CACHE_REQUESTS.inc(endpoint=endpoint, result="bypass")
+                return view(*args, **kwargs)
+            key = _cache_key(generations)
+            etag = hashlib.sha1(key.encode()).hexdigest()
+
+            if request.if_none_match.contains_weak(etag):
+                CACHE_REQUESTS.inc(endpoint=endpoint, result="not_modified")
+                response = Response(status=304)
+            else:
+                body = backend.get(key)
+                if body is not None:
+                    CACHE_REQUESTS.inc(endpoint=endpoint, result="hit")
+                    response = Response(body, mimetype="application/json")
+                else:
+                    CACHE_REQUESTS.inc(endpoint=endpoint, result="miss")
+                    response = make_response(view(*args, **kwargs))
+                    if (response.status_code != 200 or response.is_streamed
+                            or response.mimetype != "application/json"):
+                        return response
+                    backend.set(key, response.get_data(), ttl or CACHE_TTL)
+
+            response.set_etag(etag, weak=True)
+            # Clients may keep a copy but must revalidate (cheap: see above).
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# ------------------------
+# Invalidation on commit
+# ------------------------
+@event.listens_for(Session, "before_flush")
+def _collect_touched_tables(session, flush_context, instances):
+    touched = session.info.setdefault("cache_touched", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table in _watched:
+            touched.add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_touched_tables(session):
+    tables = session.info.pop("cache_touched", ())
+    if tables:
+        bump(*tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_touched_tables(session):
+    session.info.pop("cache_touched", None)
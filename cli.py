@@ -0,0 +1,282 @@
+# cli.py
+"""
+Admin commands, registered on the Flask app:
+
+    flask --app app import-jobs jobs.csv [--contractor-id N]
+    flask --app app load-geocodes places.csv
+    flask --app app match-worker [--once] [--batch-size N]
+    flask --app app enqueue-matches
+
+import-jobs loads a CSV job feed with Postgres COPY into a temporary
+staging table of text columns, validates and casts it there, and moves the
+rows into `jobs` with one INSERT ... SELECT -- all in a single transaction.
+A bad value is reported with its row number (the CSV record, counting the
+header as row 1), never as a COPY error. It takes the same columns as the
+CSV export of /admin/jobs:
+
+    title, description, location     required
+    contractor_id                    required unless --contractor-id
+    required_skills                  optional, ';'-separated
+    created_at                       optional, ISO 8601; UTC unless it
+                                     has an offset; default now
+
+The first line must be a header naming the columns present, in any order.
+Imported jobs get coordinates from the geocodes table, are announced to
+/jobs/stream and queued for match scoring, like posted ones.
+
+load-geocodes fills the offline geocoding table (geo.py) from a CSV with a
+`place,lat,lng` header, upserting by normalized place, then sets lat/lng
+on every job, worker and contractor whose location now has an entry. Run it
+again whenever the place list grows; it only rewrites rows whose
+coordinates changed, and queues the jobs and workers among them for match
+scoring in the same transaction.
+
+match-worker drains the match queue, keeping job_matches up to date (see
+matching.py). Run one or more alongside the web processes; without
+--once it polls forever. enqueue-matches queues every worker with skills
+for a full rescore, e.g. after changing the scoring weights.
+"""
+import csv
+
+import click
+from flask.cli import with_appcontext
+
+import cache
+import matching
+import replicas
+from extensions import db
+from geo import PLACE_KEY_SQL
+from jobstream import NOTIFY_SQL
+
+IMPORT_COLUMNS = ("title", "description", "location", "contractor_id",
+                  "required_skills", "created_at")
+# Bad rows listed before giving up; the import is all-or-nothing anyway.
+MAX_REPORTED_ERRORS = 20
+
+
+# Staged as text (so COPY never fails on a value) and cast here. A value
+# that doesn't cast comes out NULL, which validation reports. Going through
+# timestamptz honours an explicit offset (a plain timestamp cast drops it);
+# naive values are read in the session time zone, which import-jobs pins
+# to UTC.
+IMPORT_TIMESTAMP_SQL = """
+    CREATE OR REPLACE FUNCTION pg_temp.import_timestamp(value text) RETURNS timestamp
+    LANGUAGE plpgsql STABLE AS $$
+    BEGIN
+        RETURN CAST(value AS timestamptz) AT TIME ZONE 'UTC';
+    EXCEPTION WHEN data_exception THEN
+        RETURN NULL;
+    END $$
+"""
+TYPED_IMPORT_SQL = """
+    SELECT line, title, description, location, required_skills,
+           nullif(btrim(contractor_id), '') AS raw_contractor_id,
+           CASE WHEN btrim(contractor_id) ~ '^[0-9]{1,9}$'
+                THEN CAST(btrim(contractor_id) AS integer) END AS contractor_id,
+           nullif(btrim(created_at), '') AS raw_created_at,
+           pg_temp.import_timestamp(nullif(btrim(created_at), '')) AS created_at
+    FROM job_import
+"""
+
+# Tables with a free-text location and geocoded lat/lng columns, and the
+# match_queue kind to rescore when a row moves (contractors aren't matched).
+GEOCODED_TABLES = {"jobs": "job", "workers": "worker", "contractors": None}
+
+
+def register_cli(app):
+    app.cli.add_command(import_jobs)
+    app.cli.add_command(load_geocodes)
+    app.cli.add_command(match_worker)
+    app.cli.add_command(enqueue_matches)
+
+
+@click.command("import-jobs")
+@click.argument("source", type=click.File("rb"))
+@click.option("--contractor-id", type=int,
+              help="Contractor for rows without a contractor_id column/value.")
+@with_appcontext
+def import_jobs(source, contractor_id):
+    """Bulk-load jobs from a CSV file (or - for stdin) via COPY."""
+    header = next(csv.reader([source.readline().decode("utf-8-sig")]), [])
+    columns = [c.strip() for c in header]
+    unknown = set(columns) - set(IMPORT_COLUMNS)
+    if unknown or not columns:
+        raise click.UsageError(f"Unknown or missing header columns: {', '.join(sorted(unknown)) or '-'}")
+    if "contractor_id" not in columns and contractor_id is None:
+        raise click.UsageError("No contractor_id column; pass --contractor-id")
+
+    raw = db.engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        # A big feed can outlast DB_STATEMENT_TIMEOUT_MS; this is not a request.
+        cur.execute("SET LOCAL statement_timeout = 0")
+        cur.execute("SET LOCAL timezone = 'UTC'")
+        cur.execute("""
+            CREATE TEMP TABLE job_import (
+                line bigserial,
+                title text, description text, location text,
+                contractor_id text, required_skills text, created_at text
+            ) ON COMMIT DROP
+        """)
+        cur.execute(IMPORT_TIMESTAMP_SQL)
+        cur.copy_expert(
+            f"COPY job_import ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", source)
+
+        cur.execute(f"""
+            WITH i AS ({TYPED_IMPORT_SQL})
+            SELECT i.line + 1,
+                   concat_ws(', ',
+                       CASE WHEN coalesce(i.title, '') = '' THEN 'missing title' END,
+                       CASE WHEN coalesce(i.description, '') = '' THEN 'missing description' END,
+                       CASE WHEN coalesce(i.location, '') = '' THEN 'missing location' END,
+                       CASE WHEN i.raw_contractor_id IS NOT NULL AND i.contractor_id IS NULL
+                                THEN 'bad contractor_id'
+                            WHEN c.id IS NULL THEN 'unknown contractor_id' END,
+                       CASE WHEN i.raw_created_at IS NOT NULL AND i.created_at IS NULL
+                            THEN 'bad created_at' END)
+            FROM i
+            LEFT JOIN contractors c ON c.id = coalesce(i.contractor_id, %(cid)s)
+            WHERE coalesce(i.title, '') = '' OR coalesce(i.description, '') = ''
+               OR coalesce(i.location, '') = '' OR c.id IS NULL
+               OR (i.raw_contractor_id IS NOT NULL AND i.contractor_id IS NULL)
+               OR (i.raw_created_at IS NOT NULL AND i.created_at IS NULL)
+            ORDER BY i.line
+            LIMIT %(limit)s
+        """, {"cid": contractor_id, "limit": MAX_REPORTED_ERRORS})
+        bad = cur.fetchall()
+        if bad:
+            raw.rollback()
+            for row, problem in bad:
+                click.echo(f"row {row}: {problem}", err=True)
+            raise click.ClickException("Nothing imported; fix the rows above and retry.")
+
+        # NOTIFY each new job to /jobs/stream listeners (delivered on commit)
+        # and queue it for match scoring.
+        cur.execute(f"""
+            WITH new AS (
+                INSERT INTO jobs (title, description, location, lat, lng, contractor_id,
+                                  required_skills, created_at)
+                SELECT i.title, i.description, i.location, g.lat, g.lng, coalesce(i.contractor_id, %(cid)s),
+                       CAST(string_to_array(nullif(i.required_skills, ''), ';') AS varchar[]),
+                       coalesce(i.created_at, timezone('utc', now()))
+                FROM ({TYPED_IMPORT_SQL}) i
+                LEFT JOIN geocodes g ON g.place = {PLACE_KEY_SQL.format("i.location")}
+                ORDER BY i.line
+                RETURNING id, required_skills
+            ),
+            queued AS (
+                INSERT INTO match_queue (kind, ref_id) SELECT 'job', id FROM new
+            )
+            SELECT count({NOTIFY_SQL.format(id="id", skills="required_skills")}) FROM new
+        """, {"cid": contractor_id})
+        imported = cur.fetchone()[0]
+        raw.commit()
+    finally:
+        raw.close()
+
+    replicas.mark_written(db.engine)
+    cache.bump("jobs")
+    click.echo(f"Imported {imported} jobs.")
+
+
+@click.command("load-geocodes")
+@click.argument("source", type=click.File("rb"))
+@with_appcontext
+def load_geocodes(source):
+    """Load place,lat,lng rows (CSV, or - for stdin) and geocode existing rows."""
+    header = [c.strip() for c in next(csv.reader([source.readline().decode("utf-8-sig")]), [])]
+    if sorted(header) != ["lat", "lng", "place"]:
+        raise click.UsageError("Header must name exactly the columns place, lat, lng")
+
+    raw = db.engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("SET LOCAL statement_timeout = 0")
+        cur.execute("""
+            CREATE TEMP TABLE geocode_import (
+                line bigserial, place text, lat double precision, lng double precision
+            ) ON COMMIT DROP
+        """)
+        cur.copy_expert(
+            f"COPY geocode_import ({', '.join(header)}) FROM STDIN WITH (FORMAT csv)", source)
+
+        cur.execute("""
+            SELECT line + 1,
+                   concat_ws(', ',
+                       CASE WHEN coalesce(btrim(place), '') = '' THEN 'missing place' END,
+                       CASE WHEN lat IS NULL OR lat NOT BETWEEN -90 AND 90 THEN 'bad lat' END,
+                       CASE WHEN lng IS NULL OR lng NOT BETWEEN -180 AND 180 THEN 'bad lng' END)
+            FROM geocode_import
+            WHERE coalesce(btrim(place), '') = ''
+               OR lat IS NULL OR lat NOT BETWEEN -90 AND 90
+               OR lng IS NULL OR lng NOT BETWEEN -180 AND 180
+            ORDER BY line
+            LIMIT %(limit)s
+        """, {"limit": MAX_REPORTED_ERRORS})
+        bad = cur.fetchall()
+        if bad:
+            raw.rollback()
+            for row, problem in bad:
+                click.echo(f"row {row}: {problem}", err=True)
+            raise click.ClickException("Nothing loaded; fix the rows above and retry.")
+
+        # Last row wins when two spellings normalize to the same place.
+        cur.execute(f"""
+            INSERT INTO geocodes (place, lat, lng)
+            SELECT DISTINCT ON (place_key) place_key, lat, lng
+            FROM (SELECT {PLACE_KEY_SQL.format("place")} AS place_key, lat, lng, line
+                  FROM geocode_import) i
+            ORDER BY place_key, line DESC
+            ON CONFLICT (place) DO UPDATE SET lat = excluded.lat, lng = excluded.lng
+        """)
+        places = cur.rowcount
+
+        updated = {}
+        for table, kind in GEOCODED_TABLES.items():
+            # Moved rows score differently, so queue them in this transaction
+            # like import-jobs does; the queue never sees half a load.
+            queue = (f", queued AS (INSERT INTO match_queue (kind, ref_id) SELECT '{kind}', id FROM moved)"
+                     if kind else "")
+            cur.execute(f"""
+                WITH moved AS (
+                    UPDATE {table} t SET lat = g.lat, lng = g.lng
+                    FROM geocodes g
+                    WHERE g.place = {PLACE_KEY_SQL.format("t.location")}
+                      AND (t.lat, t.lng) IS DISTINCT FROM (g.lat, g.lng)
+                    RETURNING t.id
+                ){queue}
+                SELECT count(*) FROM moved
+            """)
+            updated[table] = cur.fetchone()[0]
+        raw.commit()
+    finally:
+        raw.close()
+
+    replicas.mark_written(db.engine)
+    if updated["jobs"]:
+        cache.bump("jobs")
+    click.echo(f"Loaded {places} places; geocoded "
+               + ", ".join(f"{n} {table}" for table, n in updated.items()) + ".")
+
+
+@click.command("match-worker")
+@click.option("--once", is_flag=True, help="Exit when the queue is empty.")
+@click.option("--batch-size", type=int, default=matching.MATCH_BATCH_SIZE, show_default=True,
+              help="Queue entries claimed per transaction.")
+@with_appcontext
+def match_worker(once, batch_size):
+    """Score queued jobs and workers into job_matches."""
+    handled = matching.run(db.engine, once=once, size=batch_size)
+    click.echo(f"Scored {handled} queue entries.")
+
+
+@click.command("enqueue-matches")
+@with_appcontext
+def enqueue_matches():
+    """Queue every worker with skills for a full rescore."""
+    with db.engine.begin() as conn:
+        queued = conn.exec_driver_sql("""
+            INSERT INTO match_queue (kind, ref_id)
+            SELECT 'worker', id FROM workers WHERE cardinality(skills) > 0 ORDER BY id
+        """).rowcount
+    click.echo(f"Queued {queued} workers.")
@@ -0,0 +1,83 @@
+# dbpool.py
+"""
+SQLAlchemy engine/pool settings from the environment, and pool metrics.
+
+Each gunicorn worker process has its own pool, so the most connections the
+app can hold is roughly workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW); keep
+that under the server's max_connections (minus whatever else connects).
+
+Configuration (env):
+    DB_POOL_SIZE             connections kept open per process (default 5)
+    DB_MAX_OVERFLOW          extra connections allowed under burst (default 10)
+    DB_POOL_TIMEOUT          seconds to wait for a free connection (default 10)
+    DB_POOL_RECYCLE          reconnect connections older than this, seconds
+                             (default 1800; keeps us under idle-kill proxies)
+    DB_POOL_PRE_PING         test connections on checkout (default true)
+    DB_CONNECT_TIMEOUT       seconds for a new TCP/TLS connect (default 5)
+    DB_STATEMENT_TIMEOUT_MS  server-side statement_timeout, 0 = none (default 15000)
+"""
+import os
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+import metrics
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+POOL_WAIT_SECONDS = metrics.Histogram(
+    "crewquick_db_pool_wait_seconds", "Time to check a connection out of the pool (incl. connecting).",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+POOL_TIMEOUTS = metrics.Counter(
+    "crewquick_db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT.")
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+
+def engine_options():
+    """SQLALCHEMY_ENGINE_OPTIONS for Flask-SQLAlchemy."""
+    connect_args = {"connect_timeout": DB_CONNECT_TIMEOUT}
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+def init_pool_metrics(engine):
+    """Scrape-time gauges for `engine`'s pool (call once per engine)."""
+    pool = engine.pool
+    metrics.Gauge("crewquick_db_pool_size", "Configured pool size.",
+                  callback=pool.size)
+    metrics.Gauge("crewquick_db_pool_checked_out", "Connections currently checked out.",
+                  callback=pool.checkedout)
+    metrics.Gauge("crewquick_db_pool_checked_in", "Idle connections in the pool.",
+                  callback=pool.checkedin)
+    # Negative while the pool is still below pool_size (SQLAlchemy's convention).
+    metrics.Gauge("crewquick_db_pool_overflow", "Connections open beyond pool_size.",
+                  callback=pool.overflow)
@@ -1,4 +1,7 @@
 # extensions.py
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from replicas import RoutingSession
+
+# Reads in @replicas.read_only() views may go to a replica (replicas.py).
+db = SQLAlchemy(session_options={"class_": RoutingSession})
@@ -0,0 +1,115 @@
+# geo.py
+"""
+Coordinates for free-text locations, and distance math for radius search.
+
+Geocoding is offline: a lookup in the `geocodes` table, loaded from a CSV
+with `flask load-geocodes` (see cli.py) and keyed on the normalized place
+string -- lowercased, trimmed, runs of whitespace collapsed -- so "Austin,
+TX" and " austin,  tx" are the same place. Nothing here calls out to a
+geocoding service. Places missing from the table get NULL coordinates and
+simply never match a radius search until the table learns them.
+
+A radius search is two steps, both in SQL:
+  1. a bounding box around the point, which the btree on (lat, lng) can
+     range-scan (ix_jobs_lat_lng);
+  2. the exact great-circle (haversine) distance for the rows in the box,
+     filtered to the radius and used as the sort key.
+The box is a little larger than the circle, so step 2 only ever removes
+the corners. Everything inside the box is sorted, which is why radius_km
+is capped (GEO_MAX_RADIUS_KM).
+
+Configuration (env):
+    GEO_DEFAULT_RADIUS_KM  radius when ?near= comes without ?radius_km= (default 25)
+    GEO_MAX_RADIUS_KM      largest radius accepted (default 200)
+"""
+import math
+import os
+
+from sqlalchemy import Double, and_, cast, func, or_, select
+
+from extensions import db
+from models import Geocode
+
+GEO_DEFAULT_RADIUS_KM = float(os.getenv("GEO_DEFAULT_RADIUS_KM", "25"))
+GEO_MAX_RADIUS_KM = float(os.getenv("GEO_MAX_RADIUS_KM", "200"))
+
+EARTH_RADIUS_KM = 6371.0088  # mean radius
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+# ------------------------
+# Geocoding
+# ------------------------
+def place_key(location):
+    """The geocodes.place a free-text location is looked up under."""
+    return " ".join(location.lower().split()) if location else None
+
+
+# place_key() in SQL, for set-based backfills and imports: PLACE_KEY_SQL.format("j.location").
+PLACE_KEY_SQL = r"regexp_replace(lower(btrim({})), '\s+', ' ', 'g')"
+
+
+def lookup(locations):
+    """{place_key: (lat, lng)} for every location in `locations` the table knows."""
+    keys = {place_key(loc) for loc in locations if loc}
+    if not keys:
+        return {}
+    rows = db.session.execute(
+        select(Geocode.place, Geocode.lat, Geocode.lng).where(Geocode.place.in_(keys)))
+    return {r.place: (r.lat, r.lng) for r in rows}
+
+
+def coordinates(location):
+    """(lat, lng) for one location, or (None, None) if it isn't in the table."""
+    return lookup([location]).get(place_key(location), (None, None))
+
+
+# ------------------------
+# Radius search
+# ------------------------
+def parse_point(raw):
+    """"lat,lng" -> (lat, lng); raises ValueError when malformed or out of range."""
+    lat, lng = (float(v) for v in raw.split(","))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError(raw)
+    return lat, lng
+
+
+def bounding_box(lat_column, lng_column, lat, lng, radius_km):
+    """Index-friendly filter for a box containing the circle (lat, lng, radius_km)."""
+    dlat = radius_km / KM_PER_DEGREE
+    filters = [lat_column.between(lat - dlat, lat + dlat)]
+    # Degrees of longitude shrink with cos(latitude); use the widest point of
+    # the box. Near a pole the box spans every longitude.
+    widest = min(90.0, abs(lat) + dlat)
+    if widest < 90.0:
+        dlng = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+        west, east = lng - dlng, lng + dlng
+        if west < -180 and dlng < 180:  # box crosses the antimeridian
+            filters.append(or_(lng_column >= west + 360, lng_column <= east))
+        elif east > 180 and dlng < 180:
+            filters.append(or_(lng_column >= west, lng_column <= east - 360))
+        elif dlng < 180:
+            filters.append(lng_column.between(west, east))
+    return and_(*filters)
+
+
+def distance_km(lat_column, lng_column, lat, lng):
+    """Great-circle distance from (lat, lng) in km, as a double precision expression."""
+    dlat = func.radians(lat_column - lat)
+    dlng = func.radians(lng_column - lng)
+    a = (func.power(func.sin(dlat / 2), 2)
+         + math.cos(math.radians(lat)) * func.cos(func.radians(lat_column))
+         * func.power(func.sin(dlng / 2), 2))
+    # least() guards asin against rounding a hair above 1.
+    return cast(2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(a, 1.0))), Double)
+
+
+# distance_km() between two coordinate columns, for set-based SQL:
+# DISTANCE_SQL.format(lat1="j.lat", lng1="j.lng", lat2="w.lat", lng2="w.lng").
+DISTANCE_SQL = (
+    f"(2 * {EARTH_RADIUS_KM} * asin(sqrt(least("
+    "power(sin(radians({lat2} - {lat1}) / 2), 2)"
+    " + cos(radians({lat1})) * cos(radians({lat2})) * power(sin(radians({lng2} - {lng1}) / 2), 2)"
+    ", 1.0))))"
+)
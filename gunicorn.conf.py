@@ -0,0 +1,95 @@
+# gunicorn.conf.py
+"""
+Production server settings; gunicorn picks this file up automatically.
+
+    gunicorn app:app                                    sync Flask, threaded workers
+    GUNICORN_ASYNC=1 gunicorn asgi:app                  uvicorn workers, async read
+                                                        routes (see asgi.py)
+
+Sizing, from the CPU count and the DB pool (dbpool.py):
+
+  * sync (gthread): 2 * CPUs + 1 processes, each with DB_POOL_SIZE threads.
+    A thread holds at most one pooled connection, so threads beyond the
+    pool size would only queue on pool checkout.
+  * async (uvicorn): one process per CPU. An event loop multiplexes its
+    requests over the async pool; more processes than cores only adds
+    connections and context switches.
+
+Password hashing (hashing.py) runs on a per-process pool of
+PASSWORD_HASH_WORKERS processes: by default CPUs // workers, but at least
+one so no worker hashes on its request threads. That is about one hashing
+process per CPU when there are at most as many workers as CPUs, and one
+per worker beyond that -- 2 * CPUs + 1 with the gthread default. Each
+pool refuses work past PASSWORD_HASH_QUEUE (503), so a login spike queues
+per worker rather than growing without bound; lower WEB_CONCURRENCY if
+hashing should never compete with all cores at once.
+
+Every process has its own pool, so the app can open up to
+workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections (twice that in
+async mode, where the Flask fallback keeps its sync pool). A warning is
+logged at startup when that exceeds DB_MAX_CONNECTIONS.
+
+The app is preloaded in the master so workers fork with the code already
+imported; each worker then drops the connections it inherited.
+
+Configuration (env):
+    BIND / PORT          listen address (default 0.0.0.0:$PORT, PORT=8000)
+    GUNICORN_ASYNC       1 = uvicorn worker class (default 0: gthread)
+    WEB_CONCURRENCY      worker processes (default from CPUs, above)
+    GUNICORN_THREADS     threads per gthread worker (default DB_POOL_SIZE)
+    GUNICORN_TIMEOUT     seconds before a silent worker is restarted (default 30)
+    DB_MAX_CONNECTIONS   connection budget to warn against (default 100)
+"""
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()  # before dbpool reads its settings, as in app.py
+
+from dbpool import DB_MAX_OVERFLOW, DB_POOL_SIZE
+
+CPUS = multiprocessing.cpu_count()
+ASYNC = os.getenv("GUNICORN_ASYNC", "0").lower() in ("1", "true", "yes")
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "100"))
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+
+if ASYNC:
+    worker_class = "uvicorn_worker.UvicornWorker"
+    workers = int(os.getenv("WEB_CONCURRENCY", str(CPUS)))
+else:
+    worker_class = "gthread"
+    workers = int(os.getenv("WEB_CONCURRENCY", str(2 * CPUS + 1)))
+    threads = int(os.getenv("GUNICORN_THREADS", str(DB_POOL_SIZE)))
+
+# hashing.py reads this at import, i.e. in the preloaded master.
+os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(1, CPUS // workers)))
+
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = timeout
+keepalive = 5  # behind a load balancer that reuses connections
+accesslog = "-"
+
+
+def on_starting(server):
+    per_process = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    total = workers * per_process * (2 if ASYNC else 1)
+    if total > DB_MAX_CONNECTIONS:
+        server.log.warning(
+            "up to %d DB connections (%d workers x %d%s) exceeds DB_MAX_CONNECTIONS=%d; "
+            "lower WEB_CONCURRENCY or DB_POOL_SIZE/DB_MAX_OVERFLOW",
+            total, workers, per_process, " x 2 pools" if ASYNC else "", DB_MAX_CONNECTIONS)
+
+
+def post_fork(server, worker):
+    # Connections opened while preloading (pool metrics, instrumentation)
+    # belong to the master; don't let the child reuse or close them. That
+    # goes for the replica binds as much as the primary.
+    from app import app
+    from extensions import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
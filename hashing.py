@@ -0,0 +1,143 @@
+# hashing.py
+"""
+Password hashing off the request thread.
+
+scrypt is deliberately slow (tens of ms of pure CPU), and running it inline
+means a login spike holds the GIL and every request thread hostage. Hashes
+run in a small process pool instead, behind a bounded number of slots:
+once `workers + queue` hashes are in flight, new ones are refused with
+HashQueueFull, which the API turns into a 503 + Retry-After rather than an
+ever-growing backlog.
+
+If a pool process dies (e.g. OOM-killed) the pool is broken for good; the
+hashes caught in it fail with HashQueueFull too, and the next hash starts
+a fresh pool.
+
+Configuration (env):
+    PASSWORD_HASH_METHOD   werkzeug method string (default "scrypt")
+    PASSWORD_HASH_WORKERS  pool processes; 0 hashes inline (dev / tests)
+    PASSWORD_HASH_QUEUE    hashes allowed to wait for a free process
+    PASSWORD_HASH_TIMEOUT  seconds to wait for a result before giving up
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import metrics
+
+HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(os.cpu_count() or 1, 4)))
+HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", HASH_WORKERS * 8 or 8))
+HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "5"))
+RETRY_AFTER_SECONDS = 1
+
+log = logging.getLogger(__name__)
+
+HASH_IN_FLIGHT = metrics.Gauge(
+    "crewquick_password_hash_in_flight", "Password hashes running or queued.")
+HASH_REJECTED = metrics.Counter(
+    "crewquick_password_hash_rejected_total", "Hashes refused because the queue was full.")
+HASH_SECONDS = metrics.Histogram(
+    "crewquick_password_hash_seconds", "Time from submit to hash result, queueing included.",
+    labelnames=("op",))
+
+
+class HashQueueFull(Exception):
+    """Every hashing slot is taken; the client should retry shortly."""
+
+
+class HashPool:
+    def __init__(self, workers, queue_size):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # Created lazily, and again after a fork (gunicorn preload), because
+        # a pool inherited from the parent process is unusable.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # forkserver: never fork the threaded server process itself.
+                ctx = multiprocessing.get_context(
+                    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _discard(self, executor):
+        # Only if nobody has replaced it yet; the next hash builds a new one.
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+        log.warning("password hash pool broken; starting a new one")
+
+    def run(self, op, fn, *args):
+        """Run fn(*args) in the pool and wait for it. Raises HashQueueFull."""
+        if not self._slots.acquire(blocking=False):
+            HASH_REJECTED.inc()
+            raise HashQueueFull()
+        HASH_IN_FLIGHT.inc()
+        start = time.perf_counter()
+
+        def release(_=None):
+            HASH_IN_FLIGHT.dec()
+            self._slots.release()
+
+        if self.workers <= 0:
+            try:
+                return fn(*args)
+            finally:
+                release()
+                HASH_SECONDS.observe(time.perf_counter() - start, op=op)
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError):  # broken, or shut down under us
+            release()
+            self._discard(executor)
+            raise HashQueueFull() from None
+        # The slot is held until the process is actually done, even if we
+        # stop waiting, so the bound reflects real pool occupancy.
+        future.add_done_callback(release)
+        try:
+            return future.result(timeout=HASH_TIMEOUT)
+        except TimeoutError:
+            raise HashQueueFull() from None
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise HashQueueFull() from None
+        finally:
+            HASH_SECONDS.observe(time.perf_counter() - start, op=op)
+
+
+pool = HashPool(HASH_WORKERS, HASH_QUEUE)
+
+
+def hash_password(password):
+    return pool.run("hash", generate_password_hash, password, HASH_METHOD)
+
+
+def verify_password(stored_hash, password):
+    return pool.run("verify", check_password_hash, stored_hash, password)
+
+
+@lru_cache(maxsize=1)
+def _current_params():
+    # e.g. "scrypt:32768:8:1" -- whatever werkzeug writes for HASH_METHOD today.
+    return generate_password_hash("", HASH_METHOD).split("$", 1)[0]
+
+
+def needs_rehash(stored_hash):
+    """True if `stored_hash` was made with other parameters than we use now."""
+    return stored_hash.split("$", 1)[0] != _current_params()
@@ -0,0 +1,78 @@
+# health.py
+"""
+Probe and scrape endpoints -- everything a load balancer or Prometheus hits.
+
+    /healthz/live    the process is up and serving; never touches the DB
+    /healthz/ready   the DB answers SELECT 1 (pooled connection). The result
+                     is cached for HEALTH_CACHE_SECONDS so a fleet of probes
+                     costs at most one query per process per interval.
+    /                legacy healthcheck; same cached readiness, same shape
+    /metrics         Prometheus text format (see metrics.py)
+"""
+import os
+import threading
+import time
+
+from flask import Blueprint, Response, jsonify
+from sqlalchemy import text
+
+import metrics
+from extensions import db
+
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "5"))
+
+bp = Blueprint("health", __name__)
+
+_lock = threading.Lock()
+_last = {"checked": 0.0, "ok": False, "error": None}
+
+
+def readiness():
+    """(ok, error) for the database, at most one real check per interval."""
+    now = time.monotonic()
+    if now - _last["checked"] < HEALTH_CACHE_SECONDS:
+        return _last["ok"], _last["error"]
+    # One prober runs the query; concurrent probes get the previous answer.
+    if not _lock.acquire(blocking=False):
+        return _last["ok"], _last["error"]
+    try:
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, str(e)
+        _last.update(checked=time.monotonic(), ok=ok, error=error)
+        return ok, error
+    finally:
+        _lock.release()
+
+
+@bp.route("/healthz/live")
+def live():
+    return jsonify({"status": "ok"})
+
+
+@bp.route("/healthz/ready")
+def ready():
+    ok, error = readiness()
+    if ok:
+        return jsonify({"status": "ok"})
+    return jsonify({"status": "unavailable", "error": error}), 503
+
+
+@bp.route("/")
+def home():
+    ok, error = readiness()
+    body = {
+        "status": "CrewQuick API running!",
+        "db_connection": "✅ successful" if ok else "❌ failed",
+    }
+    if error:
+        body["error"] = error
+    return jsonify(body)
+
+
+@bp.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
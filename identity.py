@@ -0,0 +1,185 @@
+# identity.py
+"""
+Who is calling: JWT claims first, the database only when we must.
+
+Access tokens carry the caller's role and worker_id / contractor_id (see
+claims_for), so most routes never look the user up at all. When a route
+does need more (e.g. /me), `current_user` resolves the user and their
+worker/contractor profile in one joined query and remembers the answer.
+
+Two layers of caching:
+  * per request -- flask_jwt_extended keeps whatever our user loader
+    returns as `current_user` for the rest of the request, and that object
+    resolves at most once;
+  * across requests -- a small in-process TTL LRU, so repeat calls from the
+    same user skip the database entirely. Entries are dropped when a
+    session commits changes to that user's User/Worker/Contractor rows.
+
+The cache is per process. Other gunicorn workers may serve a stale profile
+for up to IDENTITY_CACHE_TTL seconds after an edit; set it to 0 to disable.
+Writes that bypass the ORM unit of work (Core UPDATEs) must call
+invalidate() themselves.
+"""
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from flask_jwt_extended import get_jwt, current_user
+from flask_jwt_extended.exceptions import UserLookupError
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, joinedload
+
+from cache import TTLCache
+from extensions import db
+from models import Contractor, User, Worker
+
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "30"))
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+
+
+@dataclass(frozen=True)
+class Identity:
+    user_id: int
+    email: str
+    role: str
+    worker_id: Optional[int] = None
+    contractor_id: Optional[int] = None
+    # Public profile fields as returned by /me (None for admins).
+    profile: Optional[dict] = None
+
+    @property
+    def skills(self):
+        return (self.profile or {}).get("skills") or []
+
+
+cache = TTLCache(IDENTITY_CACHE_SIZE, IDENTITY_CACHE_TTL)
+
+
+def identity_from_user(user):
+    """Identity for a User with .worker/.contractor loaded."""
+    w, c = user.worker, user.contractor
+    profile = None
+    if user.role == "worker":
+        profile = {
+            "name": w.name if w else None,
+            "location": w.location if w else None,
+            "skills": w.skills if w else None,
+            "transportation": w.transportation if w else None,
+        }
+    elif user.role == "contractor":
+        profile = {
+            "business_name": c.business_name if c else None,
+            "location": c.location if c else None,
+            "phone": c.phone if c else None,
+        }
+    return Identity(
+        user_id=user.id, email=user.email, role=user.role,
+        worker_id=w.id if w else None, contractor_id=c.id if c else None,
+        profile=profile,
+    )
+
+
+def resolve(user_id):
+    """Identity for `user_id`, or None if the user no longer exists."""
+    identity = cache.get(user_id)
+    if identity is not None:
+        return identity
+
+    # users LEFT JOIN workers LEFT JOIN contractors -- a single round trip.
+    # Always on the primary, even inside a read-only view (replicas.py): a
+    # replica may not have a user who has only just signed up, and what we
+    # find here is cached for IDENTITY_CACHE_TTL.
+    user = db.session.execute(
+        select(User)
+        .options(joinedload(User.worker), joinedload(User.contractor))
+        .where(User.id == user_id),
+        bind_arguments={"bind": db.engine},
+    ).unique().scalar_one_or_none()
+    if user is None:
+        return None
+    identity = identity_from_user(user)
+    cache.set(user_id, identity)
+    return identity
+
+
+def invalidate(user_id):
+    cache.delete(user_id)
+
+
+class LazyIdentity:
+    """
+    What `current_user` is. `user_id` is free (it's the token subject);
+    reading any other Identity field resolves the user on first access.
+    """
+
+    def __init__(self, jwt_header, jwt_data):
+        self.user_id = int(jwt_data["sub"])
+        self._jwt_header = jwt_header
+        self._jwt_data = jwt_data
+        self._identity = None
+
+    def __getattr__(self, name):
+        if self._identity is None:
+            self._identity = resolve(self.user_id)
+            if self._identity is None:
+                # Handled by JWTManager: 401 "Error loading the user".
+                raise UserLookupError(f"User {self.user_id} not found",
+                                      self._jwt_header, self._jwt_data)
+        return getattr(self._identity, name)
+
+
+def init_identity(jwt):
+    """Register LazyIdentity as flask_jwt_extended's user loader."""
+
+    @jwt.user_lookup_loader
+    def load_identity(jwt_header, jwt_data):
+        return LazyIdentity(jwt_header, jwt_data)
+
+
+# ------------------------
+# Token claims
+# ------------------------
+def claims_for(user):
+    """additional_claims for a User (with .worker/.contractor loaded)."""
+    claims = {"role": user.role}
+    if user.worker is not None:
+        claims["worker_id"] = user.worker.id
+    if user.contractor is not None:
+        claims["contractor_id"] = user.contractor.id
+    return claims
+
+
+def profile_id(name):
+    """
+    worker_id / contractor_id of the caller, straight from the access token.
+    Tokens minted before the claims existed fall back to a (cached) lookup.
+    """
+    claims = get_jwt()
+    if name in claims:
+        return claims[name]
+    return getattr(current_user, name)
+
+
+# ------------------------
+# Invalidation on profile writes
+# ------------------------
+@event.listens_for(Session, "before_flush")
+def _collect_touched_users(session, flush_context, instances):
+    touched = session.info.setdefault("identity_touched", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            touched.add(obj.id)
+        elif isinstance(obj, (Worker, Contractor)):
+            touched.add(obj.user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_touched_users(session):
+    for user_id in session.info.pop("identity_touched", ()):
+        if user_id is not None:
+            invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_touched_users(session):
+    session.info.pop("identity_touched", None)
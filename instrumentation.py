@@ -0,0 +1,161 @@
+# instrumentation.py
+"""
+Per-route latency, DB time and statement counts, plus a slow-query log.
+
+Blueprint hooks time each request; cursor-execute listeners on the engine
+add every statement's duration to the request it ran in. At the end of
+the request three histograms are updated, labelled by endpoint:
+
+    crewquick_http_request_seconds        wall time (+ method, status)
+    crewquick_http_request_db_seconds     time spent inside cursor.execute
+    crewquick_http_request_db_statements  statements sent
+
+Statements slower than SLOW_QUERY_MS are logged (logger
+"crewquick.slow_sql") with their SQL normalized -- literals and bind
+parameters replaced by ?, IN-lists and multi-row VALUES collapsed -- so
+log lines for the same query group together.
+
+Requests served outside Flask (the async routes in asgi.py) are tracked
+the same way through start_request_stats / finish_request_stats, which
+keep their per-request totals in a ContextVar instead of flask.g.
+
+Cost per request is a handful of perf_counter() calls and dict updates.
+Streamed responses are recorded when the view returns, so statements run
+while the body streams (exports) are not counted.
+
+Configuration (env):
+    SLOW_QUERY_MS   threshold for the slow-query log (default 250; 0 = off)
+"""
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+import metrics
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))
+
+slow_log = logging.getLogger("crewquick.slow_sql")
+
+REQUEST_SECONDS = metrics.Histogram(
+    "crewquick_http_request_seconds", "Request wall time by endpoint.",
+    labelnames=("endpoint", "method", "status"))
+REQUEST_DB_SECONDS = metrics.Histogram(
+    "crewquick_http_request_db_seconds", "Time spent executing SQL per request.",
+    labelnames=("endpoint",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+REQUEST_DB_STATEMENTS = metrics.Histogram(
+    "crewquick_http_request_db_statements", "SQL statements sent per request.",
+    labelnames=("endpoint",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100))
+SLOW_QUERIES = metrics.Counter(
+    "crewquick_db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.",
+    labelnames=("endpoint",))
+
+
+# Per-request totals for non-Flask requests: {"endpoint", "db_seconds", "db_statements"}.
+_request_stats = ContextVar("crewquick_request_stats", default=None)
+
+
+def _endpoint():
+    return request.endpoint or "unmatched"
+
+
+# ------------------------
+# Request hooks
+# ------------------------
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.db_seconds = 0.0
+    g.db_statements = 0
+
+
+def _finish_request(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+    endpoint = _endpoint()
+    REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint,
+                            method=request.method, status=str(response.status_code))
+    REQUEST_DB_SECONDS.observe(g.db_seconds, endpoint=endpoint)
+    REQUEST_DB_STATEMENTS.observe(g.db_statements, endpoint=endpoint)
+    return response
+
+
+def init_request_metrics(bp):
+    bp.before_request(_start_request)
+    bp.after_request(_finish_request)
+
+
+def start_request_stats(endpoint):
+    """Begin timing a non-Flask request; pass the result to finish_request_stats."""
+    stats = {"endpoint": endpoint, "db_seconds": 0.0, "db_statements": 0}
+    return time.perf_counter(), _request_stats.set(stats)
+
+
+def finish_request_stats(started, method, status):
+    began, token = started
+    stats = _request_stats.get()
+    _request_stats.reset(token)
+    endpoint = stats["endpoint"]
+    REQUEST_SECONDS.observe(time.perf_counter() - began, endpoint=endpoint,
+                            method=method, status=str(status))
+    REQUEST_DB_SECONDS.observe(stats["db_seconds"], endpoint=endpoint)
+    REQUEST_DB_STATEMENTS.observe(stats["db_statements"], endpoint=endpoint)
+
+
+# ------------------------
+# SQL listeners
+# ------------------------
+_PARAM = re.compile(r"%\(\w+\)s|%s|\$\d+|\?")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_ROWS = re.compile(r"(\([?,\s]+\))(?:\s*,\s*\([?,\s]+\))+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """SQL with literals/parameters as ? and lists collapsed, on one line."""
+    sql = _STRING.sub("?", statement)
+    sql = _PARAM.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (?)", sql)
+    sql = _ROWS.sub(r"\1", sql)  # multi-row VALUES (?, ?), (?, ?), ... -> (?, ?)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    endpoint = "-"
+    if has_request_context() and "request_started" in g:
+        g.db_seconds += elapsed
+        g.db_statements += 1
+        endpoint = _endpoint()
+    else:
+        stats = _request_stats.get()
+        if stats is not None:
+            stats["db_seconds"] += elapsed
+            stats["db_statements"] += 1
+            endpoint = stats["endpoint"]
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc(endpoint=endpoint)
+        slow_log.warning("slow query %.1fms endpoint=%s sql=%s",
+                         elapsed * 1000, endpoint, normalize_sql(statement))
+
+
+def instrument_engine(engine):
+    """Time every statement `engine` executes."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
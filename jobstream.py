@@ -0,0 +1,340 @@
+# jobstream.py
+"""
+New-job push: Postgres LISTEN/NOTIFY fanned out to Server-Sent Events.
+
+Writers call notify_jobs() inside the transaction that inserts the jobs;
+Postgres delivers the NOTIFY only if and when that transaction commits.
+The payload is {"id": ..., "skills": [...]} on channel JOBS_CHANNEL.
+
+Each process runs at most one listener: a thread holding one dedicated
+connection (taken out of the pool) that LISTENs on the channel. For every
+batch of notifications it works out which subscribers want which jobs
+(skills overlap, or no filter at all), loads just those rows in one query,
+renders each event once, and hands the same bytes to every matching
+subscriber. A thousand open streams therefore cost one connection and one
+query per batch, not a thousand polls of GET /jobs.
+
+Subscribers are either threads (the Flask view) or asyncio tasks (asgi.py);
+both get a bounded queue. One that falls SSE_QUEUE_SIZE events behind is
+closed rather than allowed to buffer without limit -- the client reconnects
+with Last-Event-ID and catches up from the database. The same happens to
+everyone if the listener connection drops, since notifications sent while
+it was down are gone.
+
+Event ids are job ids. Replay returns jobs with a higher id; a job that
+committed after one with a higher id (rare: two posts racing) can be missed
+by a client that disconnected in between.
+
+A stream served by a Flask thread only notices its client has gone at its
+next write, so a dead stream holds its thread (and its SSE_SYNC_STREAMS
+slot) for up to SSE_HEARTBEAT_SECONDS.
+
+Browsers' EventSource can't send an Authorization header; clients use a
+fetch-based SSE reader, as for every other authenticated route.
+
+Configuration (env):
+    SSE_HEARTBEAT_SECONDS  comment line sent on idle streams (default 15)
+    SSE_QUEUE_SIZE         events a subscriber may fall behind (default 100)
+    SSE_REPLAY_MAX         most events replayed on reconnect; beyond that the
+                           client gets a `reset` event and reloads (default 100)
+    SSE_MAX_SUBSCRIBERS    open streams per process (default 1000)
+    SSE_SYNC_STREAMS       of those, streams served by Flask threads -- each
+                           pins a worker thread (default 2; serve streams
+                           from asgi:app for more)
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+from sqlalchemy import String, cast, select as sql_select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+import metrics
+from models import Job
+from serializers import dumps
+
+JOBS_CHANNEL = "crewquick_jobs"
+# NOTIFY payloads must stay under 8000 bytes; past this the skills are left
+# out and the listener reads them from the row instead.
+MAX_PAYLOAD_BYTES = 7000
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_REPLAY_MAX = int(os.getenv("SSE_REPLAY_MAX", "100"))
+SSE_MAX_SUBSCRIBERS = int(os.getenv("SSE_MAX_SUBSCRIBERS", "1000"))
+SSE_SYNC_STREAMS = int(os.getenv("SSE_SYNC_STREAMS", "2"))
+
+LISTEN_PING_SECONDS = 30  # SELECT 1 on an idle listener: keeps proxies from dropping it
+# How long a new stream waits for LISTEN; past that it is refused (503)
+# rather than opened with a gap between its replay and live events.
+LISTEN_READY_SECONDS = 5
+
+log = logging.getLogger(__name__)
+
+SSE_SUBSCRIBERS = metrics.Gauge("crewquick_sse_subscribers", "Open /jobs/stream connections.")
+SSE_EVENTS = metrics.Counter(
+    "crewquick_sse_events_total", "Job events handed to subscribers.")
+SSE_DROPPED = metrics.Counter(
+    "crewquick_sse_dropped_subscribers_total",
+    "Streams closed because the subscriber fell behind or the listener reconnected.")
+
+
+class StreamFull(Exception):
+    """No room for another subscriber in this process."""
+
+
+# ------------------------
+# Writers
+# ------------------------
+def _payload(job_id, skills):
+    payload = json.dumps({"id": job_id, "skills": list(skills or [])}, separators=(",", ":"))
+    if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+        payload = json.dumps({"id": job_id})
+    return payload
+
+
+def notify_jobs(session, jobs):
+    """
+    Queue a NOTIFY for each (job_id, required_skills) in `jobs`, on the
+    session's transaction: one statement, delivered on commit.
+    """
+    payloads = [_payload(job_id, skills) for job_id, skills in jobs]
+    if payloads:
+        session.execute(
+            text("SELECT pg_notify(:channel, p) FROM unnest(CAST(:payloads AS text[])) AS p"),
+            {"channel": JOBS_CHANNEL, "payloads": payloads})
+
+
+# The same, for set-based SQL: NOTIFY_SQL.format(id="j.id", skills="j.required_skills").
+NOTIFY_SQL = (
+    f"pg_notify('{JOBS_CHANNEL}', CASE WHEN octet_length(json_build_object('id', {{id}}, 'skills', "
+    f"coalesce({{skills}}, '{{{{}}}}'))::text) > {MAX_PAYLOAD_BYTES} "
+    f"THEN json_build_object('id', {{id}})::text "
+    f"ELSE json_build_object('id', {{id}}, 'skills', coalesce({{skills}}, '{{{{}}}}'))::text END)"
+)
+
+
+# ------------------------
+# SSE framing
+# ------------------------
+def format_event(event_id, event, data):
+    """One SSE event; `data` is single-line JSON."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {data}\n\n"
+
+
+HEARTBEAT = ": keepalive\n\n"
+RESET = format_event(None, "reset", "{}")  # replay gap too large: reload the feed
+RETRY = "retry: 5000\n\n"  # client reconnect delay, ms
+
+
+def last_event_id(raw):
+    """Last-Event-ID header / ?last_event_id= -> int or None; ValueError if garbage."""
+    if raw in (None, ""):
+        return None
+    value = int(raw)
+    if value < 0:
+        raise ValueError(raw)
+    return value
+
+
+# ------------------------
+# Subscribers
+# ------------------------
+class Subscriber:
+    def __init__(self, skills):
+        self.skills = frozenset(skills) if skills else None
+        self.closed = False
+
+    def matches(self, skills):
+        return self.skills is None or not self.skills.isdisjoint(skills)
+
+    def deliver(self, item):
+        """Called from the listener thread. item is (job_id, text) or None (= end)."""
+        if self.closed:
+            return
+        if item is not None and self._size() >= SSE_QUEUE_SIZE:
+            SSE_DROPPED.inc()
+            item = None
+        if item is None:
+            self.closed = True
+        self._put(item)
+
+
+class ThreadSubscriber(Subscriber):
+    """For a streaming Flask view; get() blocks its request thread."""
+
+    def __init__(self, skills):
+        super().__init__(skills)
+        self._queue = queue.Queue()
+        self._put = self._queue.put_nowait
+        self._size = self._queue.qsize
+
+    def get(self, timeout):
+        """Next item, or HEARTBEAT after `timeout` idle seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return HEARTBEAT
+
+
+class AsyncSubscriber(Subscriber):
+    """For an asyncio task; must be created on its event loop."""
+
+    def __init__(self, skills):
+        super().__init__(skills)
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._size = self._queue.qsize
+
+    def _put(self, item):
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        except RuntimeError:  # loop already closed
+            self.closed = True
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return HEARTBEAT
+
+
+# ------------------------
+# Listener / fan-out
+# ------------------------
+class JobStream:
+    """
+    The per-process broker. `columns` are the Job columns an event carries
+    and `render(row)` turns one selected row into the event's JSON object.
+    """
+
+    def __init__(self, columns, render):
+        self.columns = columns
+        self.render = render
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._engine = None
+        self._thread = None
+        # Set while LISTEN is active, so a new subscriber's replay can't
+        # leave a gap before live events start arriving.
+        self.ready = threading.Event()
+
+    # -- subscribers --
+    def subscribe(self, engine, subscriber):
+        with self._lock:
+            if len(self._subscribers) >= SSE_MAX_SUBSCRIBERS:
+                raise StreamFull()
+            if isinstance(subscriber, ThreadSubscriber):
+                threads = sum(isinstance(s, ThreadSubscriber) for s in self._subscribers)
+                if threads >= SSE_SYNC_STREAMS:
+                    raise StreamFull()
+            self._subscribers.add(subscriber)
+            SSE_SUBSCRIBERS.inc()
+            if self._thread is None or not self._thread.is_alive():
+                self._engine = engine
+                self._thread = threading.Thread(target=self._listen, name="jobstream-listener",
+                                                daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+                SSE_SUBSCRIBERS.dec()
+
+    # -- replay --
+    def replay_statement(self, after_id, skills):
+        """Jobs after `after_id` a subscriber with `skills` would have been sent."""
+        stmt = sql_select(*self.columns).where(Job.id > after_id)
+        if skills:
+            stmt = stmt.where(Job.required_skills.overlap(cast(list(skills), ARRAY(String))))
+        return stmt.order_by(Job.id).limit(SSE_REPLAY_MAX + 1)
+
+    def render_event(self, row):
+        data = dumps(self.render(row)).decode()
+        return format_event(row.id, "job", data)
+
+    # -- listener thread --
+    def _listen(self):
+        backoff = 1
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                self._listen_once()
+                backoff = 1
+            except Exception:
+                self.ready.clear()
+                # Whatever was sent while we weren't listening is lost: make
+                # every client reconnect and replay from the database.
+                self._close_all()
+                log.warning("job stream listener failed; reconnecting in %ss", backoff, exc_info=True)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _listen_once(self):
+        pooled = self._engine.raw_connection()
+        conn = pooled.driver_connection
+        pooled.detach()  # ours for as long as we listen; the pool opens a replacement
+        try:
+            conn.autocommit = True
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {JOBS_CHANNEL}")
+            self.ready.set()
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        return
+                if select.select([conn], [], [], LISTEN_PING_SECONDS) == ([], [], []):
+                    cur.execute("SELECT 1")
+                    continue
+                conn.poll()
+                events = []
+                while conn.notifies:
+                    try:
+                        events.append(json.loads(conn.notifies.pop(0).payload))
+                    except ValueError:
+                        log.warning("ignoring malformed %s payload", JOBS_CHANNEL)
+                if events:
+                    self._dispatch(events)
+        finally:
+            self.ready.clear()
+            conn.close()
+
+    def _dispatch(self, events):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        # Load only the jobs somebody wants; payloads without skills (too
+        # big for NOTIFY) are decided once the row is read.
+        ids = [e["id"] for e in events
+               if "skills" not in e or any(s.matches(e["skills"]) for s in subscribers)]
+        if not ids:
+            return
+        with self._engine.connect() as conn:
+            rows = conn.execute(
+                sql_select(*self.columns).where(Job.id.in_(ids)).order_by(Job.id)).all()
+        for row in rows:
+            skills = row.required_skills or []
+            message = None
+            for subscriber in subscribers:
+                if subscriber.matches(skills):
+                    message = message or self.render_event(row)
+                    subscriber.deliver((row.id, message))
+                    SSE_EVENTS.inc()
+
+    def _close_all(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if not subscriber.closed:
+                SSE_DROPPED.inc()
+            subscriber.deliver(None)
@@ -0,0 +1,309 @@
+# matching.py
+"""
+Precomputed worker <-> job match scores.
+
+Scoring every worker against every job per request is a cross join, so it
+happens in the background instead. `job_matches` holds each worker's best
+MATCH_KEEP open jobs, indexed by (worker_id, score, job_id) so that
+/me/recommended-jobs is a single index range scan.
+
+What needs rescoring goes into `match_queue` in the transaction that made
+the change, never a separate one, so a write that rolls back queues nothing:
+  * ORM writes are picked up by a flush hook -- a new job, a job whose
+    skills, coordinates or status changed, or a worker whose skills,
+    coordinates or transportation changed;
+  * bulk Core INSERTs (POST /jobs/bulk, flask import-jobs) call enqueue()
+    or insert into the queue themselves.
+`flask match-worker` (cli.py) drains the queue. Each batch claims up to
+MATCH_BATCH_SIZE entries with FOR UPDATE SKIP LOCKED and deletes them in
+the same transaction as the rescoring, so any number of workers can run
+side by side, and a batch that fails (a deadlock between two workers, a
+timeout) goes back on the queue and is retried. Entries aren't
+de-duplicated on the way in; repeats within a batch are scored once.
+
+Scoring is set-based SQL, one statement per batch. Each batch numbers the
+skills that appear on both sides (its vocabulary), turns every job's and
+every worker's skills into a bit string over it, and compares the two with
+`bit_count(job_bits & worker_bits)`. Candidates are found with the GIN
+indexes on the skills arrays (&&), so only pairs sharing a skill are ever
+compared. workers.skills is text[] and jobs.required_skills varchar[],
+which && won't compare, so the array built from one side is cast to the
+other's type. bit_count() on bit strings needs PostgreSQL 14 or later.
+The score is
+
+    SKILL_WEIGHT     * share of the job's required skills the worker has
+  + PROXIMITY_WEIGHT * 1 / (1 + distance / reach)
+
+where reach depends on transportation (REACH_KM) and an unknown location on
+either side counts as NEUTRAL_PROXIMITY.
+
+A new job is scored against every worker who shares a skill and written
+only where it beats that worker's current MATCH_KEEP-th match; lists are
+then trimmed back to MATCH_KEEP. A changed worker is rescored
+against the newest MATCH_RECENT_JOBS open jobs, replacing their list. A
+job that closes drops out of every list it was in; its slots are refilled
+the next time those workers are scored.
+
+Configuration (env):
+    MATCH_KEEP            matches kept per worker (default 200)
+    MATCH_RECENT_JOBS     open jobs a changed worker is scored against (default 5000)
+    MATCH_BATCH_SIZE      queue entries claimed per transaction (default 100; a
+                          batch must finish within DB_STATEMENT_TIMEOUT_MS)
+    MATCH_POLL_SECONDS    idle wait between queue polls (default 1)
+"""
+import logging
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import event, insert, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+import metrics
+from geo import DISTANCE_SQL
+from models import Job, MatchQueue, Worker
+
+MATCH_KEEP = int(os.getenv("MATCH_KEEP", "200"))
+MATCH_RECENT_JOBS = int(os.getenv("MATCH_RECENT_JOBS", "5000"))
+MATCH_BATCH_SIZE = int(os.getenv("MATCH_BATCH_SIZE", "100"))
+MATCH_POLL_SECONDS = float(os.getenv("MATCH_POLL_SECONDS", "1"))
+MAX_ATTEMPTS = 3  # consecutive failed batches before `--once` gives up
+
+SKILL_WEIGHT = 0.7
+PROXIMITY_WEIGHT = 0.3
+NEUTRAL_PROXIMITY = 0.5
+# Distance (km) at which proximity halves; workers without a car reach less far.
+REACH_KM = {"own vehicle": 25.0}
+DEFAULT_REACH_KM = 10.0
+
+# Columns whose change makes a row's matches stale.
+JOB_FIELDS = ("required_skills", "lat", "lng", "status")
+WORKER_FIELDS = ("skills", "lat", "lng", "transportation")
+
+log = logging.getLogger(__name__)
+
+MATCH_SCORED = metrics.Counter(
+    "crewquick_match_scored_total", "Queue entries rescored by match workers, by kind.",
+    labelnames=("kind",))
+MATCH_BATCH_SECONDS = metrics.Histogram(
+    "crewquick_match_batch_seconds", "Time to claim and score one match queue batch.")
+
+
+# ------------------------
+# Enqueueing
+# ------------------------
+def enqueue(session, kind, ids):
+    """Queue `ids` of `kind` ("job" or "worker") on the session's transaction."""
+    rows = [{"kind": kind, "ref_id": ref_id} for ref_id in ids]
+    if rows:
+        session.execute(insert(MatchQueue), rows)
+
+
+def _changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[f].history.has_changes() for f in fields)
+
+
+@event.listens_for(Session, "after_flush")
+def _enqueue_flushed(session, flush_context):
+    # Ids are assigned by now; session.new/dirty still list what was flushed.
+    rows = []
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Job) and (obj in session.new or _changed(obj, JOB_FIELDS)):
+            rows.append({"kind": "job", "ref_id": obj.id})
+        elif isinstance(obj, Worker) and (obj in session.new or _changed(obj, WORKER_FIELDS)):
+            if obj.skills:
+                rows.append({"kind": "worker", "ref_id": obj.id})
+    if rows:
+        session.connection().execute(insert(MatchQueue.__table__), rows)
+
+
+# ------------------------
+# Scoring
+# ------------------------
+def _bits(skills):
+    """The bit string for a `skills` array over the batch vocabulary (CTE `vocab`)."""
+    return (f"(SELECT bit_or(set_bit(repeat('0', v.width)::varbit, v.bit, 1)) "
+            f"FROM vocab v WHERE v.name = ANY({skills}))")
+
+
+def _reach(transportation):
+    cases = " ".join(f"WHEN '{mode}' THEN {km}" for mode, km in REACH_KM.items())
+    return f"CASE {transportation} {cases} ELSE {DEFAULT_REACH_KM} END"
+
+
+# Needs CTEs j (id, skills, lat, lng) and w (id, skills, lat, lng,
+# transportation); yields `scored` (worker_id, job_id, score) for every pair
+# sharing at least one skill.
+SCORE_CTES = f"""
+    vocab AS (
+        SELECT name, (row_number() OVER (ORDER BY name) - 1)::int AS bit,
+               count(*) OVER ()::int AS width
+        FROM (SELECT unnest(skills) FROM j INTERSECT SELECT unnest(skills) FROM w) s(name)
+    ),
+    -- MATERIALIZED: build each row's bits once, not once per pair compared.
+    jb AS MATERIALIZED (SELECT j.*, cardinality(j.skills) AS wanted, {_bits("j.skills")} AS bits FROM j),
+    wb AS MATERIALIZED (SELECT w.*, {_bits("w.skills")} AS bits FROM w),
+    scored AS (
+        SELECT wb.id AS worker_id, jb.id AS job_id,
+               CAST({SKILL_WEIGHT} * bit_count(jb.bits & wb.bits) / jb.wanted
+               + {PROXIMITY_WEIGHT} * CASE
+                   WHEN jb.lat IS NULL OR wb.lat IS NULL THEN {NEUTRAL_PROXIMITY}
+                   ELSE 1 / (1 + {DISTANCE_SQL.format(lat1="jb.lat", lng1="jb.lng",
+                                                      lat2="wb.lat", lng2="wb.lng")}
+                                 / {_reach("wb.transportation")})
+                 END AS double precision) AS score
+        FROM jb JOIN wb ON jb.bits IS NOT NULL AND wb.bits IS NOT NULL
+                       AND bit_count(jb.bits & wb.bits) > 0
+    )
+"""
+
+OPEN_JOB = "coalesce(status, 'open') = 'open' AND cardinality(required_skills) > 0"
+
+SCORE_JOBS_SQL = f"""
+    WITH j AS (
+        SELECT id, required_skills AS skills, lat, lng FROM jobs
+        WHERE id = ANY(:ids) AND {OPEN_JOB}
+    ),
+    w AS (
+        SELECT id, skills, lat, lng, transportation FROM workers
+        WHERE skills && CAST((SELECT array_agg(DISTINCT s) FROM j, unnest(j.skills) s) AS text[])
+    ),
+    {SCORE_CTES},
+    -- Each candidate's current MATCH_KEEP-th match: anything ranking below
+    -- it would only be trimmed again, so it isn't written at all.
+    cutoff AS (
+        SELECT wb.id AS worker_id, c.score, c.job_id
+        FROM wb CROSS JOIN LATERAL (
+            SELECT score, job_id FROM job_matches m WHERE m.worker_id = wb.id
+            ORDER BY score DESC, job_id DESC OFFSET :keep - 1 LIMIT 1
+        ) c
+    )
+    INSERT INTO job_matches (worker_id, job_id, score, computed_at)
+    SELECT s.worker_id, s.job_id, s.score, :now
+    FROM scored s LEFT JOIN cutoff c ON c.worker_id = s.worker_id
+    WHERE c.worker_id IS NULL OR (s.score, s.job_id) > (c.score, c.job_id)
+    ORDER BY s.worker_id, s.job_id
+    ON CONFLICT (worker_id, job_id) DO UPDATE
+        SET score = excluded.score, computed_at = excluded.computed_at
+    RETURNING worker_id
+"""
+
+TRIM_SQL = """
+    DELETE FROM job_matches m
+    USING (
+        SELECT worker_id, job_id,
+               row_number() OVER (PARTITION BY worker_id ORDER BY score DESC, job_id DESC) AS rank
+        FROM job_matches WHERE worker_id = ANY(:ids)
+    ) r
+    WHERE m.worker_id = r.worker_id AND m.job_id = r.job_id AND r.rank > :keep
+"""
+
+SCORE_WORKERS_SQL = f"""
+    WITH w AS (
+        SELECT id, skills, lat, lng, transportation FROM workers
+        WHERE id = ANY(:ids) AND cardinality(skills) > 0
+    ),
+    recent AS (
+        SELECT id, required_skills, lat, lng FROM jobs
+        WHERE {OPEN_JOB}
+        ORDER BY created_at DESC, id DESC
+        LIMIT :recent
+    ),
+    j AS (
+        SELECT id, required_skills AS skills, lat, lng FROM recent
+        WHERE required_skills && CAST((SELECT array_agg(DISTINCT s) FROM w, unnest(w.skills) s)
+                                      AS varchar[])
+    ),
+    {SCORE_CTES}
+    INSERT INTO job_matches (worker_id, job_id, score, computed_at)
+    SELECT worker_id, job_id, score, :now FROM (
+        SELECT scored.*,
+               row_number() OVER (PARTITION BY worker_id ORDER BY score DESC, job_id DESC) AS rank
+        FROM scored
+    ) ranked
+    WHERE rank <= :keep
+    ORDER BY worker_id, job_id
+    ON CONFLICT (worker_id, job_id) DO UPDATE
+        SET score = excluded.score, computed_at = excluded.computed_at
+"""
+
+
+def score_jobs(conn, job_ids):
+    """(Re)score jobs against every worker; closed or skill-less jobs lose their matches."""
+    conn.execute(text("DELETE FROM job_matches WHERE job_id = ANY(:ids)"), {"ids": job_ids})
+    workers = conn.execute(text(SCORE_JOBS_SQL), {
+        "ids": job_ids, "keep": MATCH_KEEP, "now": datetime.utcnow()}).scalars().all()
+    if workers:
+        conn.execute(text(TRIM_SQL), {"ids": sorted(set(workers)), "keep": MATCH_KEEP})
+
+
+def score_workers(conn, worker_ids):
+    """Replace each worker's list with their best MATCH_KEEP recent open jobs."""
+    conn.execute(text("DELETE FROM job_matches WHERE worker_id = ANY(:ids)"), {"ids": worker_ids})
+    conn.execute(text(SCORE_WORKERS_SQL), {
+        "ids": worker_ids, "recent": MATCH_RECENT_JOBS, "keep": MATCH_KEEP,
+        "now": datetime.utcnow()})
+    # Another batch may have rescored the same worker concurrently; its rows
+    # weren't visible to our DELETE.
+    conn.execute(text(TRIM_SQL), {"ids": worker_ids, "keep": MATCH_KEEP})
+
+
+# ------------------------
+# Queue worker
+# ------------------------
+CLAIM_SQL = """
+    DELETE FROM match_queue WHERE id IN (
+        SELECT id FROM match_queue ORDER BY id LIMIT :n FOR UPDATE SKIP LOCKED
+    )
+    RETURNING kind, ref_id
+"""
+
+
+def process_batch(engine, size=MATCH_BATCH_SIZE):
+    """Claim and score one batch in one transaction; returns the entries handled."""
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        claimed = conn.execute(text(CLAIM_SQL), {"n": size}).all()
+        ids = {"job": set(), "worker": set()}
+        for kind, ref_id in claimed:
+            if kind in ids:
+                ids[kind].add(ref_id)
+            else:
+                log.warning("dropping match_queue entry of unknown kind %r", kind)
+        # Jobs first: a worker rescored in the same batch then sees them too.
+        if ids["job"]:
+            score_jobs(conn, sorted(ids["job"]))
+        if ids["worker"]:
+            score_workers(conn, sorted(ids["worker"]))
+    if claimed:
+        MATCH_BATCH_SECONDS.observe(time.perf_counter() - started)
+        for kind, refs in ids.items():
+            if refs:
+                MATCH_SCORED.inc(len(refs), kind=kind)
+    return len(claimed)
+
+
+def run(engine, once=False, poll=MATCH_POLL_SECONDS, size=MATCH_BATCH_SIZE):
+    """Drain the queue; keep polling unless `once`. Returns entries handled."""
+    handled, failures = 0, 0
+    while True:
+        try:
+            n = process_batch(engine, size)
+            failures = 0
+        except DBAPIError:
+            # Deadlock with another match worker, timeout, lost connection:
+            # the claimed entries were rolled back onto the queue.
+            failures += 1
+            if once and failures >= MAX_ATTEMPTS:
+                raise
+            backoff = min(poll * 2 ** failures, 30)
+            log.warning("match batch failed; retrying in %ss", backoff, exc_info=True)
+            time.sleep(backoff)
+            continue
+        handled += n
+        if n < size:
+            if once:
+                return handled
+            time.sleep(poll)
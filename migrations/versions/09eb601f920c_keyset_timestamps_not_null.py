@@ -0,0 +1,43 @@
+"""keyset timestamps not null
+
+Revision ID: 09eb601f920c
+Revises: cc820f173376
+Create Date: 2026-10-17 21:12:05.481337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '09eb601f920c'
+down_revision: Union[str, Sequence[str], None] = 'cc820f173376'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column) pairs that are keyset sort keys: a row whose key is NULL
+# never compares below a cursor, so every page after the first skipped it.
+COLUMNS = (('jobs', 'created_at'), ('job_applications', 'applied_at'))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in COLUMNS:
+        # When unknown, the epoch: those rows sort last, newest first.
+        op.execute(f"UPDATE {table} SET {column} = 'epoch' WHERE {column} IS NULL")
+        # SET NOT NULL alone scans the table under ACCESS EXCLUSIVE. With a
+        # validated CHECK in place (validating only takes SHARE UPDATE
+        # EXCLUSIVE) Postgres 12+ skips that scan.
+        check = f'ck_{table}_{column}_not_null'
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {check} CHECK ({column} IS NOT NULL) NOT VALID")
+        op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}")
+        op.alter_column(table, column, existing_type=sa.DateTime(), nullable=False)
+        op.drop_constraint(check, table)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in COLUMNS:
+        op.alter_column(table, column, existing_type=sa.DateTime(), nullable=True)
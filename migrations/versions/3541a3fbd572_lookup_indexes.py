@@ -0,0 +1,64 @@
+"""lookup indexes
+
+Revision ID: 3541a3fbd572
+Revises: 482cd713947d
+Create Date: 2026-10-17 11:20:05.913446
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3541a3fbd572'
+down_revision: Union[str, Sequence[str], None] = '482cd713947d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns) -- built CONCURRENTLY so live traffic keeps writing.
+INDEXES = [
+    ('ix_workers_user_id', 'workers', ['user_id']),
+    ('ix_contractors_user_id', 'contractors', ['user_id']),
+    # /me/jobs filters on contractor_id and sorts on created_at.
+    ('ix_jobs_contractor_id_created_at', 'jobs', ['contractor_id', 'created_at']),
+    # Keyset order of the job feed.
+    ('ix_jobs_created_at_id', 'jobs', ['created_at', 'id']),
+    # /me/applications filters on worker_id and sorts on applied_at.
+    ('ix_job_applications_worker_id_applied_at', 'job_applications', ['worker_id', 'applied_at']),
+    # Applicant lookups per job and ON DELETE CASCADE from jobs.
+    ('ix_job_applications_job_id', 'job_applications', ['job_id']),
+]
+
+# Unique constraints the routes rely on. Databases restored from the
+# production dump already have them; databases built any other way may not.
+UNIQUE_CONSTRAINTS = [
+    ('users_email_key', 'users', 'email'),
+    ('uniq_worker_job', 'job_applications', 'worker_id, job_id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in UNIQUE_CONSTRAINTS:
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{name}') THEN
+                    ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE ({columns});
+                END IF;
+            END $$;
+        """)
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The unique constraints are part of the baseline schema; leave them.
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,43 @@
+"""jobs full-text search vector
+
+Revision ID: 482cd713947d
+Revises: 59ee5c0e2e5c
+Create Date: 2026-10-17 10:03:27.551920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '482cd713947d'
+down_revision: Union[str, Sequence[str], None] = '59ee5c0e2e5c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Title outranks description ('A' vs 'B' weight) in ts_rank.
+    op.add_column('jobs', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_jobs_search_vector', 'jobs', ['search_vector'],
+                        unique=False, postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_jobs_search_vector', table_name='jobs', postgresql_concurrently=True)
+    op.drop_column('jobs', 'search_vector')
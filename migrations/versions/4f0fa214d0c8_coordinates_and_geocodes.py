@@ -0,0 +1,51 @@
+"""coordinates and geocodes
+
+Revision ID: 4f0fa214d0c8
+Revises: 88eba8b1d81a
+Create Date: 2026-10-17 16:20:08.513377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f0fa214d0c8'
+down_revision: Union[str, Sequence[str], None] = '88eba8b1d81a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('jobs', 'workers', 'contractors')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'geocodes',
+        sa.Column('place', sa.String(length=255), nullable=False),
+        sa.Column('lat', sa.Double(), nullable=False),
+        sa.Column('lng', sa.Double(), nullable=False),
+        sa.PrimaryKeyConstraint('place'),
+    )
+    # Nullable, no default: a catalog-only change, no table rewrite.
+    # Existing rows get coordinates from `flask load-geocodes`.
+    for table in TABLES:
+        op.add_column(table, sa.Column('lat', sa.Double(), nullable=True))
+        op.add_column(table, sa.Column('lng', sa.Double(), nullable=True))
+
+    # Radius search range-scans a bounding box on (lat, lng); see geo.py.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_jobs_lat_lng', 'jobs', ['lat', 'lng'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_jobs_lat_lng', table_name='jobs', postgresql_concurrently=True)
+    for table in TABLES:
+        op.drop_column(table, 'lng')
+        op.drop_column(table, 'lat')
+    op.drop_table('geocodes')
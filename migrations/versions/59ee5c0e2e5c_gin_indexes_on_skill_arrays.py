@@ -0,0 +1,36 @@
+"""gin indexes on skill arrays
+
+Revision ID: 59ee5c0e2e5c
+Revises: 782c54f35c1e
+Create Date: 2026-10-17 09:12:41.208113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '59ee5c0e2e5c'
+down_revision: Union[str, Sequence[str], None] = '782c54f35c1e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can't run inside the migration transaction, and we don't
+    # want to hold a write lock on jobs/workers while the index builds.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_jobs_required_skills', 'jobs', ['required_skills'],
+                        unique=False, postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_workers_skills', 'workers', ['skills'],
+                        unique=False, postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_workers_skills', table_name='workers', postgresql_concurrently=True)
+        op.drop_index('ix_jobs_required_skills', table_name='jobs', postgresql_concurrently=True)
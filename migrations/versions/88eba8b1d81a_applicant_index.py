@@ -0,0 +1,39 @@
+"""applicants by job index
+
+Revision ID: 88eba8b1d81a
+Revises: 3541a3fbd572
+Create Date: 2026-10-17 14:02:41.270195
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '88eba8b1d81a'
+down_revision: Union[str, Sequence[str], None] = '3541a3fbd572'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # /me/jobs/<id>/applicants filters on job_id and sorts on applied_at.
+    # The composite index also covers plain job_id lookups, so it replaces
+    # ix_job_applications_job_id.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_job_applications_job_id_applied_at', 'job_applications',
+                        ['job_id', 'applied_at'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_job_applications_job_id', table_name='job_applications',
+                      postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_job_applications_job_id', 'job_applications',
+                        ['job_id'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_job_applications_job_id_applied_at', table_name='job_applications',
+                      postgresql_concurrently=True)
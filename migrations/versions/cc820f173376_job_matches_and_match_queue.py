@@ -0,0 +1,61 @@
+"""job matches and match queue
+
+Revision ID: cc820f173376
+Revises: 4f0fa214d0c8
+Create Date: 2026-10-17 18:41:52.094716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cc820f173376'
+down_revision: Union[str, Sequence[str], None] = '4f0fa214d0c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # New, empty tables: plain CREATE INDEX is fine here.
+    op.create_table(
+        'job_matches',
+        sa.Column('worker_id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Double(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['worker_id'], ['workers.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('worker_id', 'job_id'),
+    )
+    op.create_index('ix_job_matches_worker_id_score_job_id', 'job_matches',
+                    ['worker_id', 'score', 'job_id'], unique=False)
+    # Serves the ON DELETE CASCADE from jobs.
+    op.create_index('ix_job_matches_job_id', 'job_matches', ['job_id'], unique=False)
+
+    op.create_table(
+        'match_queue',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('ref_id', sa.Integer(), nullable=False),
+        sa.Column('enqueued_at', sa.DateTime(), nullable=False,
+                  server_default=sa.text("timezone('utc', now())")),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+    # Everyone with skills gets scored once by the first match-worker run.
+    op.execute("""
+        INSERT INTO match_queue (kind, ref_id)
+        SELECT 'worker', id FROM workers WHERE cardinality(skills) > 0 ORDER BY id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('match_queue')
+    op.drop_index('ix_job_matches_job_id', table_name='job_matches')
+    op.drop_index('ix_job_matches_worker_id_score_job_id', table_name='job_matches')
+    op.drop_table('job_matches')
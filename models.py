@@ -1,7 +1,11 @@
 # models.py
 from extensions import db
 from datetime import datetime
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import deferred
+
+# Text search configuration used for jobs.search_vector and its queries.
+SEARCH_CONFIG = 'english'
 
 # ------------------------
 # USERS
@@ -25,13 +29,21 @@ class User(db.Model):
 # ------------------------
 class Worker(db.Model):
     __tablename__ = 'workers'
+    __table_args__ = (
+        db.Index('ix_workers_skills', 'skills', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     name = db.Column(db.String(255), nullable=False)
     phone = db.Column(db.String(50))
     location = db.Column(db.String(255))
-    skills = db.Column(ARRAY(db.String))  # list of skills
+    # From the geocodes table (geo.py); NULL when the location is unknown.
+    lat = db.Column(db.Double)
+    lng = db.Column(db.Double)
+    # text[], as the migrations create it; jobs.required_skills is varchar[],
+    # so SQL comparing the two casts one side (see matching.py).
+    skills = db.Column(ARRAY(db.Text))  # list of skills
     transportation = db.Column(db.String(50))  # own vehicle, public transit, etc.
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -46,10 +58,12 @@ class Contractor(db.Model):
     __tablename__ = 'contractors'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     business_name = db.Column(db.String(255), nullable=False)
     phone = db.Column(db.String(50))
     location = db.Column(db.String(255))
+    lat = db.Column(db.Double)
+    lng = db.Column(db.Double)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Posted jobs
@@ -61,14 +75,33 @@ class Contractor(db.Model):
 # ------------------------
 class Job(db.Model):
     __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_required_skills', 'required_skills', postgresql_using='gin'),
+        db.Index('ix_jobs_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_jobs_contractor_id_created_at', 'contractor_id', 'created_at'),
+        db.Index('ix_jobs_created_at_id', 'created_at', 'id'),
+        # Bounding-box prefilter for radius search (geo.py).
+        db.Index('ix_jobs_lat_lng', 'lat', 'lng'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=False)
     location = db.Column(db.String(255))
+    lat = db.Column(db.Double)
+    lng = db.Column(db.Double)
     contractor_id = db.Column(db.Integer, db.ForeignKey('contractors.id'), nullable=False)
     required_skills = db.Column(ARRAY(db.String))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # NOT NULL: a keyset sort key. The server default matches the migrated schema.
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           server_default=db.func.now())
+    status = db.Column(db.String(50), default='open', server_default='open')  # open, filled, closed
+    # Maintained by Postgres (GENERATED ... STORED); never loaded unless asked.
+    search_vector = deferred(db.Column(TSVECTOR, db.Computed(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+        persisted=True,
+    )))
 
     # Applications
     applications = db.relationship('JobApplication', backref='job')
@@ -79,8 +112,57 @@ class Job(db.Model):
 # ------------------------
 class JobApplication(db.Model):
     __tablename__ = 'job_applications'
+    __table_args__ = (
+        db.UniqueConstraint('worker_id', 'job_id', name='uniq_worker_job'),
+        db.Index('ix_job_applications_worker_id_applied_at', 'worker_id', 'applied_at'),
+        # Applicants per job, newest first; also serves the ON DELETE CASCADE from jobs.
+        db.Index('ix_job_applications_job_id_applied_at', 'job_id', 'applied_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     worker_id = db.Column(db.Integer, db.ForeignKey('workers.id'), nullable=False)
     job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False)
-    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # NOT NULL: a keyset sort key. The server default matches the migrated schema.
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           server_default=db.func.now())
+    status = db.Column(db.String(50), default='pending', server_default='pending')  # pending, accepted, rejected
+
+
+# ------------------------
+# GEOCODES
+# ------------------------
+class Geocode(db.Model):
+    """Offline place -> coordinates table, loaded with `flask load-geocodes`."""
+    __tablename__ = 'geocodes'
+
+    place = db.Column(db.String(255), primary_key=True)  # geo.place_key() of the location
+    lat = db.Column(db.Double, nullable=False)
+    lng = db.Column(db.Double, nullable=False)
+
+
+# ------------------------
+# JOB MATCHES
+# ------------------------
+class JobMatch(db.Model):
+    """A worker's best-scoring open jobs, kept up to date by `flask match-worker`."""
+    __tablename__ = 'job_matches'
+    __table_args__ = (
+        # /me/recommended-jobs: one worker's matches, best first (keyset on score, job_id).
+        db.Index('ix_job_matches_worker_id_score_job_id', 'worker_id', 'score', 'job_id'),
+    )
+
+    worker_id = db.Column(db.Integer, db.ForeignKey('workers.id', ondelete='CASCADE'), primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id', ondelete='CASCADE'), primary_key=True,
+                       index=True)
+    score = db.Column(db.Double, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+
+class MatchQueue(db.Model):
+    """Jobs and workers whose matches need (re)computing; see matching.py."""
+    __tablename__ = 'match_queue'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # job, worker
+    ref_id = db.Column(db.Integer, nullable=False)
+    enqueued_at = db.Column(db.DateTime, nullable=False, server_default=db.text("timezone('utc', now())"))
@@ -0,0 +1,124 @@
+# pagination.py
+import base64
+import json
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import tuple_
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we didn't issue (or can't read)."""
+
+
+# ------------------------
+# Cursor encoding
+# ------------------------
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(key_names, values):
+    """
+    Pack the sort key of the last row on a page into an opaque token. The
+    key's names go in too, so a cursor from one sort order (?q= ranks,
+    ?near= distances, ...) can't be replayed against another.
+    """
+    payload = json.dumps({"k": list(key_names), "v": [_encode_value(v) for v in values]},
+                         separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, key_names):
+    """Unpack a token from encode_cursor(); it must be for the key `key_names`."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if (not isinstance(payload, dict) or payload.get("k") != list(key_names)
+                or not isinstance(payload.get("v"), list) or len(payload["v"]) != len(key_names)):
+            raise InvalidCursor(token)
+        return [_decode_value(v) for v in payload["v"]]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(token) from e
+
+
+def _check_types(key_columns, values):
+    """Each cursor value must be of its column's type (ints for floats too)."""
+    for column, value in zip(key_columns, values):
+        try:
+            expected = column.type.python_type
+        except NotImplementedError:
+            continue
+        if expected is float:
+            expected = (int, float)
+        if value is None or isinstance(value, bool) or not isinstance(value, expected):
+            raise InvalidCursor(value)
+
+
+# ------------------------
+# Request helpers
+# ------------------------
+def page_args(default=DEFAULT_PER_PAGE, maximum=MAX_PER_PAGE, args=None):
+    """
+    Read (per_page, cursor, include_total) from the query string -- Flask's
+    request.args unless another mapping is given (the async routes).
+    """
+    args = request.args if args is None else args
+    try:
+        per_page = int(args.get("per_page", default))
+    except ValueError:
+        per_page = default
+    per_page = max(1, min(per_page, maximum))
+    include_total = args.get("include_total", "").lower() in ("1", "true", "yes")
+    return per_page, args.get("cursor"), include_total
+
+
+def keyset_filter(query, key_columns, cursor, descending=True):
+    """
+    Order `query` by `key_columns` (DESC unless descending=False) and, given
+    a cursor, keep only rows after it. The caller applies the LIMIT (see
+    keyset_page).
+
+    The cursor holds the key of the last row already returned, so the next
+    page is a plain `(k1, k2, ...) < (:v1, :v2, ...)` range read on the sort
+    index instead of an OFFSET scan.
+    """
+    if cursor:
+        values = tuple(decode_cursor(cursor, [c.key for c in key_columns]))
+        _check_types(key_columns, values)
+        key = tuple_(*key_columns)
+        query = query.filter(key < values if descending else key > values)
+    return query.order_by(*[c.desc() if descending else c.asc() for c in key_columns])
+
+
+def finish_page(rows, key_names, per_page):
+    """
+    Trim the extra lookahead row off a `per_page + 1` fetch. Returns
+    (rows, next_cursor); next_cursor is None on the last page.
+
+    Rows may be ORM entities or named column tuples -- the key is read back
+    from them by attribute name.
+    """
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(key_names, [getattr(last, name) for name in key_names])
+    return rows, next_cursor
+
+
+def keyset_page(query, key_columns, cursor, per_page, descending=True):
+    """Fetch one page of `query` ordered by `key_columns` (DESC by default)."""
+    rows = keyset_filter(query, key_columns, cursor, descending).limit(per_page + 1).all()
+    return finish_page(rows, [c.key for c in key_columns], per_page)
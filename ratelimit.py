@@ -0,0 +1,207 @@
+# ratelimit.py
+"""
+Token-bucket throttling for the expensive unauthenticated routes.
+
+/login and /signup each cost a password hash (tens of ms of CPU) plus a
+few queries, so a credential-stuffing burst can saturate every worker.
+Each throttled view gets buckets keyed by client IP and, where it makes
+sense, by the email in the JSON body:
+
+    @bp.route("/login", methods=["POST", "OPTIONS"])
+    @cross_origin(**CORS_KW)
+    @ratelimit.limit(per_ip="30/minute", per_email="10/minute")
+    def login(): ...
+
+A limit "N/period" is a bucket of N tokens refilled at N per period, so
+N requests may arrive at once and then one per period/N. The check runs
+before the view body -- before any hashing or DB access -- and a rejection
+is a 429 with Retry-After, costing a dict update (memory) or one round
+trip (Redis). CORS preflights are never counted.
+
+Backends (RATELIMIT_URL, see backends.py): per-process buckets (default),
+so each gunicorn worker enforces the limit separately; or shared buckets
+in Redis, updated atomically by a Lua script.
+
+Like the response cache, the Redis backend fails open: if Redis is down,
+requests are let through and a warning is logged.
+
+Configuration (env):
+    RATELIMIT_ENABLED          0 turns all limits off (benchmarks, dev)
+    RATELIMIT_URL              backend, see above
+    RATELIMIT_SIZE             max buckets the memory backend keeps (LRU)
+    RATELIMIT_TRUSTED_PROXIES  proxies in front of us that append to
+                               X-Forwarded-For (default 0: use the peer address)
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, request
+
+import backends
+import metrics
+
+RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATELIMIT_URL = os.getenv("RATELIMIT_URL", "")
+RATELIMIT_SIZE = int(os.getenv("RATELIMIT_SIZE", "100000"))
+RATELIMIT_TRUSTED_PROXIES = int(os.getenv("RATELIMIT_TRUSTED_PROXIES", "0"))
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+log = logging.getLogger(__name__)
+
+RATELIMIT_REJECTED = metrics.Counter(
+    "crewquick_ratelimit_rejected_total", "Requests refused with 429, by endpoint and bucket.",
+    labelnames=("endpoint", "scope"))
+
+
+def parse_limit(spec):
+    """"10/minute" -> (capacity 10, refill rate in tokens per second)."""
+    count, _, period = spec.partition("/")
+    count, period = int(count), period.strip().rstrip("s")
+    if count <= 0 or period not in PERIODS:
+        raise ValueError(f"Bad rate limit: {spec!r} (expected e.g. '10/minute')")
+    return count, count / PERIODS[period]
+
+
+# ------------------------
+# Backends
+# ------------------------
+# take(key, capacity, rate) spends one token and returns 0 when allowed,
+# otherwise the seconds until a token will be available.
+class MemoryBackend:
+    def __init__(self, maxsize=RATELIMIT_SIZE):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            # Forgetting a bucket only ever refills it, so LRU eviction is safe.
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# Same arithmetic as MemoryBackend.take, in one atomic step. Floats are
+# returned as strings: Redis truncates Lua numbers to integers.
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBackend(backends.RedisStore):
+    """Needs Lua (EVAL) on the server."""
+
+    prefix = "crewquick:ratelimit:"
+
+    def take(self, key, capacity, rate):
+        try:
+            # Wall clock, not monotonic: every process must share the timeline.
+            wait = self.client.eval(TAKE_SCRIPT, 1, self.prefix + key, capacity, rate, time.time())
+            return float(wait)
+        except Exception:
+            log.warning("rate limit check failed; allowing request", exc_info=True)
+            return 0.0
+
+    def clear(self):
+        for name in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(name)
+
+
+def backend_from_url(url):
+    return backends.from_url(url, "RATELIMIT_URL", MemoryBackend, RedisBackend)
+
+
+_backend = backends.Shared(lambda: backend_from_url(RATELIMIT_URL))
+get_backend = _backend.get
+set_backend = _backend.set
+
+
+# ------------------------
+# View decorator
+# ------------------------
+def client_ip():
+    """The caller's address, looking past RATELIMIT_TRUSTED_PROXIES proxies."""
+    if RATELIMIT_TRUSTED_PROXIES:
+        forwarded = [a.strip() for a in request.headers.get("X-Forwarded-For", "").split(",") if a.strip()]
+        # Each trusted proxy appended the address it saw; anything further
+        # left was sent by the client and can't be trusted.
+        if len(forwarded) >= RATELIMIT_TRUSTED_PROXIES:
+            return forwarded[-RATELIMIT_TRUSTED_PROXIES]
+    return request.remote_addr or "-"
+
+
+def _body_email():
+    data = request.get_json(silent=True)
+    email = data.get("email") if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def limit(per_ip=None, per_email=None):
+    """
+    Throttle a view by client IP and/or the JSON body's "email". Goes
+    directly under @cross_origin so 429s still carry CORS headers.
+    """
+    ip_limit = parse_limit(per_ip) if per_ip else None
+    email_limit = parse_limit(per_email) if per_email else None
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not RATELIMIT_ENABLED or request.method == "OPTIONS":
+                return view(*args, **kwargs)
+            endpoint = request.endpoint
+            checks = []
+            if ip_limit:
+                checks.append(("ip", client_ip(), ip_limit))
+            if email_limit:
+                email = _body_email()
+                if email:
+                    checks.append(("email", email, email_limit))
+
+            backend = get_backend()
+            for scope, value, (capacity, rate) in checks:
+                wait = backend.take(f"{endpoint}:{scope}:{value}", capacity, rate)
+                if wait > 0:
+                    RATELIMIT_REJECTED.inc(endpoint=endpoint, scope=scope)
+                    response = jsonify({"error": "Too many requests, please retry later"})
+                    response.headers["Retry-After"] = str(math.ceil(wait))
+                    return response, 429
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
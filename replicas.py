@@ -0,0 +1,315 @@
+# replicas.py
+"""
+Read-replica routing for read-only routes.
+
+With DATABASE_REPLICA_URLS set, each replica becomes a Flask-SQLAlchemy
+bind ("replica_0", "replica_1", ...) and db.session is a RoutingSession.
+A view marked read-only sends its queries to one replica, picked at
+random per request; everything else -- writes, CLI commands, unmarked
+views -- stays on the primary (DATABASE_URL):
+
+    @bp.route("/me/applications", methods=["GET", "OPTIONS"])
+    @cross_origin(**CORS_KW)
+    @jwt_required()
+    @replicas.read_only()
+    def my_applications(): ...
+
+The decorator goes below @jwt_required(). Whatever view asks, the
+caller's identity (identity.resolve: `current_user`, profile_id()
+fallbacks) is read from the primary: signup issues no token, so there is
+no per-user marker to wait for, and a replica that hasn't replayed the
+signup yet would turn the user's first request into a 401.
+
+Read-your-writes. A commit that wrote something records the primary's
+WAL position (pg_current_wal_lsn(), one query on a pooled connection) as a
+marker for REPLICA_STICKY_SECONDS: for the user who made it, and for
+"everyone" if it wrote a table some @cache.cached view reads
+(cache.watched()). While a marker is live, a read-only view only uses a
+replica that has replayed at least that far (one pg_last_wal_replay_lsn()
+query) and otherwise reads the primary. Views whose results are shared
+between users -- anything behind @cache.cached, where a stale page would
+be cached for everyone -- are marked read_only(shared=True) and check the
+"everyone" marker; other views check only their own user's. A commit
+with neither a user nor a watched table (signup) records nothing. A
+session that has written stays on the primary for the rest of the request.
+
+Markers have their own store (REPLICA_MARKERS_URL, see backends.py) and
+are only ever dropped when they expire. With the default memory store they
+are per process, so a read served by another gunicorn worker doesn't see
+its user's marker; use Redis when replicas are configured. If the Redis
+store can't be read, the request reads the primary. Writers outside a
+request (flask import-jobs, load-geocodes) call mark_written() after
+committing. Replication lag beyond REPLICA_STICKY_SECONDS is not detected.
+
+A replica that fails to connect is skipped for REPLICA_RETRY_SECONDS; the
+request that found it down fails. The native async routes in asgi.py
+read the primary.
+
+Configuration (env):
+    DATABASE_REPLICA_URLS   comma-separated replica URLs (default none: all
+                            queries go to the primary)
+    REPLICA_STICKY_SECONDS  how long a write pins reads to caught-up
+                            replicas (default 10)
+    REPLICA_MARKERS_URL     where write markers are kept (default: in
+                            process; redis://... to share them)
+    REPLICA_RETRY_SECONDS   how long a failed replica is skipped (default 30)
+"""
+import logging
+import os
+import random
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql.dml import UpdateBase
+
+import backends
+import cache
+import metrics
+from dbpool import engine_options
+
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+                         if u.strip()]
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+REPLICA_MARKERS_URL = os.getenv("REPLICA_MARKERS_URL", "")
+
+BIND_PREFIX = "replica_"
+EVERYONE = "*"
+
+log = logging.getLogger(__name__)
+
+READS_ROUTED = metrics.Counter(
+    "crewquick_db_reads_routed_total",
+    "Read-only requests by where their queries went (replica, primary) and why.",
+    labelnames=("endpoint", "target", "reason"))
+
+_down_until = {}  # replica engine -> time.monotonic() it may be tried again
+
+
+def binds():
+    """SQLALCHEMY_BINDS entries for the replicas, with the primary's pool settings."""
+    return {f"{BIND_PREFIX}{i}": dict(engine_options(), url=url)
+            for i, url in enumerate(DATABASE_REPLICA_URLS)}
+
+
+def replica_engines(db):
+    return [engine for key, engine in db.engines.items()
+            if key is not None and key.startswith(BIND_PREFIX)]
+
+
+def init_replicas(app, db):
+    """Watch the replica engines for connection failures (call once, in app context)."""
+    for engine in replica_engines(db):
+        event.listen(engine, "handle_error", _replica_error)
+
+    @app.teardown_request
+    def _end_of_request(exc):
+        # Runs after a streamed response is done. g and the session belong
+        # to the app context, which tests and CLI commands share between
+        # requests, so the routing state is dropped explicitly.
+        g.pop("db_read_only", None)
+        g.pop("db_replica", None)
+        if db.session.registry.has():
+            db.session.info.pop("replica_wrote", None)
+
+
+def _replica_error(context):
+    if context.is_disconnect or context.connection is None:
+        engine = context.engine
+        _down_until[engine] = time.monotonic() + REPLICA_RETRY_SECONDS
+        log.warning("replica %s unreachable; skipping it for %ss",
+                    engine.url.render_as_string(hide_password=True), REPLICA_RETRY_SECONDS)
+
+
+# ------------------------
+# Write markers
+# ------------------------
+def _user():
+    try:
+        return get_jwt().get("sub")
+    except RuntimeError:  # no JWT verified in this request, or no request
+        return None
+
+
+# A marker store maps a scope (a user id, or EVERYONE) to an LSN until its
+# ttl runs out. Nothing else may remove one: a marker that vanishes early
+# sends that user's reads to a replica that may not have their write.
+class MemoryMarkers:
+    def __init__(self):
+        self._markers = {}  # scope -> (expires, lsn)
+        self._swept = time.monotonic()
+        self._lock = threading.Lock()
+
+    def get(self, scope):
+        item = self._markers.get(scope)
+        if item is None or item[0] < time.monotonic():
+            return None
+        return item[1]
+
+    def set(self, scope, lsn, ttl):
+        now = time.monotonic()
+        with self._lock:
+            self._markers[scope] = (now + ttl, lsn)
+            # Expired markers are swept at most once per ttl, so the dict
+            # holds about one ttl's worth of writers.
+            if now - self._swept > ttl:
+                self._markers = {k: v for k, v in self._markers.items() if v[0] >= now}
+                self._swept = now
+
+
+class RedisMarkers(backends.RedisStore):
+    prefix = "crewquick:replica-lsn:"
+
+    def get(self, scope):
+        # Errors propagate: without the marker we can't pick a replica safely.
+        value = self.client.get(self.prefix + str(scope))
+        return value.decode() if value is not None else None
+
+    def set(self, scope, lsn, ttl):
+        try:
+            self.client.set(self.prefix + str(scope), lsn, px=max(1, int(ttl * 1000)))
+        except Exception:
+            log.warning("could not store a replica marker; read-your-writes may not hold",
+                        exc_info=True)
+
+
+_markers = backends.Shared(
+    lambda: backends.from_url(REPLICA_MARKERS_URL, "REPLICA_MARKERS_URL", MemoryMarkers, RedisMarkers))
+get_markers = _markers.get
+set_markers = _markers.set
+
+
+def mark_written(engine, user=None, shared=True):
+    """
+    Pin reads to caught-up replicas after a write committed on `engine`
+    (the primary): `user`'s reads, if given, and shared views' if `shared`.
+    """
+    scopes = ([EVERYONE] if shared else []) + ([user] if user is not None else [])
+    if not DATABASE_REPLICA_URLS or not scopes:
+        return
+    with engine.connect() as conn:
+        lsn = conn.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+    markers = get_markers()
+    for scope in scopes:
+        markers.set(scope, lsn, REPLICA_STICKY_SECONDS)
+
+
+def _caught_up(engine, lsn):
+    """Has `engine` replayed the primary's WAL up to `lsn`? False if unsure."""
+    try:
+        with engine.connect() as conn:
+            return bool(conn.execute(
+                text("SELECT pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn)"),
+                {"lsn": lsn}).scalar())
+    except DBAPIError:
+        return False
+
+
+# ------------------------
+# Routing
+# ------------------------
+def _route(db):
+    """The replica engine this request's reads go to, or None for the primary."""
+    if not has_request_context() or "db_read_only" not in g:
+        return None
+    if "db_replica" not in g:
+        g.db_replica, reason = _choose(db, g.db_read_only)
+        READS_ROUTED.inc(endpoint=request.endpoint,
+                         target="primary" if g.db_replica is None else "replica", reason=reason)
+    return g.db_replica
+
+
+def _choose(db, shared):
+    now = time.monotonic()
+    candidates = [e for e in replica_engines(db) if _down_until.get(e, 0) <= now]
+    if not candidates:
+        return None, "no_replica"
+    engine = random.choice(candidates)
+    scope = EVERYONE if shared else _user()
+    try:
+        lsn = get_markers().get(scope) if scope is not None else None
+    except Exception:
+        log.warning("replica markers unavailable; reading the primary", exc_info=True)
+        return None, "markers_unavailable"
+    if lsn is None:
+        return engine, "ok"
+    if _caught_up(engine, lsn):
+        return engine, "caught_up"
+    return None, "recent_write"
+
+
+def read_only(shared=False):
+    """
+    Let this view's queries go to a replica (see the module docstring).
+    `shared`: the response is shared between users (cached), so it must
+    reflect every user's recent writes, not just the caller's.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if DATABASE_REPLICA_URLS:
+                g.db_read_only = shared
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class RoutingSession(Session):
+    """db.session: reads in read-only views go to a replica (see read_only())."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not self.info.get("replica_wrote")
+                and not isinstance(clause, UpdateBase)):
+            replica = _route(self._db)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+# ------------------------
+# Write tracking
+# ------------------------
+# "replica_wrote" keeps the rest of the request on the primary;
+# "replica_tables" (the tables written since the last commit) decides which
+# markers that commit sets.
+def _written(session, tables):
+    session.info["replica_wrote"] = True
+    session.info.setdefault("replica_tables", set()).update(tables)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _track_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        _written(orm_execute_state.session, [table.name] if table is not None else [])
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _track_flush(session, flush_context, instances):
+    _written(session, {getattr(obj, "__tablename__", None)
+                       for obj in (*session.new, *session.dirty, *session.deleted)} - {None})
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_commit(session):
+    tables = session.info.pop("replica_tables", None)
+    if tables is None or not DATABASE_REPLICA_URLS:
+        return
+    try:
+        mark_written(session._db.engine, _user(), shared=any(cache.watched(t) for t in tables))
+    except DBAPIError:
+        # The write is committed either way; only read-your-writes suffers.
+        log.warning("could not record the primary's WAL position", exc_info=True)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_rollback(session):
+    session.info.pop("replica_tables", None)
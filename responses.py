@@ -0,0 +1,122 @@
+# responses.py
+"""
+Response middleware for the api blueprint, plus the ?fields= helpers.
+
+Every successful JSON GET gets:
+  * a weak ETag -- an MD5 of the body unless the view already set one
+    (cached views derive theirs from the cache key, see cache.py) -- and a
+    304 Not Modified when If-None-Match matches;
+  * gzip (or brotli, when the client prefers it) once the body is at
+    least COMPRESS_MIN_BYTES, with `Vary: Accept-Encoding`.
+
+Streamed responses (stream_with_context, file downloads) are passed
+through untouched: buffering them to hash or compress would defeat the
+point of streaming.
+
+`?fields=id,title,...` is a sparse fieldset for list views. It is applied
+by the views themselves (fields_arg / pick) rather than here, so a view can
+also skip loading columns nobody asked for -- chiefly Job.description. A
+name the view doesn't return is a 400 (UnknownFields), not an empty item.
+
+Configuration (env):
+    COMPRESS_MIN_BYTES   smallest body worth compressing (default 1024)
+    COMPRESS_LEVEL       gzip level 1-9 (default 6); brotli uses quality 5
+"""
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/csv", "text/plain")
+
+
+def init_responses(bp):
+    """Register the conditional-GET / compression hook on a blueprint."""
+    bp.after_request(finalize_response)
+
+
+def finalize_response(response):
+    if (request.method not in ("GET", "HEAD") or response.status_code != 200
+            or response.is_streamed or response.direct_passthrough):
+        return response
+
+    if response.mimetype == "application/json":
+        if not response.get_etag()[0]:
+            response.add_etag(weak=True)
+        # Weak comparison against If-None-Match; turns this into a bodiless 304.
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+    if response.mimetype in COMPRESSIBLE:
+        compress(response)
+    return response
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"] and accepted["br"] >= accepted["gzip"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(response):
+    response.vary.add("Accept-Encoding")
+    if "Content-Encoding" in response.headers:
+        return
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return
+    encoding = _choose_encoding()
+    if encoding == "br":
+        data = brotli.compress(data, quality=BROTLI_QUALITY)
+    elif encoding == "gzip":
+        data = gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+    else:
+        return
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+
+
+# ------------------------
+# Sparse fieldsets
+# ------------------------
+class UnknownFields(ValueError):
+    """?fields= named fields the view doesn't have (e.args[0], sorted)."""
+
+
+def fields_arg(allowed):
+    """
+    Field names from ?fields=a,b (comma-separated or repeated); None means
+    all. Raises UnknownFields for names not in `allowed`.
+    """
+    names = {f.strip() for v in request.args.getlist("fields") for f in v.split(",") if f.strip()}
+    if not names:
+        return None
+    unknown = names - set(allowed) - {"id"}
+    if unknown:
+        raise UnknownFields(sorted(unknown))
+    names.add("id")  # rows stay addressable
+    return names
+
+
+def wants(fields, name):
+    return fields is None or name in fields
+
+
+def pick(item, fields):
+    """Top-level keys of `item` listed in `fields` (all of them if None)."""
+    if fields is None:
+        return item
+    return {k: v for k, v in item.items() if k in fields}
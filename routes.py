@@ -1,15 +1,39 @@
 # routes.py
-from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, Response, request, jsonify
 from flask_jwt_extended import (
-    jwt_required, create_access_token, get_jwt_identity, get_jwt
+    jwt_required, create_access_token, create_refresh_token, get_jwt_identity, get_jwt,
+    current_user
 )
 from flask_cors import cross_origin  # ✅ CORS per-route
 from extensions import db
-from models import User, Worker, Contractor, Job, JobApplication
+import cache
+import geo
+import jobstream
+import matching
+import ratelimit
+import replicas
+from identity import claims_for, invalidate, profile_id
+from models import User, Worker, Contractor, Job, JobApplication, JobMatch, SEARCH_CONFIG
+from pagination import InvalidCursor, finish_page, keyset_filter, keyset_page, page_args
+from responses import UnknownFields, fields_arg, init_responses, pick, wants
+from serializers import (APPLICANT_COLUMNS, APPLICANT_FIELDS, APPLICATION_COLUMNS,
+                         APPLICATION_FIELDS, JOB_COLUMNS, JOB_FIELDS, applicant, application,
+                         job_columns, record, records)
+from export import format_arg, stream_export
+from instrumentation import init_request_metrics
+from hashing import HashQueueFull, RETRY_AFTER_SECONDS, hash_password, needs_rehash, verify_password
+from sqlalchemy import Double, String, any_, cast, distinct, func, insert, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from datetime import datetime
+import json
 import os
 
 bp = Blueprint("api", __name__)
+# Registered first so its after_request runs last and times everything.
+init_request_metrics(bp)
+init_responses(bp)  # ETag/304 + compression on every api response
 
 # Configure allowed origin(s) for CORS.
 # In prod, set FRONTEND_ORIGIN=https://yourapp.vercel.app
@@ -23,17 +47,57 @@ CORS_KW = dict(
     max_age=86400,  # cache preflight for a day
 )
 
+@bp.errorhandler(HashQueueFull)
+def hash_queue_full(e):
+    response = jsonify({"error": "Server busy, please retry"})
+    response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+    return response, 503
+
+@bp.errorhandler(UnknownFields)
+def unknown_fields(e):
+    return jsonify({"error": f"Unknown fields: {', '.join(e.args[0])}"}), 400
+
 def require_fields(data, *fields):
+    """Each of `fields` must be a non-empty string in the JSON object `data`."""
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object"}, 400
     missing = [f for f in fields if not data.get(f)]
     if missing:
         return {"error": f"Missing fields: {', '.join(missing)}"}, 400
+    wrong = [f for f in fields if not isinstance(data[f], str)]
+    if wrong:
+        return {"error": f"Fields must be strings: {', '.join(wrong)}"}, 400
     return None
 
+def skills_error(data):
+    """The error for a `required_skills` that isn't a list of strings, else None."""
+    skills = data.get("required_skills")
+    if skills is not None and not (isinstance(skills, list)
+                                   and all(isinstance(x, str) for x in skills)):
+        return "required_skills must be a list of strings"
+    return None
+
+def list_arg(name):
+    """?name=a,b&name=c -> ["a", "b", "c"] (stripped, de-duplicated, order kept)."""
+    values = []
+    for raw in request.args.getlist(name):
+        for v in raw.split(","):
+            v = v.strip()
+            if v and v not in values:
+                values.append(v)
+    return values
+
+def datetime_arg(name):
+    """Parse an ISO-8601 query arg; raises ValueError on garbage."""
+    raw = request.args.get(name)
+    return datetime.fromisoformat(raw) if raw else None
+
 # ----------------------
 # SIGNUP
 # ----------------------
 @bp.route("/signup", methods=["POST", "OPTIONS"])
 @cross_origin(**CORS_KW)
+@ratelimit.limit(per_ip="10/minute", per_email="5/hour")
 def signup():
     data = request.get_json() or {}
     guard = require_fields(data, "email", "password", "role")
@@ -43,31 +107,52 @@ def signup():
     password = data["password"]
     role = data["role"]  # "worker" or "contractor"
 
-    if User.query.filter_by(email=email).first():
-        return jsonify({"error": "Email already exists"}), 400
-
-    user = User(email=email, password_hash=generate_password_hash(password), role=role)
-    db.session.add(user)
-    db.session.commit()
-
-    # Role-specific record
+    # Validate everything before paying for a hash or touching the DB.
     if role == "worker":
-        worker = Worker(user_id=user.id, name=data.get("name"))
-        db.session.add(worker)
-    elif role == "contractor":
-        contractor = Contractor(user_id=user.id, business_name=data.get("business_name"))
-        db.session.add(contractor)
-    else:
+        guard = require_fields(data, "name")
+        if guard: return jsonify(guard[0]), guard[1]
+    elif role != "contractor":
         return jsonify({"error": "Invalid role"}), 400
 
-    db.session.commit()
-    return jsonify({"message": f"{role.capitalize()} signed up successfully", "user_id": user.id})
+    password_hash = hash_password(password)
+
+    # One statement, one commit: the user INSERT ... RETURNING feeds the
+    # profile INSERT through a CTE, so there is never a user without a
+    # profile. A duplicate email is reported by users_email_key itself.
+    # created_at is set explicitly: Python-side column defaults can't be
+    # rendered inside a CTE.
+    now = datetime.utcnow()
+    new_user = (insert(User)
+                .values(email=email, password_hash=password_hash, role=role, created_at=now)
+                .returning(User.id)
+                .cte("new_user"))
+    if role == "worker":
+        profile = insert(Worker).from_select(
+            ["user_id", "name", "created_at"],
+            select(new_user.c.id, literal(data["name"], String), literal(now)))
+    else:
+        profile = insert(Contractor).from_select(
+            ["user_id", "business_name", "created_at"],
+            select(new_user.c.id, literal(data.get("business_name"), String), literal(now)))
+    model = Worker if role == "worker" else Contractor
+
+    try:
+        user_id = db.session.execute(profile.returning(model.user_id)).scalar_one()
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if getattr(getattr(e.orig, "diag", None), "constraint_name", None) == "users_email_key":
+            return jsonify({"error": "Email already exists"}), 400
+        raise
+
+    return jsonify({"message": f"{role.capitalize()} signed up successfully", "user_id": user_id})
 
 # ----------------------
 # LOGIN
 # ----------------------
 @bp.route("/login", methods=["POST", "OPTIONS"])
 @cross_origin(**CORS_KW)
+@ratelimit.limit(per_ip="30/minute", per_email="10/minute")
 def login():
     data = request.get_json() or {}
     guard = require_fields(data, "email", "password")
@@ -76,14 +161,49 @@ def login():
     email = data["email"]
     password = data["password"]
 
-    user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password_hash, password):
+    # Profile rows come along so their ids can go into the token.
+    user = (User.query
+            .options(joinedload(User.worker), joinedload(User.contractor))
+            .filter_by(email=email)
+            .first())
+    if not user or not verify_password(user.password_hash, password):
         return jsonify({"error": "Invalid credentials"}), 401
 
+    # Upgrade hashes made with older parameters while we have the plaintext.
+    # Best effort: if the pool is saturated, the next login will try again.
+    if needs_rehash(user.password_hash):
+        try:
+            user.password_hash = hash_password(password)
+            db.session.commit()
+        except HashQueueFull:
+            db.session.rollback()
+
     access_token = create_access_token(
-        identity=str(user.id),                  # JWT "sub" must be a string
-        additional_claims={"role": user.role}  # role available via get_jwt()["role"]
+        identity=str(user.id),                 # JWT "sub" must be a string
+        additional_claims=claims_for(user)     # role + worker_id/contractor_id via get_jwt()
     )
+    refresh_token = create_refresh_token(identity=str(user.id))
+    return jsonify({"access_token": access_token, "refresh_token": refresh_token,
+                    "user_id": user.id, "role": user.role})
+
+# ----------------------
+# REFRESH
+# ----------------------
+@bp.route("/refresh", methods=["POST", "OPTIONS"])
+@cross_origin(**CORS_KW)
+@jwt_required(refresh=True)
+def refresh():
+    # Re-read the user so the new access token carries current claims.
+    user_id = int(get_jwt_identity())
+    invalidate(user_id)
+    user = (User.query
+            .options(joinedload(User.worker), joinedload(User.contractor))
+            .filter_by(id=user_id)
+            .first())
+    if not user:
+        return jsonify({"error": "User not found"}), 401
+
+    access_token = create_access_token(identity=str(user.id), additional_claims=claims_for(user))
     return jsonify({"access_token": access_token, "user_id": user.id, "role": user.role})
 
 # ----------------------
@@ -93,63 +213,153 @@ def login():
 @cross_origin(**CORS_KW)
 @jwt_required()
 def post_job():
-    user_id = int(get_jwt_identity())
     role = get_jwt()["role"]
     if role != "contractor":
         return jsonify({"error": "Only contractors can post jobs"}), 403
+    contractor_id = profile_id("contractor_id")
+    if not contractor_id:
+        return jsonify({"error": "Contractor profile not found"}), 404
 
     data = request.get_json() or {}
     guard = require_fields(data, "title", "description", "location")
     if guard: return jsonify(guard[0]), guard[1]
+    error = skills_error(data)
+    if error:
+        return jsonify({"error": error}), 400
 
+    lat, lng = geo.coordinates(data["location"])
     job = Job(
         title=data["title"],
         description=data["description"],
         location=data["location"],
-        contractor_id=user_id,
+        lat=lat, lng=lng,
+        contractor_id=contractor_id,
         required_skills=data.get("required_skills")
     )
     db.session.add(job)
-    db.session.commit()
+    db.session.flush()
+    # The flush also queued the job for match scoring (matching.py).
+    jobstream.notify_jobs(db.session, [(job.id, job.required_skills)])  # sent on commit
+    db.session.commit()  # also bumps the "jobs" cache generation (cache.py)
     return jsonify({"message": "Job posted successfully", "job_id": job.id})
 
 # ----------------------
-# LIST ALL JOBS (Workers)
+# BULK POST JOBS (Contractor)
 # ----------------------
-@bp.route("/jobs", methods=["GET"])
+BULK_MAX_JOBS = int(os.getenv("BULK_MAX_JOBS", "500"))
+
+def bulk_body():
+    """
+    Jobs from a JSON array or an NDJSON body (one object per line).
+    Returns (jobs, error message).
+    """
+    if request.mimetype == "application/x-ndjson":
+        jobs = []
+        for n, line in enumerate(request.get_data(as_text=True).splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                jobs.append(json.loads(line))
+            except ValueError:
+                return None, f"Invalid JSON on line {n}"
+        return jobs, None
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        return None, "Expected a JSON array of jobs"
+    return data, None
+
+@bp.route("/jobs/bulk", methods=["POST", "OPTIONS"])
+@cross_origin(**CORS_KW)
 @jwt_required()
-def list_jobs_worker():
-    jobs = Job.query.all()
-    jobs_list = [{
-        "id": j.id,
-        "title": j.title,
-        "description": j.description,
-        "location": j.location,
-        "contractor_id": j.contractor_id,
-        "required_skills": j.required_skills
-    } for j in jobs]
-    return jsonify(jobs_list)
+def post_jobs_bulk():
+    role = get_jwt()["role"]
+    if role != "contractor":
+        return jsonify({"error": "Only contractors can post jobs"}), 403
+    contractor_id = profile_id("contractor_id")
+    if not contractor_id:
+        return jsonify({"error": "Contractor profile not found"}), 404
+
+    jobs, error = bulk_body()
+    if error:
+        return jsonify({"error": error}), 400
+    if not jobs:
+        return jsonify({"error": "No jobs given"}), 400
+    if len(jobs) > BULK_MAX_JOBS:
+        return jsonify({"error": f"At most {BULK_MAX_JOBS} jobs per request"}), 400
+
+    # Same rules as POST /jobs, checked for every job before anything is
+    # written: the batch goes in whole or not at all.
+    errors = []
+    for i, data in enumerate(jobs):
+        if not isinstance(data, dict):
+            errors.append({"index": i, "error": "Expected an object"})
+            continue
+        guard = require_fields(data, "title", "description", "location")
+        if guard:
+            errors.append({"index": i, "error": guard[0]["error"]})
+        error = skills_error(data)
+        if error:
+            errors.append({"index": i, "error": error})
+    if errors:
+        return jsonify({"error": "Invalid jobs", "details": errors}), 400
+
+    now = datetime.utcnow()
+    places = geo.lookup(data["location"] for data in jobs)  # one query for the batch
+    rows = []
+    for data in jobs:
+        lat, lng = places.get(geo.place_key(data["location"]), (None, None))
+        rows.append({
+            "title": data["title"],
+            "description": data["description"],
+            "location": data["location"],
+            "lat": lat, "lng": lng,
+            "contractor_id": contractor_id,
+            "required_skills": data.get("required_skills"),
+            "created_at": now,
+        })
+    # One multi-row INSERT ... RETURNING per batch of rows, ids back in input
+    # order, one commit for the lot.
+    job_ids = db.session.scalars(
+        insert(Job).returning(Job.id, sort_by_parameter_order=True), rows
+    ).all()
+    jobstream.notify_jobs(db.session, zip(job_ids, (r["required_skills"] for r in rows)))
+    # Bulk INSERTs bypass the unit of work hooks: queue and bump by hand.
+    matching.enqueue(db.session, "job", job_ids)
+    db.session.commit()
+    cache.bump("jobs")
+    return jsonify({"message": f"{len(job_ids)} jobs posted successfully", "job_ids": job_ids})
 
 # ----------------------
 # ADMIN: LIST JOBS
 # ----------------------
 @bp.route("/admin/jobs", methods=["GET"])
 @jwt_required()
+@replicas.read_only()
 def list_jobs_admin():
     role = get_jwt()["role"]
     if role != "admin":
         return jsonify({"error": "Admin access required"}), 403
 
-    jobs = Job.query.all()
-    job_list = [{
-        "id": j.id,
-        "title": j.title,
-        "description": j.description,
-        "location": j.location,
-        "contractor_id": j.contractor_id,
-        "required_skills": j.required_skills
-    } for j in jobs]
-    return jsonify(job_list)
+    fmt = format_arg()
+    if fmt is None:
+        return jsonify({"error": "format must be one of json, ndjson, csv, array"}), 400
+    if fmt != "json":
+        fields = fields_arg(JOB_FIELDS)
+        columns = [c for c in JOB_COLUMNS if wants(fields, c.key)]
+        return stream_export(select(*columns).order_by(Job.id), fmt, "jobs")
+
+    # JSON is one page at a time, by id, in the pre-paging item shape (no
+    # created_at); whole-table dumps are ?format=ndjson|csv|array, the
+    # last being the old bare array for clients that don't follow cursors.
+    fields = fields_arg([f for f in JOB_FIELDS if f != "created_at"])
+    columns = [c for c in JOB_COLUMNS if c.key != "created_at" and wants(fields, c.key)]
+    per_page, cursor, _ = page_args()
+    try:
+        jobs, next_cursor = keyset_page(db.session.query(*columns), [Job.id], cursor, per_page,
+                                        descending=False)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+    return jsonify({"results": records(jobs), "per_page": per_page, "next_cursor": next_cursor})
 
 # ----------------------
 # APPLY TO JOB (Worker)
@@ -158,27 +368,28 @@ def list_jobs_admin():
 @cross_origin(**CORS_KW)
 @jwt_required()
 def apply_job(job_id):
-    user_id = int(get_jwt_identity())
     role = get_jwt()["role"]
     if role != "worker":
         return jsonify({"error": "Only workers can apply to jobs"}), 403
 
     # Map user -> worker
-    worker = Worker.query.filter_by(user_id=user_id).first()
-    if not worker:
+    worker_id = profile_id("worker_id")
+    if not worker_id:
         return jsonify({"error": "Worker profile not found"}), 404
 
-    job = Job.query.get(job_id)
-    if not job:
-        return jsonify({"error": "Job not found"}), 404
-
-    existing = JobApplication.query.filter_by(worker_id=worker.id, job_id=job_id).first()
-    if existing:
-        return jsonify({"error": "Already applied to this job"}), 400
-
-    application = JobApplication(worker_id=worker.id, job_id=job_id)
+    # No pre-SELECTs: the job FK and uniq_worker_job decide, atomically.
+    application = JobApplication(worker_id=worker_id, job_id=job_id)
     db.session.add(application)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        constraint = getattr(getattr(e.orig, "diag", None), "constraint_name", None)
+        if constraint == "uniq_worker_job":
+            return jsonify({"error": "Already applied to this job"}), 400
+        if constraint == "job_applications_job_id_fkey":
+            return jsonify({"error": "Job not found"}), 404
+        raise
     return jsonify({"message": "Application submitted successfully"})
 
 
@@ -188,13 +399,32 @@ def apply_job(job_id):
 @bp.route("/admin/users", methods=["GET", "OPTIONS"])
 @cross_origin(**CORS_KW)
 @jwt_required()
+@replicas.read_only()
 def list_users():
     role = get_jwt()["role"]
     if role != "admin":
         return jsonify({"error": "Admin access required"}), 403
 
-    users = User.query.order_by(User.id.asc()).all()
-    return jsonify([{"id": u.id, "email": u.email, "role": u.role} for u in users])
+    fmt = format_arg()
+    if fmt is None:
+        return jsonify({"error": "format must be one of json, ndjson, csv, array"}), 400
+    if fmt != "json":
+        fields = fields_arg(("id", "email", "role", "created_at"))
+        columns = [c for c in (User.id, User.email, User.role, User.created_at)
+                   if wants(fields, c.key)]
+        return stream_export(select(*columns).order_by(User.id), fmt, "users")
+
+    # As /admin/jobs: JSON is paged without created_at, exports stream the
+    # whole table.
+    fields = fields_arg(("id", "email", "role"))
+    columns = [c for c in (User.id, User.email, User.role) if wants(fields, c.key)]
+    per_page, cursor, _ = page_args()
+    try:
+        users, next_cursor = keyset_page(db.session.query(*columns), [User.id], cursor, per_page,
+                                         descending=False)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+    return jsonify({"results": records(users), "per_page": per_page, "next_cursor": next_cursor})
 
 # ----------------------
 # WORKER: LIST JOBS
@@ -203,93 +433,427 @@ def list_users():
 @bp.route("/me", methods=["GET", "OPTIONS"])
 @cross_origin(**CORS_KW)
 @jwt_required()
+@replicas.read_only()
 def me():
-    user_id = int(get_jwt_identity())
-    role = get_jwt()["role"]
-    u = User.query.get(user_id)
-    base = {"id": u.id, "email": u.email, "role": u.role}
-
-    if role == "worker":
-        w = Worker.query.filter_by(user_id=user_id).first()
-        base["profile"] = {
-            "name": w.name if w else None,
-            "location": w.location if w else None,
-            "skills": w.skills if w else None,
-            "transportation": w.transportation if w else None,
-        }
-    elif role == "contractor":
-        c = Contractor.query.filter_by(user_id=user_id).first()
-        base["profile"] = {
-            "business_name": c.business_name if c else None,
-            "location": c.location if c else None,
-            "phone": c.phone if c else None,
-        }
+    # User + profile come from the identity resolver (one joined query at
+    # most, usually none).
+    u = current_user
+    base = {"id": u.user_id, "email": u.email, "role": u.role}
+    if u.profile is not None:
+        base["profile"] = u.profile
     return jsonify(base)
 
 @bp.route("/me/applications", methods=["GET", "OPTIONS"])
 @cross_origin(**CORS_KW)
 @jwt_required()
+@replicas.read_only()
 def my_applications():
-    user_id = int(get_jwt_identity())
     role = get_jwt()["role"]
     if role != "worker":
         return jsonify({"error": "Worker role required"}), 403
 
-    worker = Worker.query.filter_by(user_id=user_id).first()
-    if not worker:
+    worker_id = profile_id("worker_id")
+    if not worker_id:
         return jsonify({"error": "Worker profile not found"}), 404
 
-    apps = (JobApplication.query
-            .filter_by(worker_id=worker.id)
-            .join(Job, Job.id == JobApplication.job_id)
-            .order_by(JobApplication.applied_at.desc())
-            .all())
+    # Only the columns we return: no ORM entities, no Job.description, and
+    # no lazy a.job load per row.
+    q = (db.session.query(*APPLICATION_COLUMNS)
+         .join(Job, Job.id == JobApplication.job_id)
+         .filter(JobApplication.worker_id == worker_id))
+    per_page, cursor, _ = page_args()
+    try:
+        apps, next_cursor = keyset_page(
+            q, [JobApplication.applied_at, JobApplication.id], cursor, per_page)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    fields = fields_arg(APPLICATION_FIELDS)
+    return jsonify({
+        "results": [pick(application(a), fields) for a in apps],
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+    })
+
+@bp.route("/me/recommended-jobs", methods=["GET", "OPTIONS"])
+@cross_origin(**CORS_KW)
+@jwt_required()
+@replicas.read_only()
+def recommended_jobs():
+    role = get_jwt()["role"]
+    if role != "worker":
+        return jsonify({"error": "Worker role required"}), 403
+
+    worker_id = profile_id("worker_id")
+    if not worker_id:
+        return jsonify({"error": "Worker profile not found"}), 404
 
-    return jsonify([{
-        "application_id": a.id,
-        "job_id": a.job_id,
-        "applied_at": a.applied_at.isoformat() if a.applied_at else None,
-        "job": {
-            "title": a.job.title,
-            "location": a.job.location,
-            "contractor_id": a.job.contractor_id
-        }
-    } for a in apps])
+    # Precomputed by `flask match-worker` (matching.py): a range scan of
+    # ix_job_matches_worker_id_score_job_id, best first. A job closed since
+    # it was scored is skipped here until the queue catches up.
+    fields = fields_arg(JOB_FIELDS + ("match_score",))
+    score = JobMatch.score.label("match_score")
+    q = (db.session.query(*job_columns(fields, score, JobMatch.job_id))
+         .join(Job, Job.id == JobMatch.job_id)
+         .filter(JobMatch.worker_id == worker_id,
+                 func.coalesce(Job.status, "open") == "open"))
+    per_page, cursor, _ = page_args()
+    try:
+        rows, next_cursor = keyset_page(q, [score, JobMatch.job_id], cursor, per_page)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
 
+    return jsonify({
+        "results": records(rows, fields, omit=("job_id",), digits={"match_score": 4}),
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+    })
 
 
 @bp.route("/me/jobs", methods=["GET", "OPTIONS"])
 @cross_origin(**CORS_KW)
 @jwt_required()
+@replicas.read_only()
 def my_jobs():
-    user_id = int(get_jwt_identity())
     role = get_jwt()["role"]
     if role != "contractor":
         return jsonify({"error": "Contractor role required"}), 403
+    contractor_id = profile_id("contractor_id")
+    if not contractor_id:
+        return jsonify({"error": "Contractor profile not found"}), 404
+
+    per_page, cursor, _ = page_args()
+    fields = fields_arg(("id", "title", "location", "required_skills", "status", "created_at",
+                        "description", "applicants"))
+    columns = [Job.id, Job.title, Job.location, Job.required_skills, Job.status, Job.created_at]
+    if wants(fields, "description"):
+        columns.append(Job.description)
+    # One page of the contractor's jobs...
+    try:
+        page = keyset_filter(
+            db.session.query(*columns)
+            .filter(Job.contractor_id == contractor_id),
+            [Job.created_at, Job.id], cursor,
+        ).limit(per_page + 1).cte("page")
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    # ...and its applicant counts from a single GROUP BY (job_id, status),
+    # joined back in the same statement. Jobs nobody applied to come back
+    # once with a NULL status.
+    app_status = func.coalesce(JobApplication.status, "pending")
+    status_counts = (select(JobApplication.job_id, app_status.label("status"),
+                            func.count().label("n"))
+                     .where(JobApplication.job_id.in_(select(page.c.id)))
+                     .group_by(JobApplication.job_id, app_status)
+                     .subquery())
+    rows = db.session.execute(
+        select(page, status_counts.c.status.label("app_status"), status_counts.c.n)
+        .outerjoin(status_counts, status_counts.c.job_id == page.c.id)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+    ).all()
+
+    jobs, by_status = [], {}
+    for r in rows:
+        if r.id not in by_status:
+            jobs.append(r)
+            by_status[r.id] = {}
+        if r.app_status is not None:
+            by_status[r.id][r.app_status] = r.n
+    jobs, next_cursor = finish_page(jobs, ["created_at", "id"], per_page)
+
+    results = records(jobs, fields, omit=("app_status", "n"))
+    if wants(fields, "applicants"):
+        for item in results:
+            counts = by_status[item["id"]]
+            item["applicants"] = {"total": sum(counts.values()), "by_status": counts}
+    return jsonify({
+        "results": results,
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+    })
+
+
+@bp.route("/me/jobs/<int:job_id>/applicants", methods=["GET", "OPTIONS"])
+@cross_origin(**CORS_KW)
+@jwt_required()
+@replicas.read_only()
+def job_applicants(job_id):
+    role = get_jwt()["role"]
+    if role != "contractor":
+        return jsonify({"error": "Contractor role required"}), 403
+    contractor_id = profile_id("contractor_id")
+    if not contractor_id:
+        return jsonify({"error": "Contractor profile not found"}), 404
 
-    jobs = Job.query.filter_by(contractor_id=user_id).order_by(Job.created_at.desc()).all()
-    return jsonify([{
-        "id": j.id, "title": j.title, "description": j.description,
-        "location": j.location, "required_skills": j.required_skills,
-        "created_at": j.created_at.isoformat() if j.created_at else None
-    } for j in jobs])
+    owned = db.session.query(Job.id).filter_by(id=job_id, contractor_id=contractor_id).first()
+    if owned is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    # Application + worker columns in one join; never JobApplication.worker.
+    q = (db.session.query(*APPLICANT_COLUMNS)
+         .join(Worker, Worker.id == JobApplication.worker_id)
+         .filter(JobApplication.job_id == job_id))
+    if request.args.get("status"):
+        # NULL-status rows count as pending in /me/jobs, so they filter as one too.
+        q = q.filter(func.coalesce(JobApplication.status, "pending") == request.args["status"])
+
+    per_page, cursor, _ = page_args()
+    try:
+        apps, next_cursor = keyset_page(
+            q, [JobApplication.applied_at, JobApplication.id], cursor, per_page)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    fields = fields_arg(APPLICANT_FIELDS)
+    return jsonify({
+        "results": [pick(applicant(a), fields) for a in apps],
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+    })
 
 
+# ----------------------
+# JOB FEED
+# ----------------------
 @bp.route("/jobs", methods=["GET", "OPTIONS"])
 @cross_origin(**CORS_KW)
 @jwt_required()
+@cache.cached("jobs")
+@replicas.read_only(shared=True)
 def list_jobs():
-    page = int(request.args.get("page", 1))
-    per_page = min(int(request.args.get("per_page", 20)), 100)
-    q = Job.query.order_by(Job.created_at.desc())
-    items = q.paginate(page=page, per_page=per_page, error_out=False)
+    per_page, cursor, include_total = page_args()
+    if request.args.get("near"):
+        if request.args.get("q"):
+            return jsonify({"error": "near and q can't be combined"}), 400
+        return near_feed(per_page, cursor, include_total)
+    if request.args.get("q"):
+        return search_feed(request.args["q"], per_page, cursor, include_total)
+
+    fields = fields_arg(JOB_FIELDS)
+    q = db.session.query(*job_columns(fields))
+    try:
+        jobs, next_cursor = keyset_page(q, [Job.created_at, Job.id], cursor, per_page)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    body = {
+        "results": records(jobs, fields),
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+    }
+    # COUNT(*) walks the whole table, so only pay for it when asked.
+    if include_total:
+        body["total"] = db.session.query(func.count(Job.id)).scalar()
+    return jsonify(body)
+
+def search_feed(text_query, per_page, cursor, include_total):
+    """Full-text variant of the feed (?q=...), ranked by ts_rank."""
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, text_query)
+    # ts_rank returns real; widen it so the float echoed back in the cursor
+    # compares exactly against the same row's rank.
+    rank = cast(func.ts_rank(Job.search_vector, tsquery), Double).label("rank")
+    # Postgres evaluates costly select-list functions like ts_headline after
+    # the sort + LIMIT, so only the rows on this page get highlighted.
+    snippet = func.ts_headline(
+        SEARCH_CONFIG, func.coalesce(Job.description, ""), tsquery,
+        "MaxFragments=2, MinWords=5, MaxWords=20",
+    ).label("snippet")
+
+    match = Job.search_vector.op("@@")(tsquery)
+    q = db.session.query(Job.id, Job.title, Job.location, Job.contractor_id,
+                         Job.required_skills, Job.created_at, rank, snippet).filter(match)
+    try:
+        rows, next_cursor = keyset_page(q, [rank, Job.id], cursor, per_page)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    fields = fields_arg(("id", "title", "location", "contractor_id", "required_skills", "created_at",
+                        "rank", "snippet"))
+    body = {
+        "results": records(rows, fields),
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+    }
+    if include_total:
+        body["total"] = db.session.query(func.count(Job.id)).filter(match).scalar()
+    return jsonify(body)
+
+def near_feed(per_page, cursor, include_total):
+    """Jobs within ?radius_km= of ?near=lat,lng, nearest first."""
+    try:
+        lat, lng = geo.parse_point(request.args["near"])
+    except ValueError:
+        return jsonify({"error": "near must be lat,lng"}), 400
+    try:
+        radius_km = float(request.args.get("radius_km", geo.GEO_DEFAULT_RADIUS_KM))
+    except ValueError:
+        radius_km = 0
+    if not 0 < radius_km <= geo.GEO_MAX_RADIUS_KM:
+        return jsonify({"error": f"radius_km must be between 0 and {geo.GEO_MAX_RADIUS_KM:g}"}), 400
+
+    # The box narrows the index scan; the exact distance trims its corners
+    # and is the sort key (double precision, so the cursor compares exactly).
+    distance = geo.distance_km(Job.lat, Job.lng, lat, lng).label("distance_km")
+    filters = [geo.bounding_box(Job.lat, Job.lng, lat, lng, radius_km), distance <= radius_km]
+
+    fields = fields_arg(JOB_FIELDS + ("distance_km",))
+    q = db.session.query(*job_columns(fields, distance)).filter(*filters)
+    try:
+        rows, next_cursor = keyset_page(q, [distance, Job.id], cursor, per_page, descending=False)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    body = {
+        "results": records(rows, fields, digits={"distance_km": 3}),
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+    }
+    if include_total:
+        body["total"] = db.session.query(func.count(Job.id)).filter(*filters).scalar()
+    return jsonify(body)
 
-    return jsonify({
-        "results": [{
-            "id": j.id, "title": j.title, "description": j.description,
-            "location": j.location, "contractor_id": j.contractor_id,
-            "required_skills": j.required_skills,
-            "created_at": j.created_at.isoformat() if j.created_at else None
-        } for j in items.items],
-        "page": page, "per_page": per_page, "total": items.total
-    })
+# ----------------------
+# JOB DETAIL
+# ----------------------
+@bp.route("/jobs/<int:job_id>", methods=["GET", "OPTIONS"])
+@cross_origin(**CORS_KW)
+@jwt_required()
+@cache.cached("jobs")
+@replicas.read_only(shared=True)
+def get_job(job_id):
+    job = db.session.query(*JOB_COLUMNS, Job.status).filter(Job.id == job_id).first()
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(record(job))
+
+# ----------------------
+# NEW-JOB STREAM (SSE)
+# ----------------------
+job_stream = jobstream.JobStream(JOB_COLUMNS, record)
+
+def stream_skills():
+    """?skills=..., else a worker's own profile skills; None means every job."""
+    skills = list_arg("skills")
+    if not skills and get_jwt()["role"] == "worker":
+        skills = list(current_user.skills)
+    return skills or None
+
+@bp.route("/jobs/stream", methods=["GET", "OPTIONS"])
+@cross_origin(**CORS_KW)
+@jwt_required()
+def stream_jobs():
+    try:
+        after = jobstream.last_event_id(
+            request.headers.get("Last-Event-ID", request.args.get("last_event_id")))
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be a job id"}), 400
+    skills = stream_skills()
+
+    subscriber = jobstream.ThreadSubscriber(skills)
+    try:
+        job_stream.subscribe(db.engine, subscriber)
+    except jobstream.StreamFull:
+        response = jsonify({"error": "Too many open streams, please retry"})
+        response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+        return response, 503
+    try:
+        # Subscribed (and listening) before reading the replay, so nothing
+        # committed in between is missed; duplicates are skipped below.
+        if not job_stream.ready.wait(jobstream.LISTEN_READY_SECONDS):
+            job_stream.unsubscribe(subscriber)
+            response = jsonify({"error": "Job stream unavailable, please retry"})
+            response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+            return response, 503
+        replay = []
+        if after is not None:
+            replay = db.session.execute(job_stream.replay_statement(after, skills)).all()
+    except Exception:
+        job_stream.unsubscribe(subscriber)
+        raise
+
+    def events():
+        # Runs after the view has returned: the request's DB session is
+        # already closed, so an open stream holds no pooled connection.
+        try:
+            yield jobstream.RETRY
+            if len(replay) > jobstream.SSE_REPLAY_MAX:
+                replayed = set()
+                yield jobstream.RESET
+            else:
+                replayed = {row.id for row in replay}
+                for row in replay:
+                    yield job_stream.render_event(row)
+            while True:
+                item = subscriber.get(jobstream.SSE_HEARTBEAT_SECONDS)
+                if item is None:
+                    return
+                if item is jobstream.HEARTBEAT:
+                    yield item
+                elif item[0] not in replayed:
+                    yield item[1]
+        finally:
+            job_stream.unsubscribe(subscriber)
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@bp.route("/jobs/search", methods=["GET", "OPTIONS"])
+@cross_origin(**CORS_KW)
+@jwt_required()
+@replicas.read_only()
+def search_jobs():
+    skills = list_arg("skills")
+    if not skills and get_jwt()["role"] == "worker":
+        # Default to the caller's own profile skills.
+        skills = list(current_user.skills)
+    if not skills:
+        return jsonify({"error": "Missing fields: skills"}), 400
+
+    match = request.args.get("match", "any")
+    if match not in ("any", "all"):
+        return jsonify({"error": "match must be 'any' or 'all'"}), 400
+
+    try:
+        created_after = datetime_arg("created_after")
+        created_before = datetime_arg("created_before")
+    except ValueError:
+        return jsonify({"error": "created_after/created_before must be ISO-8601"}), 400
+
+    # jobs.required_skills is VARCHAR[]; Postgres won't compare it with the
+    # TEXT[] psycopg2 sends, and the GIN index needs the && / @> to match.
+    wanted = cast(skills, ARRAY(String))
+    skill = func.unnest(Job.required_skills).column_valued("skill")
+    score = (select(func.count(distinct(skill)))
+             .where(skill == any_(wanted))
+             .scalar_subquery()
+             .label("match_score"))
+
+    if match == "all":
+        filters = [Job.required_skills.contains(wanted)]
+    else:
+        filters = [Job.required_skills.overlap(wanted)]
+    location = request.args.get("location")
+    if location:
+        filters.append(Job.location.icontains(location, autoescape=True))
+    if created_after:
+        filters.append(Job.created_at >= created_after)
+    if created_before:
+        filters.append(Job.created_at < created_before)
+
+    fields = fields_arg(JOB_FIELDS + ("match_score",))
+    q = db.session.query(*job_columns(fields, score)).filter(*filters)
+    per_page, cursor, include_total = page_args()
+    try:
+        rows, next_cursor = keyset_page(q, [score, Job.created_at, Job.id], cursor, per_page)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    body = {
+        "results": records(rows, fields),
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+    }
+    if include_total:
+        body["total"] = db.session.query(func.count(Job.id)).filter(*filters).scalar()
+    return jsonify(body)
@@ -0,0 +1,146 @@
+# serializers.py
+"""
+The JSON encoder, and the response shapes shared by the list views.
+
+Views select column tuples -- db.session.query(*columns) or
+select(*columns) -- instead of ORM entities: no identity map, no instance
+state, no attribute instrumentation, just the columns the response needs.
+A row becomes its response dict by zipping it with its column names
+(records()), so a column's key *is* its JSON field name; label anything
+else. Values stay as Postgres returned them: datetimes are written by the
+encoder, not isoformat()'d per row.
+
+dumps() is orjson with sorted keys, the one encoder for every path:
+jsonify (OrjsonProvider, installed as app.json), the native routes in
+asgi.py, /jobs/stream events and NDJSON exports. datetimes come out in ISO
+8601 exactly as isoformat() writes them; Decimal as a string and anything
+with __html__ as its markup, as with Flask's default provider. Unlike
+that provider, non-ASCII text is written as UTF-8 rather than \\u escapes,
+and output is compact even under app.debug.
+
+Throughput: python -m bench.serialize.
+"""
+from decimal import Decimal
+from operator import itemgetter
+
+import orjson
+from flask.json.provider import JSONProvider
+
+from models import Job, JobApplication, Worker
+from responses import wants
+
+# A job as the API returns it; every job list starts from these.
+JOB_COLUMNS = (Job.id, Job.title, Job.description, Job.location,
+               Job.contractor_id, Job.required_skills, Job.created_at)
+
+APPLICATION_COLUMNS = (JobApplication.id, JobApplication.job_id, JobApplication.applied_at,
+                       Job.title, Job.location, Job.contractor_id)
+
+APPLICANT_COLUMNS = (JobApplication.id, JobApplication.applied_at, JobApplication.status,
+                     Worker.id.label("worker_id"), Worker.name, Worker.location,
+                     Worker.skills, Worker.transportation)
+
+# What ?fields= may name (responses.fields_arg) for each shape.
+JOB_FIELDS = tuple(c.key for c in JOB_COLUMNS)
+APPLICATION_FIELDS = ("application_id", "job_id", "applied_at", "job")
+APPLICANT_FIELDS = ("application_id", "status", "applied_at", "worker")
+
+
+# ------------------------
+# Encoding
+# ------------------------
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj, sort_keys=True):
+    """`obj` as compact JSON bytes (keys sorted unless sort_keys=False)."""
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+
+
+class OrjsonProvider(JSONProvider):
+    """app.json: jsonify(), request.get_json() and friends through orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj) + b"\n", mimetype="application/json")
+
+
+# ------------------------
+# Row shapes
+# ------------------------
+def job_columns(fields, *extra):
+    """JOB_COLUMNS, without description unless `fields` wants it, then `extra`."""
+    return [c for c in JOB_COLUMNS if c.key != "description" or wants(fields, "description")] + list(extra)
+
+
+def records(rows, fields=None, omit=(), digits=None):
+    """
+    Column-tuple rows as dicts keyed by column name: only the names in
+    `fields` (all if None), never those in `omit` (sort keys the response
+    doesn't show). `digits` maps names to round() precisions.
+    """
+    if not rows:
+        return []
+    names = rows[0]._fields
+    keep = [i for i, name in enumerate(names) if name not in omit and wants(fields, name)]
+    if len(keep) == len(names):
+        out = [dict(zip(names, row)) for row in rows]
+    elif not keep:
+        out = [{} for _ in rows]
+    elif len(keep) == 1:
+        (i,) = keep
+        name = names[i]
+        out = [{name: row[i]} for row in rows]
+    else:
+        # itemgetter(i) would return a bare value, not a tuple: only for 2+.
+        keys = [names[i] for i in keep]
+        get = itemgetter(*keep)
+        out = [dict(zip(keys, get(row))) for row in rows]
+    for name, n in (digits or {}).items():
+        if wants(fields, name):
+            for item in out:
+                if item[name] is not None:
+                    item[name] = round(item[name], n)
+    return out
+
+
+def record(row, fields=None):
+    """records() for one row."""
+    return records([row], fields)[0]
+
+
+def application(row):
+    """A worker's application with its job: a row of APPLICATION_COLUMNS."""
+    return {
+        "application_id": row.id,
+        "job_id": row.job_id,
+        "applied_at": row.applied_at,
+        "job": {"title": row.title, "location": row.location, "contractor_id": row.contractor_id},
+    }
+
+
+def applicant(row):
+    """An application to one of a contractor's jobs: a row of APPLICANT_COLUMNS."""
+    return {
+        "application_id": row.id,
+        "status": row.status,
+        "applied_at": row.applied_at,
+        "worker": {
+            "id": row.worker_id,
+            "name": row.name,
+            "location": row.location,
+            "skills": row.skills or [],
+            "transportation": row.transportation,
+        },
+    }
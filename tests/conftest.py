@@ -0,0 +1,78 @@
+# tests/conftest.py
+"""
+Shared fixtures. Most tests need nothing but the code; the ones that talk
+to Postgres are marked `db` and skipped unless TEST_DATABASE_URL points at
+a scratch database with the schema (alembic upgrade head):
+
+    python -m pytest -q                                  # pure tests only
+    TEST_DATABASE_URL=postgresql://... python -m pytest -q
+    python -m pytest -q -m "not db"                      # never the database
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Read at import time by the modules under test: hash inline, cheaply, and
+# never throttle the test client.
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("RATELIMIT_ENABLED", "0")
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "db: needs Postgres (TEST_DATABASE_URL)")
+
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_DATABASE_URL:
+        return
+    skip = pytest.mark.skip(reason="TEST_DATABASE_URL is not set")
+    for item in items:
+        if "db" in item.keywords:
+            item.add_marker(skip)
+
+
+class Clock:
+    """A time.monotonic() / time.time() stand-in that only moves when told."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    import time
+    fake = Clock()
+    monkeypatch.setattr(time, "monotonic", fake)
+    monkeypatch.setattr(time, "time", fake)
+    return fake
+
+
+@pytest.fixture(scope="session")
+def app():
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    from app import app
+    return app
+
+
+@pytest.fixture
+def owner(app):
+    """bench.querycount.make_owner(5): a contractor with 5 jobs and their applicants."""
+    from bench.querycount import drop, make_owner
+    from extensions import db
+    with app.app_context():
+        with db.engine.begin() as conn:
+            made = make_owner(conn, 5)
+        yield made
+        with db.engine.begin() as conn:
+            drop(conn, made["users"])
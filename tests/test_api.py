@@ -0,0 +1,67 @@
+# tests/test_api.py
+"""End-to-end paging through the Flask test client (needs TEST_DATABASE_URL)."""
+import pytest
+
+from pagination import encode_cursor
+
+pytestmark = pytest.mark.db
+
+
+def walk(client, path, token, key="id"):
+    """Every item of a paged list, following next_cursor two at a time."""
+    seen, cursor = [], None
+    while True:
+        url = f"{path}?per_page=2" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        seen.extend(item[key] for item in body["results"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+def test_my_jobs_pages_without_gaps(app, owner):
+    ids = walk(app.test_client(), "/me/jobs", owner["contractor"])
+    assert len(ids) == len(set(ids)) == 5
+
+
+def test_my_applications_pages_without_gaps(app, owner):
+    ids = walk(app.test_client(), "/me/applications", owner["worker"], key="application_id")
+    assert len(ids) == len(set(ids)) == 5
+
+
+@pytest.mark.parametrize("cursor", ["garbage", encode_cursor(["rank", "id"], [0.5, 1]),
+                                    encode_cursor(["applied_at", "id"], ["yesterday", 1])])
+def test_bad_cursor_is_a_400(app, owner, cursor):
+    response = app.test_client().get(f"/me/applications?cursor={cursor}",
+                                     headers={"Authorization": f"Bearer {owner['worker']}"})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
+
+
+@pytest.fixture
+def admin(app):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        return create_access_token("0", additional_claims={"role": "admin"})
+
+
+def test_admin_json_rejects_export_only_fields(app, admin):
+    response = app.test_client().get("/admin/users?fields=email,created_at",
+                                     headers={"Authorization": f"Bearer {admin}"})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Unknown fields: created_at"}
+
+
+def test_admin_array_export_is_the_unpaged_list(app, admin, owner):
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {admin}"}
+    dump = client.get("/admin/jobs?format=array&fields=title", headers=headers)
+    assert dump.status_code == 200
+    assert dump.mimetype == "application/json"
+    items = dump.get_json()
+    assert all(set(item) == {"id", "title"} for item in items)
+    assert owner["job"] in {item["id"] for item in items}
+    paged = walk(client, "/admin/jobs", admin)
+    assert [item["id"] for item in items] == paged
@@ -0,0 +1,40 @@
+# tests/test_cache.py
+from cache import TTLCache
+
+
+def test_ttl_expiry(clock):
+    c = TTLCache(maxsize=10, ttl=5)
+    c.set("a", 1)
+    c.set("b", 2, ttl=20)
+    clock.advance(4.9)
+    assert c.get("a") == 1
+    clock.advance(0.2)
+    assert c.get("a") is None
+    assert c.get("b") == 2
+
+
+def test_zero_ttl_is_not_stored(clock):
+    c = TTLCache(maxsize=10, ttl=5)
+    c.set("a", 1, ttl=0)
+    assert c.get("a") is None
+
+
+def test_lru_eviction(clock):
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # "b" is now the least recently used
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert (c.get("a"), c.get("c")) == (1, 3)
+
+
+def test_delete_and_clear(clock):
+    c = TTLCache(maxsize=10, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.delete("a")
+    c.delete("missing")
+    assert c.get("a") is None and c.get("b") == 2
+    c.clear()
+    assert c.get("b") is None
@@ -0,0 +1,76 @@
+# tests/test_geo.py
+import math
+
+import pytest
+from sqlalchemy import create_engine, event, literal, select
+
+import geo
+
+
+@pytest.fixture(scope="module")
+def sqlite():
+    # Evaluates the SQL expressions without Postgres; least() is the one
+    # function SQLite lacks (its math functions cover the rest).
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, record):
+        dbapi_connection.create_function("least", -1, min)
+
+    with engine.connect() as conn:
+        yield conn
+
+
+def inside(conn, point, center, radius_km):
+    box = geo.bounding_box(literal(point[0]), literal(point[1]), *center, radius_km)
+    return bool(conn.execute(select(box)).scalar())
+
+
+def haversine(a, b):
+    (lat1, lng1), (lat2, lng2) = [(math.radians(x), math.radians(y)) for x, y in (a, b)]
+    h = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def test_place_key():
+    assert geo.place_key("  Austin,   TX ") == geo.place_key("austin, tx") == "austin, tx"
+    assert geo.place_key("") is None and geo.place_key(None) is None
+
+
+@pytest.mark.parametrize("raw", ["30.27", "91,0", "0,181", "a,b", "1,2,3"])
+def test_parse_point_rejects(raw):
+    with pytest.raises(ValueError):
+        geo.parse_point(raw)
+
+
+def test_bounding_box(sqlite):
+    austin = (30.27, -97.74)
+    assert inside(sqlite, (30.40, -97.60), austin, 25)
+    assert not inside(sqlite, (30.27, -96.50), austin, 25)
+    assert not inside(sqlite, (31.00, -97.74), austin, 25)
+
+
+@pytest.mark.parametrize("center", [(-17.8, 179.9), (-17.8, -179.9)])
+def test_bounding_box_across_the_antimeridian(sqlite, center):
+    # Fiji straddles 180°: points on both sides are within 50 km.
+    assert inside(sqlite, (-17.8, 179.7), center, 50)
+    assert inside(sqlite, (-17.8, -179.7), center, 50)
+    assert not inside(sqlite, (-17.8, 178.0), center, 50)
+    assert not inside(sqlite, (-17.8, -178.0), center, 50)
+    assert not inside(sqlite, (-17.8, 0.0), center, 50)
+
+
+def test_bounding_box_near_a_pole_spans_every_longitude(sqlite):
+    assert inside(sqlite, (89.5, -170.0), (89.9, 10.0), 100)
+
+
+@pytest.mark.parametrize("a, b", [
+    ((30.27, -97.74), (32.78, -96.80)),  # Austin -> Dallas, ~293 km
+    ((-17.8, 179.9), (-17.8, -179.9)),
+    ((10.0, 20.0), (10.0, 20.0)),
+])
+def test_distance_km(sqlite, a, b):
+    expr = geo.distance_km(literal(b[0]), literal(b[1]), *a)
+    assert sqlite.execute(select(expr)).scalar() == pytest.approx(haversine(a, b), abs=1e-6)
+    assert 290 < haversine((30.27, -97.74), (32.78, -96.80)) < 296
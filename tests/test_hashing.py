@@ -0,0 +1,18 @@
+# tests/test_hashing.py
+from werkzeug.security import generate_password_hash
+
+import hashing
+
+
+def test_needs_rehash():
+    current = generate_password_hash("pw", hashing.HASH_METHOD)
+    assert not hashing.needs_rehash(current)
+    other = "pbkdf2:sha256:1000" if not hashing.HASH_METHOD.startswith("pbkdf2") else "scrypt:16384:8:1"
+    assert hashing.needs_rehash(generate_password_hash("pw", other))
+
+
+def test_hash_and_verify_inline():
+    assert hashing.pool.workers == 0  # conftest: PASSWORD_HASH_WORKERS=0
+    stored = hashing.hash_password("pw")
+    assert hashing.verify_password(stored, "pw")
+    assert not hashing.verify_password(stored, "wrong")
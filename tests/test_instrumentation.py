@@ -0,0 +1,17 @@
+# tests/test_instrumentation.py
+import pytest
+
+from instrumentation import normalize_sql
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM jobs WHERE id = 42", "SELECT * FROM jobs WHERE id = ?"),
+    ("SELECT * FROM users WHERE email = 'o''brien@x.test'", "SELECT * FROM users WHERE email = ?"),
+    ("SELECT 1 FROM t WHERE a = %(a_1)s AND b = %s AND c = $3",
+     "SELECT ? FROM t WHERE a = ? AND b = ? AND c = ?"),
+    ("SELECT * FROM jobs WHERE id IN (1, 2, 3, 4)", "SELECT * FROM jobs WHERE id IN (?)"),
+    ("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)", "INSERT INTO t (a, b) VALUES (?, ?)"),
+    ("SELECT  x\n  FROM t2\n\tWHERE y > -1.5", "SELECT x FROM t2 WHERE y > ?"),
+])
+def test_normalize_sql(sql, expected):
+    assert normalize_sql(sql) == expected
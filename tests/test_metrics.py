@@ -0,0 +1,51 @@
+# tests/test_metrics.py
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    # Only this test's metrics, not every module's.
+    monkeypatch.setattr(metrics, "_registry", [])
+
+
+def test_counter_render():
+    c = metrics.Counter("t_requests_total", "Requests.", labelnames=("path",))
+    c.inc(path="/jobs")
+    c.inc(2, path="/jobs")
+    c.inc(path='/a"b\\c')
+    assert metrics.render() == (
+        "# HELP t_requests_total Requests.\n"
+        "# TYPE t_requests_total counter\n"
+        't_requests_total{path="/a\\"b\\\\c"} 1\n'
+        't_requests_total{path="/jobs"} 3\n'
+    )
+
+
+def test_labels_must_match():
+    c = metrics.Counter("t_total", "Things.", labelnames=("kind",))
+    with pytest.raises(ValueError):
+        c.inc(other="x")
+
+
+def test_gauge_callback_and_float_values():
+    g = metrics.Gauge("t_in_flight", "In flight.", callback=lambda: 2.5)
+    assert metrics.render().splitlines()[-1] == "t_in_flight 2.5"
+    g2 = metrics.Gauge("t_queue", "Queued.")
+    g2.inc(3)
+    g2.dec()
+    assert metrics.render().splitlines()[-1] == "t_queue 2"
+
+
+def test_histogram_buckets_are_cumulative():
+    h = metrics.Histogram("t_seconds", "Latency.", buckets=(0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.observe(v)
+    assert metrics.render().splitlines()[2:] == [
+        't_seconds_bucket{le="0.1"} 2',
+        't_seconds_bucket{le="1.0"} 3',
+        't_seconds_bucket{le="+Inf"} 4',
+        "t_seconds_sum 3.65",
+        "t_seconds_count 4",
+    ]
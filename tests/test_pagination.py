@@ -0,0 +1,68 @@
+# tests/test_pagination.py
+import base64
+from collections import namedtuple
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from models import Job
+from pagination import InvalidCursor, decode_cursor, encode_cursor, finish_page, keyset_filter
+
+KEY = ["created_at", "id"]
+
+
+def test_cursor_round_trip():
+    at = datetime(2026, 10, 17, 9, 30, 15, 123456)
+    token = encode_cursor(KEY, [at, 42])
+    assert decode_cursor(token, KEY) == [at, 42]
+
+
+def test_cursor_is_url_safe():
+    token = encode_cursor(["rank", "id"], [0.123456789, 7])
+    assert "=" not in token
+    assert base64.urlsafe_b64encode(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    assert decode_cursor(token, ["rank", "id"]) == [0.123456789, 7]
+
+
+@pytest.mark.parametrize("token", [
+    "not a cursor",
+    "",
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),  # no key names
+    base64.urlsafe_b64encode(b'{"k": ["created_at", "id"], "v": [1]}').decode(),
+    base64.urlsafe_b64encode(b'{"k": ["created_at", "id"], "v": [{"dt": "yesterday"}, 1]}').decode(),
+])
+def test_bad_cursors(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, KEY)
+
+
+def test_cursor_from_another_sort_key():
+    token = encode_cursor(["rank", "id"], [0.5, 3])
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, KEY)
+
+
+@pytest.mark.parametrize("values", [["2026-10-17", 3], [None, 3], [datetime(2026, 1, 1), "3"],
+                                    [datetime(2026, 1, 1), True]])
+def test_cursor_values_must_match_column_types(values):
+    with pytest.raises(InvalidCursor):
+        keyset_filter(select(Job.id), [Job.created_at, Job.id], encode_cursor(KEY, values))
+
+
+def test_keyset_filter_orders_and_filters():
+    token = encode_cursor(KEY, [datetime(2026, 1, 1), 3])
+    sql = str(keyset_filter(select(Job.id), [Job.created_at, Job.id], token))
+    assert "(jobs.created_at, jobs.id) < (" in sql
+    assert sql.endswith("ORDER BY jobs.created_at DESC, jobs.id DESC")
+    ascending = str(keyset_filter(select(Job.id), [Job.id], None, descending=False))
+    assert "WHERE" not in ascending and ascending.endswith("ORDER BY jobs.id ASC")
+
+
+def test_finish_page():
+    Row = namedtuple("Row", "id title")
+    rows = [Row(i, f"job {i}") for i in (5, 4, 3)]
+    page, next_cursor = finish_page(rows, ["id"], 2)
+    assert page == rows[:2]
+    assert decode_cursor(next_cursor, ["id"]) == [4]
+    assert finish_page(rows, ["id"], 3) == (rows, None)
@@ -0,0 +1,40 @@
+# tests/test_querycount.py
+"""
+bench.querycount's N+1 guard for /me/applications as a test: one page
+costs the same number of statements however many rows the worker owns
+(needs TEST_DATABASE_URL).
+"""
+import pytest
+
+from bench import recording
+
+pytestmark = pytest.mark.db
+
+
+def statements_for_page(app, n):
+    from bench.querycount import drop, make_owner
+    from extensions import db
+    with app.app_context():
+        with db.engine.begin() as conn:
+            made = make_owner(conn, n)
+        try:
+            with recording(db.engine) as statements:
+                response = app.test_client().get(
+                    "/me/applications?per_page=100",
+                    headers={"Authorization": f"Bearer {made['worker']}"})
+            assert response.status_code == 200, response.get_json()
+            assert len(response.get_json()["results"]) == n
+            return len(statements)
+        finally:
+            with db.engine.begin() as conn:
+                drop(conn, made["users"])
+
+
+@pytest.fixture(scope="module")
+def baseline(app):
+    return statements_for_page(app, 1)
+
+
+@pytest.mark.parametrize("n", [10, 50])
+def test_my_applications_statements_do_not_grow(app, baseline, n):
+    assert statements_for_page(app, n) == baseline
@@ -0,0 +1,45 @@
+# tests/test_ratelimit.py
+import pytest
+
+from ratelimit import MemoryBackend, parse_limit
+
+
+def test_parse_limit():
+    assert parse_limit("10/minute") == (10, 10 / 60)
+    assert parse_limit("5/seconds") == (5, 5.0)
+    for spec in ("0/minute", "10/fortnight", "ten/minute"):
+        with pytest.raises(ValueError):
+            parse_limit(spec)
+
+
+def test_bucket_empties_then_refills(clock):
+    bucket = MemoryBackend()
+    capacity, rate = 3, 1.0  # three at once, then one a second
+    assert [bucket.take("k", capacity, rate) for _ in range(3)] == [0, 0, 0]
+    assert bucket.take("k", capacity, rate) == pytest.approx(1.0)
+    clock.advance(0.5)
+    assert bucket.take("k", capacity, rate) == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert bucket.take("k", capacity, rate) == 0
+
+
+def test_refill_stops_at_capacity(clock):
+    bucket = MemoryBackend()
+    bucket.take("k", 2, 1.0)
+    clock.advance(3600)
+    assert [bucket.take("k", 2, 1.0) for _ in range(3)][:2] == [0, 0]
+    assert bucket.take("k", 2, 1.0) > 0
+
+
+def test_keys_are_independent(clock):
+    bucket = MemoryBackend()
+    assert bucket.take("a", 1, 1.0) == 0
+    assert bucket.take("a", 1, 1.0) > 0
+    assert bucket.take("b", 1, 1.0) == 0
+
+
+def test_evicting_a_bucket_refills_it(clock):
+    bucket = MemoryBackend(maxsize=1)
+    bucket.take("a", 1, 0.001)
+    bucket.take("b", 1, 0.001)  # evicts "a"
+    assert bucket.take("a", 1, 0.001) == 0
@@ -0,0 +1,34 @@
+# tests/test_responses.py
+import pytest
+from flask import Flask
+
+from responses import UnknownFields, fields_arg, pick
+
+
+@pytest.fixture
+def request_for():
+    app = Flask(__name__)
+
+    def make(query):
+        return app.test_request_context("/?" + query)
+
+    return make
+
+
+def test_fields_arg(request_for):
+    with request_for(""):
+        assert fields_arg(("title",)) is None
+    with request_for("fields=title,%20location&fields=title"):
+        assert fields_arg(("title", "location")) == {"id", "title", "location"}
+
+
+def test_unknown_fields(request_for):
+    with request_for("fields=title,bogus,alsobogus"), pytest.raises(UnknownFields) as e:
+        fields_arg(("title",))
+    assert e.value.args[0] == ["alsobogus", "bogus"]
+
+
+def test_pick():
+    item = {"application_id": 1, "job": {"title": "Roof"}, "status": "pending"}
+    assert pick(item, None) is item
+    assert pick(item, {"id", "job"}) == {"job": {"title": "Roof"}}
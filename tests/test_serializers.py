@@ -0,0 +1,43 @@
+# tests/test_serializers.py
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+
+import orjson
+
+from serializers import dumps, record, records
+
+Row = namedtuple("Row", "id title created_at score")
+ROWS = [Row(1, "Roof", datetime(2026, 10, 17, 9, 30), 0.123456),
+        Row(2, "Deck", datetime(2026, 10, 16, 8, 0), None)]
+
+
+def test_records_all_columns():
+    assert records(ROWS) == [
+        {"id": 1, "title": "Roof", "created_at": datetime(2026, 10, 17, 9, 30), "score": 0.123456},
+        {"id": 2, "title": "Deck", "created_at": datetime(2026, 10, 16, 8, 0), "score": None},
+    ]
+    assert records([]) == []
+
+
+def test_records_fields_omit_and_digits():
+    assert records(ROWS, fields={"id", "score"}, digits={"score": 2}) == [
+        {"id": 1, "score": 0.12}, {"id": 2, "score": None}]
+    assert records(ROWS, omit=("created_at", "score")) == [
+        {"id": 1, "title": "Roof"}, {"id": 2, "title": "Deck"}]
+
+
+def test_records_single_column():
+    assert records(ROWS, fields={"title"}) == [{"title": "Roof"}, {"title": "Deck"}]
+    assert record(ROWS[0], fields={"id"}) == {"id": 1}
+
+
+def test_dumps():
+    out = dumps({"b": Decimal("1.50"), "a": datetime(2026, 10, 17, 9, 30), "c": "ü"})
+    assert out == '{"a":"2026-10-17T09:30:00","b":"1.50","c":"ü"}'.encode()
+    assert orjson.loads(dumps({"x": [1, 2]})) == {"x": [1, 2]}
+
+
+def test_records_no_columns_left():
+    assert records(ROWS, fields={"title"}, omit=("title",)) == [{}, {}]
+    assert records(ROWS[:1], fields={"nothing"}) == [{}]